@@ -0,0 +1,240 @@
+"""Benchmark waktu rerun galeri terhadap jumlah foto.
+
+Setiap aplikasi (test.py, test1.py, test2.py) dijalankan headless lewat AppTest Streamlit
+terhadap galeri sintetis, dengan GitHub diganti server fake lokal (atau repositori git lokal).
+Setiap kombinasi aplikasi x ukuran galeri berjalan di proses terpisah agar cache proses
+(st.cache_resource) dan RSS puncak tidak saling memengaruhi.
+
+Contoh:
+    python bench_gallery.py --sizes 10 100 1000 5000 --output bench_results/hasil.json
+    python bench_gallery.py --compare bench_results/lama.json bench_results/baru.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import platform
+import tempfile
+import subprocess
+import statistics
+from datetime import datetime, timezone
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_APPS = ["test.py", "test1.py", "test2.py"]
+DEFAULT_SIZES = [10, 100, 1000, 5000]
+DEFAULT_RERUNS = 5
+IMAGE_SIZE = (640, 480) # Cukup kecil agar 5.000 foto cepat dibuat, cukup besar agar decode terukur
+GITHUB_UPLOAD_PATH = "gallery_images"
+
+
+def generate_images(image_dir, count, size=IMAGE_SIZE, seed=0):
+    """Buat count JPEG sintetis (gradien acak) di image_dir; file yang sudah ada dipakai ulang."""
+    from PIL import Image
+    os.makedirs(image_dir, exist_ok=True)
+    rng = random.Random(seed)
+    gradient = Image.linear_gradient('L').resize(size)
+    for index in range(count):
+        file_path = os.path.join(image_dir, f"{index:05d}{rng.getrandbits(64):016x}.jpg")
+        if os.path.exists(file_path):
+            continue
+        color = Image.new('RGB', size, tuple(rng.randrange(256) for _ in range(3)))
+        Image.composite(color, Image.new('RGB', size), gradient).save(file_path, quality=85)
+    return sorted(os.listdir(image_dir))[:count]
+
+
+def install_decode_counter():
+    """Hitung byte piksel yang di-decode PIL (ukuran x jumlah band) di proses ini."""
+    from PIL import ImageFile
+    counter = {'bytes': 0}
+    original_load = ImageFile.ImageFile.load
+
+    def counting_load(self):
+        pending = bool(self.tile) # tile kosong = piksel sudah di-decode sebelumnya
+        result = original_load(self)
+        if pending:
+            counter['bytes'] += self.width * self.height * len(self.getbands())
+        return result
+
+    ImageFile.ImageFile.load = counting_load
+    return counter
+
+
+def peak_rss_mb():
+    # Linux melaporkan ru_maxrss dalam KB, macOS dalam byte
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+
+
+def run_worker(app, image_dir, count, reruns, backend):
+    """Jalankan satu aplikasi terhadap galeri berisi count foto; kembalikan dict hasil."""
+    work_dir = tempfile.mkdtemp(prefix="bench_galeri_")
+    os.chdir(work_dir) # Cache (.cache_galeri_wdf) dan folder upload dibuat di sini, selalu dingin
+    sys.path.insert(0, REPO_DIR)
+    filenames = sorted(os.listdir(image_dir))[:count]
+    api_log = None
+
+    if app == "test.py":
+        upload_folder = os.path.join(work_dir, "uploads_galeri_wdf")
+        os.makedirs(upload_folder)
+        for filename in filenames:
+            shutil.copyfile(os.path.join(image_dir, filename), os.path.join(upload_folder, filename))
+    elif backend == "git":
+        from storage import LocalGitStorage
+        files = {}
+        for filename in filenames:
+            with open(os.path.join(image_dir, filename), "rb") as f:
+                files[filename] = f.read()
+        LocalGitStorage(os.path.join(work_dir, "galeri.git"), GITHUB_UPLOAD_PATH).batch("Seed", lambda read_file: (files, []))
+        os.environ.update(GALLERY_STORAGE="git", GALLERY_GIT_PATH=os.path.join(work_dir, "galeri.git"))
+    else:
+        from fake_github import FakeGitHubServer
+        server = FakeGitHubServer().start()
+        fake_repo = server.add_repo("bench", "galeri")
+        files = {}
+        for filename in filenames:
+            with open(os.path.join(image_dir, filename), "rb") as f:
+                files[f"{GITHUB_UPLOAD_PATH}/{filename}"] = f.read()
+        fake_repo.put_many(files)
+        os.environ.update(GALLERY_STORAGE="github", GITHUB_TOKEN="bench", GITHUB_REPO_OWNER="bench",
+                          GITHUB_REPO_NAME="galeri", GITHUB_API_URL=server.base_url)
+        api_log = server.request_log
+
+    from streamlit.testing.v1 import AppTest
+    decoded = install_decode_counter()
+    at = AppTest.from_file(os.path.join(REPO_DIR, app), default_timeout=600)
+
+    runs = []
+    for index in range(reruns + 1): # Run pertama = dingin, sisanya rerun hangat
+        api_before = len(api_log) if api_log is not None else 0
+        decoded_before = decoded['bytes']
+        started = time.perf_counter()
+        at.run()
+        runs.append({
+            'seconds': time.perf_counter() - started,
+            'api_calls': (len(api_log) - api_before) if api_log is not None else 0,
+            'bytes_decoded': decoded['bytes'] - decoded_before,
+            'errors': [str(element.value) for element in list(at.exception) + list(at.error)],
+        })
+
+    warm = runs[1:]
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        'app': app,
+        'images': count,
+        'backend': "local" if app == "test.py" else backend,
+        'cold': runs[0],
+        'warm': {
+            'reruns': len(warm),
+            'median_seconds': statistics.median(run['seconds'] for run in warm) if warm else None,
+            'max_seconds': max(run['seconds'] for run in warm) if warm else None,
+            'api_calls_per_rerun': statistics.mean(run['api_calls'] for run in warm) if warm else None,
+            'bytes_decoded_per_rerun': statistics.mean(run['bytes_decoded'] for run in warm) if warm else None,
+        },
+        'peak_rss_mb': peak_rss_mb(),
+        'errors': sorted({error for run in runs for error in run['errors']}),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(apps, sizes, reruns, backend, image_dir):
+    generate_images(image_dir, max(sizes))
+    results = []
+    for app in apps:
+        for count in sizes:
+            print(f"[bench] {app} dengan {count} foto...", file=sys.stderr)
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", app, "--images", str(count),
+                 "--reruns", str(reruns), "--backend", backend, "--image-dir", image_dir],
+                capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                results.append({'app': app, 'images': count, 'failed': completed.stderr.strip()[-2000:]})
+                continue
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'reruns': reruns,
+        'results': results,
+    }
+
+
+def print_table(report):
+    print(f"{'app':<10} {'foto':>6} {'dingin s':>9} {'rerun s':>9} {'API/rerun':>10} {'MB decode/rerun':>16} {'RSS MB':>8}")
+    for result in report['results']:
+        if 'failed' in result:
+            print(f"{result['app']:<10} {result['images']:>6}  GAGAL: {result['failed'].splitlines()[-1] if result['failed'] else ''}")
+            continue
+        warm = result['warm']
+        print(
+            f"{result['app']:<10} {result['images']:>6} {result['cold']['seconds']:>9.3f} "
+            f"{warm['median_seconds'] or 0:>9.3f} {warm['api_calls_per_rerun'] or 0:>10.1f} "
+            f"{(warm['bytes_decoded_per_rerun'] or 0) / (1024 * 1024):>16.2f} {result['peak_rss_mb']:>8.0f}"
+        )
+        for error in result['errors']:
+            print(f"{'':<10} galat: {error[:120]}")
+
+
+def compare_reports(old_path, new_path):
+    """Bandingkan dua file hasil; cetak perubahan waktu rerun hangat per aplikasi x ukuran."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_results = {(r['app'], r['images']): r for r in old['results'] if 'failed' not in r}
+    print(f"{'app':<10} {'foto':>6} {old['commit'] or 'lama':>10} {new['commit'] or 'baru':>10} {'perubahan':>10}")
+    for result in new['results']:
+        previous = old_results.get((result['app'], result['images']))
+        if previous is None or 'failed' in result:
+            continue
+        before, after = previous['warm']['median_seconds'], result['warm']['median_seconds']
+        change = 100.0 * (after - before) / before if before else 0.0
+        print(f"{result['app']:<10} {result['images']:>6} {before:>10.3f} {after:>10.3f} {change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark waktu rerun galeri terhadap jumlah foto.")
+    parser.add_argument("--apps", nargs="+", default=DEFAULT_APPS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--reruns", type=int, default=DEFAULT_RERUNS, help="Jumlah rerun hangat setelah run pertama")
+    parser.add_argument("--backend", choices=["fake-github", "git"], default="fake-github",
+                        help="Pengganti GitHub untuk test1.py/test2.py")
+    parser.add_argument("--image-dir", default=os.path.join(tempfile.gettempdir(), "bench_galeri_images"),
+                        help="Folder foto sintetis (dipakai ulang antar benchmark)")
+    parser.add_argument("--output", help="Simpan hasil JSON ke file ini (default: bench_results/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("LAMA", "BARU"), help="Bandingkan dua file hasil")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--images", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.image_dir, args.images, args.reruns, args.backend)))
+        return
+
+    report = run_suite(args.apps, args.sizes, args.reruns, args.backend, args.image_dir)
+    output = args.output or os.path.join(REPO_DIR, "bench_results", f"{report['commit'] or 'hasil'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print_table(report)
+    print(f"\nHasil disimpan di {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import re
+import bisect
+import threading
+import unicodedata
+from caption_store import CAPTION_DIR, LEGACY_CAPTIONS_FILE, shard_name
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize_text(text):
+    """Huruf kecil tanpa diakritik, sehingga "Kemah", "kemah", dan "kémah" dianggap sama."""
+    decomposed = unicodedata.normalize('NFKD', text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text):
+    """Kata-kata dalam teks yang sudah dinormalkan; kata ulang ("anak-anak") dipecah di tanda hubung."""
+    return TOKEN_PATTERN.findall(normalize_text(text))
+
+
+def is_caption_file(name):
+    return name == LEGACY_CAPTIONS_FILE or (name.startswith(f"{CAPTION_DIR}/") and name.endswith(".json"))
+
+
+class CaptionSearchIndex:
+    """Indeks terbalik (kata -> nama foto) atas seluruh caption galeri, untuk pencarian cepat.
+
+    Dibangun sekali dari semua shard caption lewat sync(), lalu diperbarui per shard: setiap
+    penyimpanan dari proses ini memanggil update_shard() dengan shard yang baru di-commit,
+    dan sync() berikutnya hanya membaca shard yang SHA-nya berubah (misalnya diubah replika
+    lain). Setiap kata di query dicocokkan sebagai awalan kata caption; semua kata harus cocok.
+    Satu instance aman dipakai bersama oleh banyak sesi (thread).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shards = {} # nama shard -> (sha, dict caption)
+        self._postings = {} # kata -> set nama foto
+        self._vocabulary = [] # kata terurut, untuk pencarian awalan dengan bisect
+        self._file_tokens = {} # nama foto -> set kata
+        self.built = False
+
+    def _caption_for(self, filename):
+        shard = self._shards.get(shard_name(filename))
+        if shard is not None and filename in shard[1]:
+            return shard[1][filename]
+        legacy = self._shards.get(LEGACY_CAPTIONS_FILE)
+        return legacy[1].get(filename) if legacy is not None else None # Sama seperti load_captions
+
+    def _reindex(self, filename):
+        tokens = set(tokenize(self._caption_for(filename)))
+        previous = self._file_tokens.get(filename, set())
+        for token in previous - tokens:
+            posting = self._postings[token]
+            posting.discard(filename)
+            if not posting:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+        for token in tokens - previous:
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = set()
+                bisect.insort(self._vocabulary, token)
+            posting.add(filename)
+        if tokens:
+            self._file_tokens[filename] = tokens
+        else:
+            self._file_tokens.pop(filename, None)
+
+    def _apply_shard(self, name, sha, captions):
+        previous = self._shards.get(name)
+        affected = set(previous[1]) if previous is not None else set()
+        if captions:
+            self._shards[name] = (sha, dict(captions))
+            affected.update(captions)
+        else:
+            self._shards.pop(name, None)
+        for filename in affected:
+            self._reindex(filename)
+
+    def sync(self, file_shas, read_captions):
+        """Samakan indeks dengan file_shas (nama file -> SHA blob, dari StorageBackend.list()).
+
+        read_captions(sha) -> dict caption (misalnya lewat CaptionCache). Hanya shard yang baru
+        atau SHA-nya berubah yang dibaca. Kembalikan jumlah shard yang dibaca.
+        """
+        current = {name: sha for name, sha in file_shas.items() if is_caption_file(name)}
+        with self._lock:
+            changed = [name for name, sha in current.items() if self._shards.get(name, (None,))[0] != sha]
+            removed = [name for name in self._shards if name not in current]
+        loaded = {name: read_captions(current[name]) for name in changed} # Dibaca di luar lock
+        with self._lock:
+            for name, captions in loaded.items():
+                self._apply_shard(name, current[name], captions)
+            for name in removed:
+                self._apply_shard(name, None, None)
+            self.built = True
+        return len(loaded)
+
+    def update_shard(self, name, sha, captions):
+        """Terapkan shard yang baru saja di-commit (captions kosong = shard dihapus)."""
+        with self._lock:
+            if self.built: # Belum dibangun: sync() pertama akan membaca versi terbaru
+                self._apply_shard(name, sha, captions)
+
+    def search(self, query):
+        """Nama foto yang caption-nya memuat semua kata query (sebagai awalan kata)."""
+        tokens = tokenize(query)
+        if not tokens:
+            return set()
+        with self._lock:
+            results = None
+            for token in sorted(set(tokens), key=len, reverse=True): # Kata terpanjang biasanya paling selektif
+                matches = set()
+                position = bisect.bisect_left(self._vocabulary, token)
+                while position < len(self._vocabulary) and self._vocabulary[position].startswith(token):
+                    matches.update(self._postings[self._vocabulary[position]])
+                    position += 1
+                results = matches if results is None else results & matches
+                if not results:
+                    break
+            return results
+
+    def stats(self):
+        with self._lock:
+            return {'shards': len(self._shards), 'captions': len(self._file_tokens), 'tokens': len(self._vocabulary)}
@@ -0,0 +1,157 @@
+import json
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from image_proxy import git_blob_sha
+
+CAPTION_DIR = "captions" # Sub-folder (di samping foto) berisi shard caption
+LEGACY_CAPTIONS_FILE = "captions.json" # Format lama: satu file untuk seluruh galeri
+SHARD_PREFIX_LEN = 2 # 256 shard; satu edit hanya menulis ulang ~1/256 dari seluruh caption
+CAPTION_CACHE_MAX_ENTRIES = 1024 # Shard (atau captions.json lama) hasil parse yang disimpan di memori
+
+
+def parse_captions(raw_bytes):
+    """Mengubah isi file caption menjadi dict (termasuk format lama yang ter-encode base64 dua kali)."""
+    text = raw_bytes.decode('utf-8').strip()
+    if not text:
+        return {}
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(base64.b64decode(text).decode('utf-8'))
+
+
+def shard_name(filename):
+    """Shard tempat caption sebuah foto disimpan, misalnya "captions/3f.json".
+
+    Dipilih dari hash nama file (bukan awalan nama) agar sebaran merata untuk nama apa pun.
+    """
+    digest = hashlib.sha1(filename.encode('utf-8')).hexdigest()
+    return f"{CAPTION_DIR}/{digest[:SHARD_PREFIX_LEN]}.json"
+
+
+def serialize_shard(captions):
+    return json.dumps(captions, indent=1, sort_keys=True, ensure_ascii=False) + "\n"
+
+
+def merge_caption(existing, addition):
+    """Gabungkan caption baru ke caption yang sudah ada (misalnya foto sama diunggah orang lain)."""
+    if not addition or addition == existing or (existing and addition in existing.split(" · ")):
+        return existing
+    return f"{existing} · {addition}" if existing else addition
+
+
+def build_caption_changes(read_file, caption_updates, caption_appends=None):
+    """Hitung perubahan file untuk caption_updates (nama file -> caption, None untuk menghapus).
+
+    caption_appends (nama file -> caption) digabung ke caption yang sudah ada lewat merge_caption,
+    bukan menggantinya.
+
+    read_file(name) -> bytes atau None membaca isi file (nama relatif terhadap folder galeri)
+    pada versi yang sedang diubah (lihat StorageBackend.batch).
+    Hanya shard yang tersentuh yang dibaca dan ditulis ulang. Jika captions.json lama masih ada,
+    isinya dipindahkan ke shard dan file lama dihapus dalam commit yang sama (sekali saja).
+    Mengembalikan (puts, deletes, shards): shards adalah nama shard -> dict caption setelah update.
+    """
+    legacy_raw = read_file(LEGACY_CAPTIONS_FILE)
+    legacy_captions = parse_captions(legacy_raw) if legacy_raw else {}
+
+    caption_appends = caption_appends or {}
+    touched = {shard_name(filename) for filename in list(caption_updates) + list(caption_appends)}
+    touched.update(shard_name(filename) for filename in legacy_captions)
+    shards = {}
+    existing = set()
+    for name in sorted(touched):
+        raw_shard = read_file(name)
+        if raw_shard is not None:
+            existing.add(name)
+        shards[name] = parse_captions(raw_shard) if raw_shard else {}
+
+    for filename, caption in legacy_captions.items():
+        shards[shard_name(filename)].setdefault(filename, caption) # Shard lebih baru dari file lama
+    for filename, caption in caption_updates.items():
+        if caption is None:
+            shards[shard_name(filename)].pop(filename, None)
+        else:
+            shards[shard_name(filename)][filename] = caption
+    for filename, caption in caption_appends.items():
+        shard = shards[shard_name(filename)]
+        merged = merge_caption(shard.get(filename), caption)
+        if merged:
+            shard[filename] = merged
+
+    puts, deletes = {}, []
+    for name, captions in shards.items():
+        if captions:
+            puts[name] = serialize_shard(captions)
+        elif name in existing:
+            deletes.append(name) # Shard kosong tidak disimpan
+    if legacy_raw is not None:
+        deletes.append(LEGACY_CAPTIONS_FILE)
+    return puts, deletes, shards
+
+
+class CaptionCache:
+    """Cache shard caption hasil parse untuk seluruh proses, dikunci dengan SHA blob.
+
+    Isi blob dengan SHA tertentu tidak pernah berubah, jadi entri tidak perlu divalidasi:
+    jika replika lain mengubah sebuah shard, snapshot listing membawa SHA baru dan entri lama
+    tidak dipakai lagi (lalu tergeser oleh LRU). Setelah proses ini menyimpan, shard baru
+    dimasukkan langsung lewat put() (write-through) sehingga tidak perlu diunduh ulang.
+    """
+
+    def __init__(self, max_entries=CAPTION_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # sha -> dict caption, urutan = LRU (terlama di depan)
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, sha, read_blob):
+        with self._lock:
+            captions = self._entries.get(sha)
+            if captions is not None:
+                self._entries.move_to_end(sha)
+                self.stats['hits'] += 1
+                return captions
+        captions = parse_captions(read_blob(sha)) # Dibaca di luar lock agar sesi lain tidak menunggu
+        with self._lock:
+            self.stats['misses'] += 1
+            self._store(sha, captions)
+        return captions
+
+    def put(self, serialized, captions):
+        """Simpan shard yang baru ditulis proses ini, dengan kunci SHA dari isi yang di-commit."""
+        with self._lock:
+            self._store(git_blob_sha(serialized.encode('utf-8')), captions)
+
+    def _store(self, sha, captions):
+        self._entries[sha] = captions
+        self._entries.move_to_end(sha)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def load_captions(filenames, file_shas, read_blob, cache=None):
+    """Muat caption untuk filenames saja, dengan membaca hanya shard yang dibutuhkan.
+
+    file_shas adalah nama file relatif (dari StorageBackend.list()) -> SHA blob, read_blob(sha) -> bytes.
+    Dengan cache (CaptionCache), shard yang SHA-nya sudah dikenal tidak dibaca dan di-parse ulang.
+    Caption di captions.json lama (jika belum dimigrasi) dipakai sebagai cadangan.
+    """
+    def read_captions(sha):
+        return cache.get(sha, read_blob) if cache is not None else parse_captions(read_blob(sha))
+
+    filenames = set(filenames)
+    captions = {}
+    legacy_sha = file_shas.get(LEGACY_CAPTIONS_FILE)
+    if legacy_sha:
+        legacy_captions = read_captions(legacy_sha)
+        captions.update((filename, legacy_captions[filename]) for filename in filenames if filename in legacy_captions)
+    for name in {shard_name(filename) for filename in filenames}:
+        shard_sha = file_shas.get(name)
+        if not shard_sha:
+            continue
+        shard = read_captions(shard_sha)
+        captions.update((filename, shard[filename]) for filename in filenames if filename in shard)
+    return captions
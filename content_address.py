@@ -0,0 +1,47 @@
+import os
+import hashlib
+from image_proxy import git_blob_sha
+
+CONTENT_HASH_LENGTH = 32 # Karakter hex SHA-256 di nama file (128 bit, sepanjang nama UUID lama)
+HASH_CHUNK_SIZE = 1024 * 1024
+CANONICAL_EXTENSIONS = {'.jpeg': '.jpg', '.heic': '.jpg'} # HEIC disimpan sebagai JPEG
+
+
+def digest_stream(fileobj, chunk_size=HASH_CHUNK_SIZE):
+    """SHA-256 (hex) isi file-like, dibaca per potongan; posisi baca dikembalikan ke awal."""
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def digest_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_filename(original_filename, digest):
+    """Nama file content-addressed: awalan SHA-256 isi unggahan + ekstensi yang dinormalkan.
+
+    Isi yang sama selalu menghasilkan nama yang sama, apa pun nama file aslinya, sehingga
+    unggahan ganda bisa dikenali hanya dari nama sebelum apa pun ditulis.
+    """
+    ext = os.path.splitext(original_filename)[1].lower()
+    return f"{digest[:CONTENT_HASH_LENGTH]}{CANONICAL_EXTENSIONS.get(ext, ext)}"
+
+
+def find_duplicate(entries, filename, data=None):
+    """Nama foto di galeri yang isinya sama dengan unggahan, atau None.
+
+    entries adalah hasil StorageBackend.list(). Cocok jika nama content-addressed-nya sudah ada,
+    atau (untuk backend yang menyimpan SHA blob git) jika ada foto lama bernama UUID dengan isi
+    identik. Varian tampilan di sub-folder tidak ikut dicocokkan.
+    """
+    blob_sha = git_blob_sha(bytes(data)) if data is not None else None
+    for entry in entries:
+        if '/' in entry['name']:
+            continue
+        if entry['name'] == filename or (blob_sha is not None and entry.get('sha') == blob_sha):
+            return entry['name']
+    return None
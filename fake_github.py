@@ -0,0 +1,463 @@
+"""Server HTTP lokal yang meniru sebagian kecil GitHub REST API.
+
+Dipakai untuk menguji dan mengukur modul-modul GitHub (listing, batch commit, dsb.) tanpa
+jaringan dan tanpa memakai kuota rate limit. Rate limit GitHub bisa ditiru (FakeRateLimit)
+untuk menguji penjadwal kuota. Jalankan manual dengan:
+
+    python fake_github.py --port 8765 --seed gallery_images
+    python fake_github.py --rate-limit 100 --rate-window 60 --write-interval 1
+
+lalu set GITHUB_API_URL=http://127.0.0.1:8765 sebelum menjalankan aplikasi.
+"""
+import os
+import re
+import json
+import base64
+import hashlib
+import argparse
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def git_blob_sha(data):
+    """SHA blob dengan format yang sama seperti git (sha1 dari header + isi)."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _digest(*parts):
+    return hashlib.sha1("\n".join(parts).encode('utf-8')).hexdigest()
+
+
+class FakeRepo:
+    """Satu repositori di memori. Tree disimpan datar (path lengkap -> sha blob)."""
+
+    def __init__(self, owner, name, branch="main"):
+        self.owner = owner
+        self.name = name
+        self.branch = branch
+        self.lock = threading.RLock()
+        self.blobs = {}
+        self.trees = {}
+        self.commits = {}
+        empty_tree = self._store_tree({})
+        self.head = self._store_commit("Initial commit", empty_tree, [])
+
+    # --- Penyimpanan objek ---
+    def _store_blob(self, data):
+        sha = git_blob_sha(data)
+        self.blobs[sha] = data
+        return sha
+
+    def _store_tree(self, entries):
+        sha = _digest("tree", *(f"{path} {blob}" for path, blob in sorted(entries.items())))
+        self.trees[sha] = dict(entries)
+        return sha
+
+    def _store_commit(self, message, tree_sha, parents):
+        sha = _digest("commit", tree_sha, message, *parents, str(len(self.commits)))
+        self.commits[sha] = {'message': message, 'tree': tree_sha, 'parents': list(parents)}
+        return sha
+
+    @property
+    def files(self):
+        """Isi branch saat ini: path -> sha blob."""
+        return self.trees[self.commits[self.head]['tree']]
+
+    def read(self, path, ref=None):
+        with self.lock:
+            commit = self.commits.get(ref or self.head)
+            if commit is None and ref == self.branch:
+                commit = self.commits[self.head]
+            if commit is None:
+                return None
+            blob_sha = self.trees[commit['tree']].get(path.strip('/'))
+            return None if blob_sha is None else self.blobs[blob_sha]
+
+    # --- Helper untuk menyiapkan data uji (masing-masing satu commit) ---
+    def put(self, path, data):
+        with self.lock:
+            entries = dict(self.files)
+            entries[path.strip('/')] = self._store_blob(bytes(data))
+            self.head = self._store_commit(f"Put {path}", self._store_tree(entries), [self.head])
+
+    def put_many(self, files):
+        with self.lock:
+            entries = dict(self.files)
+            for path, data in files.items():
+                entries[path.strip('/')] = self._store_blob(bytes(data))
+            self.head = self._store_commit(f"Put {len(files)} files", self._store_tree(entries), [self.head])
+
+    def delete(self, path):
+        with self.lock:
+            entries = dict(self.files)
+            entries.pop(path.strip('/'), None)
+            self.head = self._store_commit(f"Delete {path}", self._store_tree(entries), [self.head])
+
+    def list_dir(self, path):
+        """Entri langsung di bawah path: daftar (nama, tipe, sha, ukuran)."""
+        prefix = f"{path.strip('/')}/" if path.strip('/') else ""
+        entries = {}
+        with self.lock:
+            for file_path, blob_sha in self.files.items():
+                if not file_path.startswith(prefix):
+                    continue
+                rest = file_path[len(prefix):]
+                if '/' in rest:
+                    dirname = rest.split('/', 1)[0]
+                    entries[dirname] = (dirname, "tree", None, None)
+                else:
+                    entries[rest] = (rest, "blob", blob_sha, len(self.blobs[blob_sha]))
+            for dirname, (_, kind, _, _) in list(entries.items()):
+                if kind == "tree":
+                    entries[dirname] = (dirname, "tree", self.tree_sha(prefix + dirname), None)
+        return [entries[name] for name in sorted(entries)]
+
+    def tree_sha(self, path):
+        return _digest("dir", *(f"{kind} {name} {sha}" for name, kind, sha, _ in self.list_dir(path)))
+
+
+class FakeRateLimit:
+    """Tiruan rate limit GitHub: kuota primer per jendela waktu plus rate limit sekunder untuk tulis.
+
+    Setiap respons membawa header X-RateLimit-*. Jika kuota habis, request dijawab 403 dengan
+    X-RateLimit-Remaining: 0; tulis (POST/PATCH/PUT/DELETE) yang datang kurang dari
+    write_interval detik setelah tulis sebelumnya dijawab 403 dengan Retry-After.
+    """
+
+    def __init__(self, limit=5000, window=3600, write_interval=0.0, retry_after=1):
+        self.limit = limit
+        self.window = window
+        self.write_interval = write_interval
+        self.retry_after = retry_after
+        self.used = 0
+        self.reset_at = int(time.time()) + window
+        self.last_write = None
+        self.rejected = {'primary': 0, 'secondary': 0}
+        self._lock = threading.Lock()
+
+    def _headers(self):
+        return {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(self.limit - self.used, 0)),
+            "X-RateLimit-Reset": str(self.reset_at),
+            "X-RateLimit-Used": str(self.used),
+            "X-RateLimit-Resource": "core",
+        }
+
+    def check(self, method):
+        """Catat satu request; kembalikan (header, None) atau (header, (status, pesan)) jika ditolak."""
+        with self._lock:
+            now = time.time()
+            if now >= self.reset_at:
+                self.used = 0
+                self.reset_at = int(now) + self.window
+            if self.used >= self.limit:
+                self.rejected['primary'] += 1
+                return self._headers(), (403, "API rate limit exceeded")
+            if method != "GET" and self.write_interval and self.last_write is not None \
+                    and now - self.last_write < self.write_interval:
+                self.rejected['secondary'] += 1
+                return dict(self._headers(), **{"Retry-After": str(self.retry_after)}), \
+                    (403, "You have exceeded a secondary rate limit. Please wait a few minutes before you try again.")
+            self.used += 1
+            if method != "GET":
+                self.last_write = now
+            return self._headers(), None
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    server_version = "FakeGitHub/1.0"
+    protocol_version = "HTTP/1.1" # Keep-alive seperti GitHub sungguhan
+
+    ROUTES = [
+        ("GET", r"/users/([^/]+)", "_get_user"),
+        ("GET", r"/repos/([^/]+)/([^/]+)", "_get_repo"),
+        ("GET", r"/repos/([^/]+)/([^/]+)/git/trees/([^:/]+):(.+)", "_get_tree"),
+        ("GET", r"/repos/([^/]+)/([^/]+)/git/ref/heads/(.+)", "_get_ref"),
+        ("PATCH", r"/repos/([^/]+)/([^/]+)/git/refs/heads/(.+)", "_patch_ref"),
+        ("GET", r"/repos/([^/]+)/([^/]+)/git/commits/([0-9a-f]+)", "_get_commit"),
+        ("POST", r"/repos/([^/]+)/([^/]+)/git/commits", "_post_commit"),
+        ("GET", r"/repos/([^/]+)/([^/]+)/git/blobs/([0-9a-f]+)", "_get_blob"),
+        ("POST", r"/repos/([^/]+)/([^/]+)/git/blobs", "_post_blob"),
+        ("POST", r"/repos/([^/]+)/([^/]+)/git/trees", "_post_tree"),
+        ("GET", r"/repos/([^/]+)/([^/]+)/contents/(.+)", "_get_contents"),
+    ]
+
+    def log_message(self, format, *args):
+        pass # Jangan kotori output benchmark/test
+
+    # --- Utilitas respons ---
+    def end_headers(self):
+        for name, value in getattr(self, 'rate_headers', {}).items():
+            self.send_header(name, value)
+        super().end_headers()
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_status(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _api(self, path):
+        return f"{self.server.base_url}{path}"
+
+    def _dispatch(self):
+        self.server.record(self.command, self.path)
+        self.rate_headers = {}
+        if self.server.rate_limit is not None:
+            self.rate_headers, rejection = self.server.rate_limit.check(self.command)
+            if rejection is not None:
+                self.rfile.read(int(self.headers.get("Content-Length") or 0)) # Buang body agar koneksi tetap bisa dipakai
+                status, message = rejection
+                return self._send_json(status, {"message": message, "documentation_url": "https://docs.github.com/rest/rate-limit"})
+        path, _, query = self.path.partition('?')
+        self.query = dict(part.split('=', 1) for part in query.split('&') if '=' in part)
+        for method, pattern, handler_name in self.ROUTES:
+            if method != self.command:
+                continue
+            match = re.fullmatch(pattern, path)
+            if not match:
+                continue
+            repo = None
+            groups = match.groups()
+            if pattern.startswith("/repos/"):
+                repo = self.server.repos.get(groups[:2])
+                if repo is None:
+                    return self._send_json(404, {"message": "Not Found"})
+                with repo.lock:
+                    return getattr(self, handler_name)(repo, *groups[2:])
+            return getattr(self, handler_name)(*groups)
+        self._send_json(404, {"message": "Not Found"})
+
+    do_GET = _dispatch
+    do_POST = _dispatch
+    do_PATCH = _dispatch
+
+    # --- Endpoint ---
+    def _get_user(self, login):
+        self._send_json(200, {"login": login, "type": "User", "url": self._api(f"/users/{login}")})
+
+    def _repo_json(self, repo):
+        return {
+            "name": repo.name,
+            "full_name": f"{repo.owner}/{repo.name}",
+            "owner": {"login": repo.owner},
+            "default_branch": repo.branch,
+            "private": False,
+            "url": self._api(f"/repos/{repo.owner}/{repo.name}"),
+        }
+
+    def _get_repo(self, repo):
+        self._send_json(200, self._repo_json(repo))
+
+    def _get_tree(self, repo, ref, dir_path):
+        entries = repo.list_dir(dir_path)
+        if not entries:
+            return self._send_json(404, {"message": "Not Found"})
+        if self.query.get("recursive"):
+            entries = entries + [
+                (f"{name}/{sub_name}", kind, sha, size)
+                for name, dir_kind, _, _ in entries if dir_kind == "tree"
+                for sub_name, kind, sha, size in repo.list_dir(f"{dir_path}/{name}")
+            ]
+        sha = repo.tree_sha(dir_path)
+        etag = f'"{sha}"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._send_status(304, {"ETag": etag})
+        tree = [
+            {"path": entry_name, "mode": "040000" if kind == "tree" else "100644", "type": kind,
+             "sha": entry_sha, **({"size": size} if size is not None else {})}
+            for entry_name, kind, entry_sha, size in entries
+        ]
+        self._send_json(200, {"sha": sha, "tree": tree, "truncated": False}, {"ETag": etag})
+
+    def _ref_json(self, repo, branch):
+        return {
+            "ref": f"refs/heads/{branch}",
+            "url": self._api(f"/repos/{repo.owner}/{repo.name}/git/refs/heads/{branch}"),
+            "object": {"sha": repo.head, "type": "commit",
+                       "url": self._api(f"/repos/{repo.owner}/{repo.name}/git/commits/{repo.head}")},
+        }
+
+    def _get_ref(self, repo, branch):
+        if branch != repo.branch:
+            return self._send_json(404, {"message": "Not Found"})
+        self._send_json(200, self._ref_json(repo, branch))
+
+    def _patch_ref(self, repo, branch):
+        body = self._read_json()
+        commit = repo.commits.get(body.get("sha"))
+        if branch != repo.branch or commit is None:
+            return self._send_json(422, {"message": "Reference update failed"})
+        if not body.get("force") and repo.head not in commit['parents']:
+            return self._send_json(422, {"message": "Update is not a fast forward"})
+        repo.head = body["sha"]
+        self._send_json(200, self._ref_json(repo, branch))
+
+    def _commit_json(self, repo, sha):
+        commit = repo.commits[sha]
+        base = f"/repos/{repo.owner}/{repo.name}/git"
+        return {
+            "sha": sha,
+            "url": self._api(f"{base}/commits/{sha}"),
+            "message": commit['message'],
+            "tree": {"sha": commit['tree'], "url": self._api(f"{base}/trees/{commit['tree']}")},
+            "parents": [{"sha": parent, "url": self._api(f"{base}/commits/{parent}")} for parent in commit['parents']],
+        }
+
+    def _get_commit(self, repo, sha):
+        if sha not in repo.commits:
+            return self._send_json(404, {"message": "Not Found"})
+        self._send_json(200, self._commit_json(repo, sha))
+
+    def _post_commit(self, repo):
+        body = self._read_json()
+        if body.get("tree") not in repo.trees or any(parent not in repo.commits for parent in body.get("parents", [])):
+            return self._send_json(422, {"message": "Invalid tree or parent"})
+        sha = repo._store_commit(body.get("message", ""), body["tree"], body.get("parents", []))
+        self._send_json(201, self._commit_json(repo, sha))
+
+    def _get_blob(self, repo, sha):
+        data = repo.blobs.get(sha)
+        if data is None:
+            return self._send_json(404, {"message": "Not Found"})
+        if self.headers.get("Accept", "").startswith("application/vnd.github.raw"):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            return self.wfile.write(data)
+        self._send_json(200, {
+            "sha": sha,
+            "size": len(data),
+            "encoding": "base64",
+            "content": base64.b64encode(data).decode('ascii'),
+            "url": self._api(f"/repos/{repo.owner}/{repo.name}/git/blobs/{sha}"),
+        })
+
+    def _post_blob(self, repo):
+        body = self._read_json()
+        content = body.get("content", "")
+        data = base64.b64decode(content) if body.get("encoding") == "base64" else content.encode('utf-8')
+        sha = repo._store_blob(data)
+        self._send_json(201, {"sha": sha, "url": self._api(f"/repos/{repo.owner}/{repo.name}/git/blobs/{sha}")})
+
+    def _post_tree(self, repo):
+        body = self._read_json()
+        entries = dict(repo.trees.get(body.get("base_tree"), {}))
+        for item in body.get("tree", []):
+            path = item["path"].strip('/')
+            if "content" in item:
+                entries[path] = repo._store_blob(item["content"].encode('utf-8'))
+            elif item.get("sha") is None:
+                if path not in entries:
+                    return self._send_json(422, {"message": f"Path {path} does not exist in base tree"})
+                del entries[path]
+            elif item["sha"] in repo.blobs:
+                entries[path] = item["sha"]
+            else:
+                return self._send_json(422, {"message": f"Unknown blob {item['sha']}"})
+        sha = repo._store_tree(entries)
+        tree = [{"path": path, "mode": "100644", "type": "blob", "sha": blob} for path, blob in sorted(entries.items())]
+        self._send_json(201, {"sha": sha, "tree": tree, "url": self._api(f"/repos/{repo.owner}/{repo.name}/git/trees/{sha}")})
+
+    def _get_contents(self, repo, path):
+        data = repo.read(path, self.query.get("ref"))
+        if data is None:
+            return self._send_json(404, {"message": "Not Found"})
+        self._send_json(200, {
+            "type": "file",
+            "encoding": "base64",
+            "name": path.rsplit('/', 1)[-1],
+            "path": path,
+            "size": len(data),
+            "sha": git_blob_sha(data),
+            "content": base64.b64encode(data).decode('ascii'),
+            "url": self._api(f"/repos/{repo.owner}/{repo.name}/contents/{path}"),
+        })
+
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    """Server fake yang berjalan di thread latar belakang; base_url siap dipakai sebagai api_url."""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, rate_limit=None):
+        super().__init__((host, port), FakeGitHubHandler)
+        self.rate_limit = rate_limit # FakeRateLimit, atau None untuk tanpa batas
+        self.repos = {}
+        self.request_log = []
+        self._log_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_repo(self, owner, name, branch="main"):
+        repo = FakeRepo(owner, name, branch)
+        self.repos[(owner, name)] = repo
+        return repo
+
+    def record(self, method, path):
+        with self._log_lock:
+            self.request_log.append((method, path))
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-github", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jalankan server fake GitHub lokal.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--owner", default=os.getenv("GITHUB_REPO_OWNER", "owner"))
+    parser.add_argument("--repo", default=os.getenv("GITHUB_REPO_NAME", "repo"))
+    parser.add_argument("--seed", help="Folder lokal yang isinya disalin ke repo fake (path yang sama)")
+    parser.add_argument("--rate-limit", type=int, help="Tiru rate limit primer: jumlah request per jendela")
+    parser.add_argument("--rate-window", type=int, default=3600, help="Panjang jendela rate limit (detik)")
+    parser.add_argument("--write-interval", type=float, default=0.0,
+                        help="Tiru rate limit sekunder: jeda minimum antar-request tulis (detik)")
+    args = parser.parse_args()
+
+    rate_limit = None
+    if args.rate_limit or args.write_interval:
+        rate_limit = FakeRateLimit(args.rate_limit or 5000, args.rate_window, args.write_interval)
+    server = FakeGitHubServer(port=args.port, rate_limit=rate_limit)
+    repo = server.add_repo(args.owner, args.repo)
+    if args.seed:
+        seed_files = {}
+        for filename in sorted(os.listdir(args.seed)):
+            file_path = os.path.join(args.seed, filename)
+            if os.path.isfile(file_path):
+                with open(file_path, "rb") as f:
+                    seed_files[f"{args.seed.strip('/')}/{filename}"] = f.read()
+        repo.put_many(seed_files)
+    print(f"Fake GitHub berjalan di {server.base_url} untuk {args.owner}/{args.repo}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import os
+from urllib.parse import quote
+import streamlit as st
+import streamlit.components.v1 as components
+from thumbnail_cache import THUMBNAIL_SIZES
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gallery_grid_frontend")
+DEFAULT_ASPECT_RATIO = "4 / 3" # Kotak gambar berukuran tetap; foto di-crop agar mengisi kotak
+NARROW_SCREEN_PX = 640 # Di bawah lebar ini grid paling banyak 2 kolom (lihat CSS di index.html)
+EAGER_ROWS = 1 # Baris pertama tidak di-lazy-load agar gambar pertama secepatnya tampil
+
+_gallery_grid_component = components.declare_component("gallery_grid", path=FRONTEND_DIR)
+
+
+def image_sizes(num_cols):
+    """Atribut sizes: lebar satu kolom grid, sehingga browser memilih varian srcset terkecil yang cukup tajam."""
+    return f"(max-width: {NARROW_SCREEN_PX}px) calc(100vw / {min(num_cols, 2)}), calc(100vw / {num_cols})"
+
+
+def proxy_item(base_url, name, original_sha, display_sha, caption=None, sizes=None):
+    """Item grid untuk foto yang dilayani ImageProxyServer di base_url.
+
+    srcset berisi semua varian thumbnail (lebar = sisi terpanjang varian); tautan unduh
+    mengarah ke blob asli dengan nama file aslinya.
+    """
+    blobs_url = f"{base_url.rstrip('/')}/blobs"
+    variants = sorted((sizes or THUMBNAIL_SIZES).items(), key=lambda item: item[1])
+    return {
+        'name': name,
+        'src': f"{blobs_url}/{display_sha}/{variants[0][0]}",
+        'srcset': ", ".join(f"{blobs_url}/{display_sha}/{variant} {edge}w" for variant, edge in variants),
+        'download': f"{blobs_url}/{original_sha}?download={quote(name)}",
+        'caption': caption,
+    }
+
+
+def gallery_grid(items, num_cols, selection_mode=None, selected=(), aspect_ratio=DEFAULT_ASPECT_RATIO, key="gallery_grid"):
+    """Seluruh grid galeri sebagai satu komponen HTML (satu iframe, bukan satu elemen per foto).
+
+    Gambar memakai loading="lazy" dan srcset/sizes sesuai jumlah kolom, di dalam kotak
+    dengan rasio tetap. selection_mode None, "multiple" (mis. pilih untuk hapus), atau
+    "single" (mis. pilih untuk edit); selected adalah pilihan saat ini dari session state.
+    Kembalikan daftar nama terpilih yang baru hanya pada rerun yang dipicu klik di grid,
+    selain itu None.
+    """
+    value = _gallery_grid_component(
+        items=list(items),
+        num_cols=num_cols,
+        sizes=image_sizes(num_cols),
+        eager=num_cols * EAGER_ROWS,
+        selection_mode=selection_mode,
+        selected=sorted(selected),
+        aspect_ratio=aspect_ratio,
+        key=key,
+        default=None,
+    )
+    event_key = f"{key}_last_event"
+    if not value or value.get('event') == st.session_state.get(event_key):
+        return None # Nilai komponen tetap tersimpan antar-rerun; hanya event baru yang diteruskan
+    st.session_state[event_key] = value['event']
+    return value['selected']
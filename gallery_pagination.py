@@ -0,0 +1,91 @@
+import math
+import streamlit as st
+
+PAGE_SIZE_OPTIONS = [12, 24, 48, 96]
+DEFAULT_PAGE_SIZE = 24
+
+
+def page_size_selector(key="gallery"):
+    """Pilihan jumlah foto per halaman (disimpan di session state lewat key widget)."""
+    return st.selectbox(
+        "Foto per Halaman",
+        PAGE_SIZE_OPTIONS,
+        index=PAGE_SIZE_OPTIONS.index(DEFAULT_PAGE_SIZE),
+        key=f"{key}_page_size"
+    )
+
+
+def paginate(items, page_size, key="gallery"):
+    """Ambil jendela item yang terlihat saja.
+
+    Kursor disimpan sebagai nama file pertama di halaman, sehingga halaman yang sedang
+    dilihat tidak bergeser ketika ada foto baru diunggah. Jika foto kursor sudah dihapus,
+    posisi (offset) terakhir dipakai sebagai cadangan.
+    """
+    cursor_key = f"{key}_cursor"
+    offset_key = f"{key}_offset"
+    total = len(items)
+
+    start = st.session_state.get(offset_key, 0)
+    anchor = st.session_state.get(cursor_key)
+    if anchor is not None:
+        try:
+            start = items.index(anchor)
+        except ValueError:
+            pass # Foto kursor sudah tidak ada, pakai offset terakhir
+    start = max(0, min(start, (total - 1) if total else 0))
+
+    window = items[start:start + page_size]
+    st.session_state[cursor_key] = window[0] if window else None
+    st.session_state[offset_key] = start
+    return window, {
+        'key': key,
+        'items': items,
+        'start': start,
+        'page_size': page_size,
+        'total': total,
+    }
+
+
+def _move_cursor(key, items, new_start):
+    st.session_state[f"{key}_cursor"] = items[new_start] if items else None
+    st.session_state[f"{key}_offset"] = new_start
+
+
+def render_page_controls(page_info, position="bottom"):
+    """Tombol Sebelumnya/Berikutnya beserta keterangan halaman."""
+    key = page_info['key']
+    items = page_info['items']
+    start = page_info['start']
+    page_size = page_info['page_size']
+    total = page_info['total']
+    if total <= page_size and start == 0:
+        return
+
+    current_page = math.ceil(start / page_size) + 1
+    total_pages = current_page + math.ceil(max(total - start - page_size, 0) / page_size)
+    shown_until = min(start + page_size, total)
+
+    col_prev, col_info, col_next = st.columns([1, 4, 1])
+    with col_prev:
+        st.button(
+            "⬅️ Sebelumnya",
+            key=f"{key}_prev_{position}",
+            disabled=start == 0,
+            on_click=_move_cursor,
+            args=(key, items, max(0, start - page_size))
+        )
+    with col_info:
+        st.markdown(
+            f"<p style='text-align: center;'>Halaman {current_page} dari {total_pages} "
+            f"(foto {start + 1}–{shown_until} dari {total})</p>",
+            unsafe_allow_html=True
+        )
+    with col_next:
+        st.button(
+            "Berikutnya ➡️",
+            key=f"{key}_next_{position}",
+            disabled=start + page_size >= total,
+            on_click=_move_cursor,
+            args=(key, items, start + page_size)
+        )
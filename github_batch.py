@@ -0,0 +1,88 @@
+import time
+import base64
+import random
+from collections import namedtuple
+from github import GithubException, InputGitTreeElement, UnknownObjectException
+
+FILE_MODE = "100644"
+
+# Blob yang sudah dibuat lebih dulu (misalnya paralel oleh worker upload) dan tinggal dipasang di tree
+BlobRef = namedtuple('BlobRef', ['sha'])
+
+
+class GitBatchWriter:
+    """Menulis banyak perubahan file sebagai SATU commit lewat Git Data API.
+
+    Alur: baca ref -> buat blob -> buat tree di atas tree induk -> buat commit -> geser ref
+    (tanpa force). Jika ref sudah digeser proses lain (422, bukan fast-forward), perubahan
+    dibangun ulang di atas commit terbaru lalu dicoba lagi.
+    Dengan scheduler (RateLimitScheduler), setiap request melewati penjadwal kuota: tulis
+    diserialkan dan diantre, rate limit diulang dengan backoff.
+    """
+
+    def __init__(self, repo, branch=None, max_retries=4, scheduler=None):
+        self.repo = repo
+        self.branch = branch or repo.default_branch # Tanpa branch: branch default repositori (main, master, ...)
+        self.max_retries = max_retries
+        self.scheduler = scheduler
+        self.stats = {'commits': 0, 'conflicts': 0, 'blobs': 0}
+
+    def _call(self, kind, fn, *args, **kwargs):
+        if self.scheduler is None:
+            return fn(*args, **kwargs)
+        return self.scheduler.call(kind, fn, *args, **kwargs)
+
+    def create_blob(self, data):
+        """Unggah isi file sebagai blob (belum masuk commit). Aman dipanggil dari banyak thread."""
+        blob_sha = self._call("write", self.repo.create_git_blob, base64.b64encode(data).decode('ascii'), "base64").sha
+        self.stats['blobs'] += 1
+        return BlobRef(blob_sha)
+
+    def commit(self, message, build_changes):
+        """Buat satu commit berisi perubahan dari build_changes(read_file).
+
+        build_changes menerima read_file(path) -> bytes atau None (isi file di commit induk),
+        dan mengembalikan (puts, deletes): puts adalah dict path -> bytes, str (teks kecil yang
+        dikirim inline) atau BlobRef, deletes adalah daftar path yang dihapus.
+        Kembalikan GitCommit baru, atau None jika tidak ada perubahan.
+        """
+        blob_shas = {} # Blob yang sudah dibuat dipakai ulang saat retry
+        for attempt in range(self.max_retries + 1):
+            ref = self._call("read", self.repo.get_git_ref, f"heads/{self.branch}")
+            parent = self._call("read", self.repo.get_git_commit, ref.object.sha)
+
+            def read_file(path, parent_sha=parent.sha):
+                try:
+                    return self._call("read", self.repo.get_contents, path, ref=parent_sha).decoded_content
+                except UnknownObjectException:
+                    return None
+
+            puts, deletes = build_changes(read_file)
+            elements = []
+            for path, data in puts.items():
+                if isinstance(data, BlobRef):
+                    elements.append(InputGitTreeElement(path, FILE_MODE, "blob", sha=data.sha))
+                    continue
+                if isinstance(data, str):
+                    elements.append(InputGitTreeElement(path, FILE_MODE, "blob", content=data))
+                    continue
+                if path not in blob_shas or blob_shas[path][0] is not data:
+                    blob_shas[path] = (data, self.create_blob(data).sha)
+                elements.append(InputGitTreeElement(path, FILE_MODE, "blob", sha=blob_shas[path][1]))
+            for path in deletes:
+                elements.append(InputGitTreeElement(path, FILE_MODE, "blob", sha=None))
+            if not elements:
+                return None
+
+            tree = self._call("write", self.repo.create_git_tree, elements, parent.tree)
+            new_commit = self._call("write", self.repo.create_git_commit, message, tree, [parent])
+            try:
+                self._call("write", ref.edit, new_commit.sha) # Tanpa force: gagal jika branch sudah bergerak
+            except GithubException as e:
+                if e.status != 422 or attempt == self.max_retries:
+                    raise
+                self.stats['conflicts'] += 1
+                time.sleep(min(0.2 * (2 ** attempt), 3) * random.uniform(0.5, 1.5))
+                continue
+            self.stats['commits'] += 1
+            return new_commit
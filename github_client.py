@@ -0,0 +1,41 @@
+import requests
+from requests.adapters import HTTPAdapter
+from github import Auth, Github
+from github_listing import GITHUB_API_URL
+from github_scheduler import RateLimitedAdapter
+
+DEFAULT_POOL_SIZE = 10 # Koneksi keep-alive per host; samakan dengan jumlah worker upload + sesi aktif
+DEFAULT_TIMEOUT = 15 # detik per request
+
+
+def pooled_session(pool_size=DEFAULT_POOL_SIZE, scheduler=None):
+    """requests.Session dengan pool koneksi keep-alive sebesar pool_size (untuk listing dan cache blob).
+
+    Dengan scheduler (RateLimitScheduler), setiap request melewati penjadwal kuota bersama.
+    """
+    session = requests.Session()
+    if scheduler is not None:
+        adapter = RateLimitedAdapter(scheduler, pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def connect_repo(token, owner, repo_name, api_url=GITHUB_API_URL, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 scheduler=None):
+    """Buat client PyGithub dan handle repositori TANPA request ke GitHub.
+
+    Handle dibuat lazy (langsung dari owner/nama), berbeda dengan get_user().get_repo() yang
+    memakan dua request. Client dimaksudkan hidup selama proses (st.cache_resource) sehingga
+    koneksi HTTPS keep-alive di pool-nya dipakai ulang oleh semua sesi dan rerun.
+    Jika scheduler diberikan, jeda dan retry bawaan PyGithub dimatikan karena pengaturan kuota
+    dilakukan penjadwal (lihat GitBatchWriter); tanpa scheduler perilaku PyGithub tidak berubah.
+    Mengembalikan (client, repo).
+    """
+    throttling = {}
+    if scheduler is not None:
+        throttling = {'retry': None, 'seconds_between_requests': None, 'seconds_between_writes': None}
+    client = Github(auth=Auth.Token(token), base_url=api_url, pool_size=pool_size, timeout=timeout, **throttling)
+    return client, client.get_repo(f"{owner}/{repo_name}", lazy=True)
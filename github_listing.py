@@ -0,0 +1,131 @@
+import time
+import threading
+import requests
+
+GITHUB_API_URL = "https://api.github.com"
+DEFAULT_POLL_INTERVAL = 30 # detik antar pengecekan oleh poller latar belakang
+DEFAULT_MAX_STALENESS = 120 # detik; snapshot lebih tua dari ini disegarkan saat dibaca
+
+
+class GalleryListing:
+    """Snapshot isi satu folder repositori GitHub yang dibagi oleh semua sesi.
+
+    Satu thread poller menyegarkan snapshot memakai request bersyarat (If-None-Match),
+    sehingga jawaban 304 tidak memakan kuota rate limit. Daftar diambil dari Git Trees API
+    karena Contents API hanya mengembalikan maksimal 1.000 file per folder. Dengan
+    recursive=True, file di sub-folder ikut terdaftar dengan nama relatif (misalnya "web/a.webp").
+    """
+
+    def __init__(self, token, owner, repo_name, path, branch="main", api_url=GITHUB_API_URL,
+                 poll_interval=DEFAULT_POLL_INTERVAL, max_staleness=DEFAULT_MAX_STALENESS,
+                 session=None, timeout=10, recursive=False):
+        self.url = f"{api_url.rstrip('/')}/repos/{owner}/{repo_name}/git/trees/{branch}:{path}"
+        if recursive:
+            self.url += "?recursive=1"
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_staleness = max_staleness
+        self.timeout = timeout
+        self._session = session or requests.Session()
+        self._headers = {
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {token}",
+        }
+        self._lock = threading.Lock() # Menjaga agar hanya satu request berjalan pada satu waktu
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._entries = None
+        self._etag = None
+        self._checked_at = 0.0 # Waktu (monotonic) pengecekan terakhir yang berhasil
+        self.last_error = None
+        self.stats = {'requests': 0, 'not_modified': 0, 'updated': 0, 'errors': 0}
+
+    def start(self):
+        """Jalankan poller latar belakang (aman dipanggil berkali-kali)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._poll_loop, name="gallery-listing-poller", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def _poll_loop(self):
+        while not self._stopped.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                pass # Error sudah dicatat di last_error; snapshot lama tetap dipakai
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def refresh(self):
+        """Ambil daftar terbaru dari GitHub. Kembalikan True jika isinya berubah."""
+        with self._lock:
+            headers = dict(self._headers)
+            if self._etag and self._entries is not None:
+                headers["If-None-Match"] = self._etag
+            self.stats['requests'] += 1
+            try:
+                response = self._session.get(self.url, headers=headers, timeout=self.timeout)
+                if response.status_code == 304:
+                    self.stats['not_modified'] += 1
+                    self._checked_at = time.monotonic()
+                    self.last_error = None
+                    return False
+                response.raise_for_status()
+                payload = response.json()
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.last_error = e
+                raise
+
+            entries = tuple(
+                {
+                    'name': item['path'],
+                    'path': f"{self.path}/{item['path']}",
+                    'sha': item['sha'],
+                    'size': item.get('size'),
+                    'type': "file" if item['type'] == "blob" else "dir",
+                }
+                for item in payload.get('tree', [])
+                if item['type'] in ("blob", "tree")
+            )
+            self._entries = entries
+            self._etag = response.headers.get("ETag")
+            self._checked_at = time.monotonic()
+            self.last_error = None
+            self.stats['updated'] += 1
+            return True
+
+    def force_refresh(self):
+        """Segarkan sekarang juga (misalnya setelah aplikasi ini menulis ke repo).
+
+        Tidak melempar error: jika gagal, snapshot lama tetap dipakai dan error ada di last_error.
+        """
+        try:
+            return self.refresh()
+        except Exception:
+            return False
+        finally:
+            self._wake.set() # Mulai ulang hitungan interval poller
+
+    def age(self):
+        """Umur snapshot dalam detik (tak hingga jika belum pernah berhasil diambil)."""
+        if self._entries is None:
+            return float('inf')
+        return time.monotonic() - self._checked_at
+
+    def snapshot(self, max_staleness=None):
+        """Kembalikan isi folder; disegarkan dulu jika lebih tua dari batas staleness."""
+        bound = self.max_staleness if max_staleness is None else max_staleness
+        if self.age() > bound:
+            try:
+                self.refresh()
+            except Exception:
+                if self._entries is None:
+                    raise
+        return self._entries
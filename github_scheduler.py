@@ -0,0 +1,203 @@
+import time
+import random
+import threading
+import contextlib
+from requests.adapters import HTTPAdapter
+
+DEFAULT_WRITE_RESERVE = 200 # Sisa kuota yang tidak boleh dipakai baca, agar upload/hapus tetap bisa jalan
+DEFAULT_WRITE_INTERVAL = 1.0 # detik antar-request tulis (anjuran GitHub untuk POST/PATCH/PUT/DELETE)
+DEFAULT_MAX_READ_WAIT = 30.0 # Baca yang harus menunggu lebih lama dari ini langsung gagal
+DEFAULT_MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class RateLimitExhausted(RuntimeError):
+    """Kuota GitHub habis dan request baca tidak boleh menunggu selama itu."""
+
+    def __init__(self, wait_seconds):
+        super().__init__(f"Kuota GitHub habis, coba lagi dalam {wait_seconds:.0f} detik")
+        self.wait_seconds = wait_seconds
+
+
+def _header(headers, name):
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is None:
+        value = headers.get(name.lower())
+    return value
+
+
+def is_rate_limited(status, headers, message=""):
+    """True jika respons 403/429 adalah rate limit (primer atau sekunder), bukan izin ditolak."""
+    if status not in (403, 429):
+        return False
+    return (
+        status == 429
+        or _header(headers, "Retry-After") is not None
+        or _header(headers, "X-RateLimit-Remaining") == "0"
+        or "rate limit" in (message or "").lower()
+    )
+
+
+class RateLimitScheduler:
+    """Penjadwal semua request GitHub dalam satu proses, berdasarkan header X-RateLimit-*.
+
+    - Baca (GET) ditahan jika sisa kuota tinggal write_reserve: sisa itu disimpan untuk tulis.
+      Baca yang harus menunggu lebih dari max_read_wait gagal dengan RateLimitExhausted.
+    - Tulis (POST/PATCH/PUT/DELETE) dijalankan satu per satu dengan jeda write_interval, dan
+      menunggu (antre) sampai kuota tersedia alih-alih gagal.
+    - Respons rate limit (403/429) diulang dengan backoff eksponensial ber-jitter, mengikuti
+      Retry-After atau X-RateLimit-Reset jika ada.
+    """
+
+    def __init__(self, write_reserve=DEFAULT_WRITE_RESERVE, write_interval=DEFAULT_WRITE_INTERVAL,
+                 max_read_wait=DEFAULT_MAX_READ_WAIT, max_retries=DEFAULT_MAX_RETRIES,
+                 clock=time.time, sleep=time.sleep):
+        self.write_reserve = write_reserve
+        self.write_interval = write_interval
+        self.max_read_wait = max_read_wait
+        self.max_retries = max_retries
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock() # Tulis diserialkan; thread lain antre di sini
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self._blocked_until = 0.0
+        self._last_write = 0.0
+        self.stats = {'reads': 0, 'writes': 0, 'waits': 0, 'wait_seconds': 0.0, 'rate_limited': 0, 'retries': 0}
+
+    def observe(self, headers, status=None, message=""):
+        """Perbarui status kuota dari header respons (dan blokir sementara jika kena rate limit)."""
+        remaining = _header(headers, "X-RateLimit-Remaining")
+        reset = _header(headers, "X-RateLimit-Reset")
+        limit = _header(headers, "X-RateLimit-Limit")
+        limited = status is not None and is_rate_limited(status, headers, message)
+        with self._lock:
+            if limit is not None:
+                self.limit = int(limit)
+            if remaining is not None:
+                self.remaining = int(remaining)
+            if reset is not None:
+                self.reset_at = float(reset)
+            if limited:
+                self.stats['rate_limited'] += 1
+                retry_after = _header(headers, "Retry-After")
+                if retry_after is not None:
+                    self._blocked_until = max(self._blocked_until, self._clock() + float(retry_after))
+                elif self.remaining == 0 and self.reset_at:
+                    self._blocked_until = max(self._blocked_until, self.reset_at)
+        return limited
+
+    def _wait_time(self, kind, now):
+        wait = self._blocked_until - now
+        if self.remaining is not None and self.reset_at and now < self.reset_at:
+            floor = 0 if kind == "write" else self.write_reserve
+            if self.remaining <= floor:
+                wait = max(wait, self.reset_at - now)
+        if kind == "write" and self.write_interval:
+            wait = max(wait, self._last_write + self.write_interval - now)
+        return wait
+
+    def _acquire(self, kind):
+        while True:
+            with self._lock:
+                wait = self._wait_time(kind, self._clock())
+                if wait <= 0:
+                    if self.remaining is not None:
+                        self.remaining -= 1 # Perkiraan sampai header respons berikutnya datang
+                    self.stats['reads' if kind == "read" else 'writes'] += 1
+                    return
+                if kind == "read" and wait > self.max_read_wait:
+                    raise RateLimitExhausted(wait)
+                self.stats['waits'] += 1
+                self.stats['wait_seconds'] += wait
+            self._sleep(wait)
+
+    @contextlib.contextmanager
+    def slot(self, kind):
+        """Context manager untuk satu request: kind adalah "read" atau "write"."""
+        if kind != "write":
+            self._acquire("read")
+            yield
+            return
+        with self._write_lock:
+            self._acquire("write")
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._last_write = self._clock()
+
+    def retry_delay(self, attempt, headers=None):
+        """Jeda sebelum mencoba lagi: Retry-After/reset jika ada, selain itu backoff eksponensial ber-jitter."""
+        retry_after = _header(headers, "Retry-After")
+        if retry_after is not None:
+            return float(retry_after) + random.uniform(0, 1)
+        with self._lock:
+            if self.remaining == 0 and self.reset_at:
+                return max(self.reset_at - self._clock(), 0) + random.uniform(0, 1)
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+    def wait_before_retry(self, attempt, headers=None):
+        delay = self.retry_delay(attempt, headers)
+        with self._lock:
+            self.stats['retries'] += 1
+        self._sleep(delay)
+
+    def call(self, kind, fn, *args, **kwargs):
+        """Jalankan fn lewat penjadwal (misalnya method PyGithub) dan ulangi jika kena rate limit.
+
+        Header kuota dibaca dari pengecualian (GithubException.headers / HTTPError.response) atau
+        dari raw_headers objek hasil PyGithub.
+        """
+        for attempt in range(self.max_retries + 1):
+            with self.slot(kind):
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    status, headers, message = _error_details(e)
+                    if not self.observe(headers, status, message) or attempt == self.max_retries:
+                        raise
+                    error_headers = headers
+                else:
+                    self.observe(getattr(result, 'raw_headers', None))
+                    return result
+            self.wait_before_retry(attempt, error_headers)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, limit=self.limit, remaining=self.remaining, reset_at=self.reset_at)
+
+
+def _error_details(error):
+    response = getattr(error, 'response', None)
+    if response is not None and hasattr(response, 'status_code'): # requests.HTTPError
+        return response.status_code, response.headers, response.text[:500]
+    status = getattr(error, 'status', None) # github.GithubException
+    data = getattr(error, 'data', None)
+    message = data.get('message', "") if isinstance(data, dict) else str(data or "")
+    return status, getattr(error, 'headers', None), message
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter requests yang melewatkan setiap request lewat RateLimitScheduler."""
+
+    def __init__(self, scheduler, **kwargs):
+        self.scheduler = scheduler
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        kind = "read" if request.method in READ_METHODS else "write"
+        for attempt in range(self.scheduler.max_retries + 1):
+            with self.scheduler.slot(kind):
+                response = super().send(request, **kwargs)
+            message = response.text[:500] if response.status_code in (403, 429) else ""
+            if not self.scheduler.observe(response.headers, response.status_code, message) or attempt == self.scheduler.max_retries:
+                return response
+            response.close()
+            self.scheduler.wait_before_retry(attempt, response.headers)
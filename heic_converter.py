@@ -0,0 +1,82 @@
+import os
+import time
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+import pillow_heif
+
+# Agar Image.open juga bisa membaca file HEIC lama (thumbnail, metadata, dsb.)
+pillow_heif.register_heif_opener()
+
+HEIC_EXTENSIONS = {'.heic', '.heif'}
+JPEG_QUALITY = 90
+
+
+def is_heic(filename):
+    return os.path.splitext(filename)[1].lower() in HEIC_EXTENSIONS
+
+
+def convert_heic_to_jpeg(heic_bytes, quality=JPEG_QUALITY):
+    """Decode HEIC tepat satu kali lalu encode ke JPEG, dengan EXIF dan profil ICC dipertahankan.
+
+    Mengembalikan (jpeg_bytes, info); info berisi dimensi dan waktu tiap tahap (detik).
+    Fungsi level-modul agar bisa dijalankan di process pool.
+    """
+    timings = {}
+    started = time.perf_counter()
+    heif_file = pillow_heif.open_heif(BytesIO(heic_bytes), convert_hdr_to_8bit=True) # Hanya membaca container
+    timings['parse'] = time.perf_counter() - started
+
+    stage_started = time.perf_counter()
+    img = heif_file.to_pillow() # Satu-satunya decode piksel
+    timings['decode'] = time.perf_counter() - stage_started
+
+    stage_started = time.perf_counter()
+    exif = img.info.get('exif')
+    icc_profile = img.info.get('icc_profile')
+    save_options = {'format': "jpeg", 'quality': quality}
+    if exif:
+        save_options['exif'] = exif
+    if icc_profile:
+        save_options['icc_profile'] = icc_profile
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB') # JPEG tidak mendukung alpha
+    output_buffer = BytesIO()
+    img.save(output_buffer, **save_options)
+    timings['encode'] = time.perf_counter() - stage_started
+    timings['worker_total'] = time.perf_counter() - started
+
+    return output_buffer.getvalue(), {
+        'width': img.width,
+        'height': img.height,
+        'exif': bool(exif),
+        'icc_profile': bool(icc_profile),
+        'timings': timings,
+    }
+
+
+class HeicConverter:
+    """Mesin konversi HEIC -> JPEG yang berjalan di process pool agar tidak memblokir sesi.
+
+    Pekerjaan CPU (decode/encode) tersebar ke beberapa core; thread pemanggil hanya menunggu.
+    """
+
+    def __init__(self, max_workers=None, quality=JPEG_QUALITY):
+        self.quality = quality
+        # "spawn" lebih aman daripada fork di proses yang sudah punya banyak thread (Streamlit)
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, heic_bytes):
+        """Jadwalkan konversi; mengembalikan Future berisi (jpeg_bytes, info)."""
+        return self._pool.submit(convert_heic_to_jpeg, heic_bytes, self.quality)
+
+    def convert(self, heic_bytes):
+        """Konversi dan tunggu hasilnya. info['timings']['wall'] mencakup antrean dan transfer data."""
+        started = time.perf_counter()
+        jpeg_bytes, info = self.submit(heic_bytes).result()
+        info['timings']['wall'] = time.perf_counter() - started
+        info['timings']['queue_and_transfer'] = info['timings']['wall'] - info['timings']['worker_total']
+        return jpeg_bytes, info
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,68 @@
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_MEMORY_CACHE_MB = 64
+
+
+class ImageBytesCache:
+    """Cache isi file gambar (thumbnail yang sudah di-encode) di memori, dibatasi total byte.
+
+    Kunci adalah path; setiap entri menyimpan tanda tangan (mtime_ns, size), jadi file yang
+    diganti otomatis dibaca ulang. File dibuka, dibaca, dan langsung ditutup di dalam cache,
+    sehingga pemanggil tidak pernah memegang file handle. Eviksi LRU ketika total byte
+    melebihi max_bytes; file yang lebih besar dari max_bytes tidak disimpan.
+    Satu instance aman dipakai bersama oleh banyak sesi (thread).
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # path -> (tanda tangan, bytes), urutan = LRU (terlama di depan)
+        self._total_bytes = 0
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def read(self, path):
+        """Isi file di path sebagai bytes, dari memori jika file belum berubah sejak dibaca."""
+        stat_result = os.stat(path)
+        signature = (stat_result.st_mtime_ns, stat_result.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(path)
+                self._counters['hits'] += 1
+                return entry[1]
+            self._counters['misses'] += 1
+
+        with open(path, 'rb') as f: # Dibaca di luar lock; handle ditutup sebelum kembali
+            data = f.read()
+
+        with self._lock:
+            self._discard(path)
+            if len(data) <= self.max_bytes:
+                self._entries[path] = (signature, data)
+                self._total_bytes += len(data)
+                while self._total_bytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._total_bytes -= len(evicted)
+                    self._counters['evictions'] += 1
+        return data
+
+    def _discard(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._total_bytes -= len(entry[1])
+
+    def discard(self, path):
+        """Buang path dari cache (misalnya setelah file dihapus)."""
+        with self._lock:
+            self._discard(path)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries), total_bytes=self._total_bytes, max_bytes=self.max_bytes)
+
+
+def stats_delta(before, after):
+    """Selisih penghitung hits/misses/evictions antara dua stats(), misalnya selama satu rerun."""
+    return {name: after[name] - before[name] for name in ('hits', 'misses', 'evictions')}
@@ -0,0 +1,300 @@
+import os
+import re
+import time
+import uuid
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import parse_qs, quote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from github_listing import GITHUB_API_URL
+from thumbnail_cache import ThumbnailCache, THUMBNAIL_SIZES
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable" # Isi blob dengan SHA yang sama tidak pernah berubah
+DEFAULT_CACHE_MAX_MB = 1024
+
+# Tanda tangan awal file -> Content-Type; blob tidak punya nama file
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def git_blob_sha(data):
+    """SHA blob git (sha1 dari header "blob <ukuran>\\0" + isi), sama dengan SHA di tree GitHub."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def sniff_content_type(head):
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        return "image/avif" if head[8:12] in (b"avif", b"avis") else "image/heic"
+    return "application/octet-stream"
+
+
+class GitHubBlobReader:
+    """Membaca isi blob per SHA lewat Git Blobs API (bekerja juga untuk repositori privat)."""
+
+    def __init__(self, token, owner, repo_name, api_url=GITHUB_API_URL, session=None, timeout=30):
+        self.url = f"{api_url.rstrip('/')}/repos/{owner}/{repo_name}/git/blobs"
+        self.timeout = timeout
+        self._session = session or requests.Session()
+        self._headers = {
+            "Accept": "application/vnd.github.raw", # Isi mentah, bukan JSON base64
+            "Authorization": f"Bearer {token}",
+        }
+
+    def read(self, sha):
+        response = self._session.get(f"{self.url}/{sha}", headers=self._headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
+
+
+class BlobCache:
+    """Cache blob di disk, dikunci dengan SHA git, dengan eviksi LRU berdasarkan total byte.
+
+    fetch(sha) -> bytes mengambil blob dari sumbernya (GitHubBlobReader.read atau
+    StorageBackend.read_blob). Setiap blob diambil sekali dan diverifikasi terhadap SHA-nya.
+    Beberapa sesi yang meminta blob yang sama bersamaan hanya memicu satu pengambilan. Urutan
+    LRU disimpan di atime sehingga mtime (dipakai ThumbnailCache sebagai tanda tangan) tidak berubah.
+    resolve(bytes) -> bytes opsional dipanggil setelah verifikasi, misalnya untuk mengganti file
+    pointer (LargeObjectOffload) dengan isi aslinya; hasilnya yang disimpan di cache.
+    """
+
+    def __init__(self, cache_dir, fetch, max_bytes=DEFAULT_CACHE_MAX_MB * 1024 * 1024, resolve=None):
+        self.cache_dir = cache_dir
+        self.fetch = fetch
+        self.resolve = resolve
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._fetch_locks = {} # sha -> Lock, agar satu blob hanya diunduh sekali
+        self._entries = OrderedDict() # sha -> ukuran byte, urutan = LRU (terlama di depan)
+        self._total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'fetched_bytes': 0, 'evictions': 0}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        existing = []
+        for name in os.listdir(self.cache_dir):
+            if not re.fullmatch(r"[0-9a-f]{40}", name):
+                continue # Lewati file .tmp yang tertinggal
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            existing.append((st.st_atime, name, st.st_size))
+        for _, name, size in sorted(existing):
+            self._entries[name] = size
+            self._total_bytes += size
+
+    def _path(self, sha):
+        if not re.fullmatch(r"[0-9a-f]{40}", sha or ""):
+            raise ValueError(f"SHA blob tidak valid: {sha}")
+        return os.path.join(self.cache_dir, sha)
+
+    def path_for(self, sha):
+        """Kembalikan path lokal blob, mengambilnya dari sumber jika belum ada di cache."""
+        blob_path = self._path(sha)
+        with self._lock:
+            if sha in self._entries and os.path.exists(blob_path):
+                self.stats['hits'] += 1
+                self._touch(sha, blob_path)
+                return blob_path
+            fetch_lock = self._fetch_locks.setdefault(sha, threading.Lock())
+
+        with fetch_lock:
+            with self._lock:
+                if sha in self._entries and os.path.exists(blob_path):
+                    self.stats['hits'] += 1 # Diunduh oleh sesi lain selagi menunggu
+                    return blob_path
+            try:
+                size = self._fetch(sha, blob_path)
+                with self._lock: # Dicatat sebelum fetch_lock dilepas, agar sesi yang menunggu memakai hasilnya
+                    self.stats['misses'] += 1
+                    self.stats['fetched_bytes'] += size
+                    self._total_bytes += size - self._entries.pop(sha, 0)
+                    self._entries[sha] = size
+                    self._evict(keep=sha)
+            finally:
+                with self._lock:
+                    self._fetch_locks.pop(sha, None)
+        return blob_path
+
+    def _fetch(self, sha, blob_path):
+        data = self.fetch(sha)
+        if git_blob_sha(data) != sha:
+            raise ValueError(f"Isi blob {sha} tidak cocok dengan SHA-nya")
+        if self.resolve is not None:
+            data = self.resolve(data)
+        tmp_path = f"{blob_path}.{uuid.uuid4().hex}.tmp" # Unik: proses lain (mis. image_proxy.py) bisa berbagi folder cache
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, blob_path) # Atomik: tidak ada blob setengah jadi
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return len(data)
+
+    def read(self, sha):
+        with open(self.path_for(sha), 'rb') as f:
+            return f.read()
+
+    def _touch(self, sha, blob_path):
+        self._entries.move_to_end(sha)
+        try:
+            st = os.stat(blob_path)
+            os.utime(blob_path, ns=(time.time_ns(), st.st_mtime_ns))
+        except OSError:
+            pass
+
+    def _evict(self, keep=None):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            sha, size = next(iter(self._entries.items()))
+            if sha == keep:
+                self._entries.move_to_end(sha)
+                continue
+            del self._entries[sha]
+            self._total_bytes -= size
+            self.stats['evictions'] += 1
+            try:
+                os.remove(os.path.join(self.cache_dir, sha))
+            except OSError:
+                pass
+
+    def cache_stats(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), total_bytes=self._total_bytes, max_bytes=self.max_bytes)
+
+
+class ImageProxy:
+    """Lapisan proxy gambar: blob asli dari BlobCache plus varian thumbnail per SHA.
+
+    variant=None berarti blob apa adanya; selain itu salah satu varian ThumbnailCache
+    (small/medium/large). Karena kuncinya SHA, semua hasil boleh di-cache browser selamanya.
+    """
+
+    def __init__(self, blob_cache, thumbnail_cache):
+        self.blobs = blob_cache
+        self.thumbnails = thumbnail_cache
+
+    def path_for(self, sha, variant=None):
+        blob_path = self.blobs.path_for(sha)
+        if variant is None:
+            return blob_path
+        return self.thumbnails.get(blob_path, variant, filename=sha)
+
+    def read(self, sha, variant=None):
+        with open(self.path_for(sha, variant), 'rb') as f:
+            return f.read()
+
+
+class ImageProxyHandler(BaseHTTPRequestHandler):
+    """GET /blobs/<sha> dan GET /blobs/<sha>/<varian> dengan header cache immutable.
+
+    ?download=<nama file> membuat browser menyimpan file dengan nama itu (Content-Disposition).
+    """
+
+    server_version = "GaleriImageProxy/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_status(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        match = re.fullmatch(r"/blobs/([0-9a-f]{40})(?:/([a-z]+))?", path)
+        if not match or (match.group(2) and match.group(2) not in self.server.proxy.thumbnails.sizes):
+            return self._send_status(404)
+        sha, variant = match.groups()
+        etag = f'"{sha}.{variant or "original"}"'
+        cache_headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        download_name = parse_qs(query).get('download', [None])[0]
+        if download_name:
+            cache_headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+        if self.headers.get("If-None-Match") == etag:
+            return self._send_status(304, cache_headers)
+        try:
+            data = self.server.proxy.read(sha, variant)
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else 502
+            return self._send_status(404 if status == 404 else 502)
+        except Exception:
+            return self._send_status(502)
+        self.send_response(200)
+        self.send_header("Content-Type", sniff_content_type(data[:16]))
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in cache_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class ImageProxyServer(ThreadingHTTPServer):
+    """Server proxy gambar yang berjalan di thread latar belakang."""
+
+    daemon_threads = True
+
+    def __init__(self, proxy, host="127.0.0.1", port=0):
+        super().__init__((host, port), ImageProxyHandler)
+        self.proxy = proxy
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="image-proxy", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Proxy gambar dengan cache disk untuk blob GitHub Galeri WDF.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--owner", default=os.getenv("GITHUB_REPO_OWNER"))
+    parser.add_argument("--repo", default=os.getenv("GITHUB_REPO_NAME"))
+    parser.add_argument("--api-url", default=os.getenv("GITHUB_API_URL") or GITHUB_API_URL)
+    parser.add_argument("--cache-dir", default=".cache_galeri_wdf/blobs")
+    parser.add_argument("--max-mb", type=int, default=DEFAULT_CACHE_MAX_MB)
+    args = parser.parse_args()
+
+    reader = GitHubBlobReader(os.getenv("GITHUB_TOKEN"), args.owner, args.repo, api_url=args.api_url)
+    blob_cache = BlobCache(args.cache_dir, reader.read, max_bytes=args.max_mb * 1024 * 1024)
+    thumbnail_cache = ThumbnailCache(f"{args.cache_dir}_thumbnails", sizes=THUMBNAIL_SIZES)
+    server = ImageProxyServer(ImageProxy(blob_cache, thumbnail_cache), args.host, args.port)
+    print(f"Proxy gambar berjalan di {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import os
+import hmac
+import uuid
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+import requests
+
+# File pointer memakai format Git LFS, sehingga mudah dikenali (dan bisa dimigrasi ke LFS nanti)
+POINTER_VERSION = "https://git-lfs.github.com/spec/v1"
+MAX_POINTER_SIZE = 1024 # File yang lebih besar pasti bukan pointer, tidak perlu di-parse
+DEFAULT_THRESHOLD_MB = 8 # Foto asli di atas ukuran ini disimpan di luar repositori
+DEFAULT_S3_REGION = "us-east-1" # MinIO dan sebagian besar server S3-kompatibel menerima region ini
+
+
+def make_pointer(oid, size):
+    """Isi file pointer untuk objek dengan SHA-256 oid dan ukuran size byte."""
+    return f"version {POINTER_VERSION}\noid sha256:{oid}\nsize {size}\n".encode('ascii')
+
+
+def parse_pointer(data):
+    """(oid, size) jika data adalah file pointer, selain itu None."""
+    if len(data) > MAX_POINTER_SIZE or bytes(data[:8]) != b"version ":
+        return None
+    try:
+        fields = dict(line.split(" ", 1) for line in bytes(data).decode('ascii').splitlines() if line)
+        oid = fields['oid'].removeprefix("sha256:")
+        size = int(fields['size'])
+    except (UnicodeDecodeError, ValueError, KeyError):
+        return None
+    if fields['version'] != POINTER_VERSION or len(oid) != 64:
+        return None
+    return oid, size
+
+
+class LocalObjectStore:
+    """Objek besar di folder lokal (atau share jaringan), dikunci dengan SHA-256 isinya."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, oid):
+        return os.path.join(self.root, oid[:2], oid[2:4], oid) # Dipecah agar satu folder tidak berisi ribuan file
+
+    def exists(self, oid):
+        return os.path.exists(self._path(oid))
+
+    def put(self, oid, data):
+        object_path = self._path(oid)
+        if os.path.exists(object_path):
+            return # Isi yang sama sudah tersimpan
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = f"{object_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno()) # Objek harus sudah di disk sebelum pointer-nya di-commit
+        os.replace(tmp_path, object_path)
+
+    def get(self, oid):
+        with open(self._path(oid), 'rb') as f:
+            return f.read()
+
+    def delete(self, oid):
+        try:
+            os.remove(self._path(oid))
+        except FileNotFoundError:
+            pass
+
+
+class S3ObjectStore:
+    """Objek besar di bucket S3 atau server S3-kompatibel (misalnya MinIO), lewat REST API.
+
+    Request ditandatangani dengan AWS Signature Version 4 dan memakai URL path-style
+    (endpoint/bucket/key), yang didukung AWS maupun server S3-kompatibel.
+    """
+
+    def __init__(self, endpoint, bucket, prefix="", access_key=None, secret_key=None, region=DEFAULT_S3_REGION,
+                 session=None, timeout=60):
+        self.endpoint = endpoint.rstrip('/')
+        self.bucket = bucket
+        self.prefix = prefix
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.timeout = timeout
+        self._session = session or requests.Session()
+
+    def _object_path(self, oid):
+        return quote(f"/{self.bucket}/{self.prefix}{oid}", safe="/-_.~")
+
+    def _authorization(self, method, path, headers, now):
+        """Header Authorization SigV4 untuk request tanpa query string; headers ikut ditandatangani."""
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        scope = f"{now.strftime('%Y%m%d')}/{self.region}/s3/aws4_request"
+        canonical_headers = {name.lower(): str(value).strip() for name, value in headers.items()}
+        signed_headers = ";".join(sorted(canonical_headers))
+        canonical_request = "\n".join([
+            method, path, "",
+            *(f"{name}:{canonical_headers[name]}" for name in sorted(canonical_headers)), "",
+            signed_headers, canonical_headers['x-amz-content-sha256'],
+        ])
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode('utf-8')).hexdigest(),
+        ])
+        key = f"AWS4{self.secret_key}".encode('utf-8')
+        for part in scope.split("/"):
+            key = hmac.new(key, part.encode('utf-8'), hashlib.sha256).digest()
+        signature = hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+        return f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, SignedHeaders={signed_headers}, Signature={signature}"
+
+    def _request(self, method, oid, data=b"", payload_sha256=None):
+        path = self._object_path(oid)
+        now = datetime.now(timezone.utc)
+        headers = {
+            'Host': urlsplit(self.endpoint).netloc,
+            'x-amz-content-sha256': payload_sha256 or hashlib.sha256(data).hexdigest(),
+            'x-amz-date': now.strftime("%Y%m%dT%H%M%SZ"),
+        }
+        if self.access_key:
+            headers['Authorization'] = self._authorization(method, path, headers, now)
+        return self._session.request(method, f"{self.endpoint}{path}", data=data or None, headers=headers,
+                                     timeout=self.timeout)
+
+    def exists(self, oid):
+        response = self._request("HEAD", oid)
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    def put(self, oid, data):
+        if self.exists(oid):
+            return # Isi yang sama sudah tersimpan; foto 30 MB tidak perlu dikirim ulang
+        self._request("PUT", oid, data, payload_sha256=oid).raise_for_status()
+
+    def get(self, oid):
+        response = self._request("GET", oid)
+        response.raise_for_status()
+        return response.content
+
+    def delete(self, oid):
+        response = self._request("DELETE", oid)
+        if response.status_code != 404:
+            response.raise_for_status()
+
+
+def orphaned_pointers(entries, deleted_names, read_file):
+    """Isi file pointer di antara deleted_names yang objeknya tidak dipakai file lain di galeri.
+
+    entries adalah hasil list() backend penyimpanan sebelum penghapusan, read_file(name) -> bytes.
+    Pointer dengan oid yang sama selalu berisi byte yang sama, jadi file lain yang masih memakai
+    objek tersebut dikenali dari SHA blob-nya tanpa perlu dibaca.
+    """
+    deleted_names = set(deleted_names)
+    remaining_shas = {entry['sha'] for entry in entries if entry['name'] not in deleted_names}
+    pointers = []
+    for entry in entries:
+        if entry['name'] not in deleted_names or entry['size'] > MAX_POINTER_SIZE:
+            continue
+        if entry['sha'] is not None and entry['sha'] in remaining_shas:
+            continue
+        data = read_file(entry['name'])
+        if data is not None and parse_pointer(data) is not None:
+            pointers.append(data)
+    return pointers
+
+
+def open_object_store(location, endpoint=None, access_key=None, secret_key=None, region=DEFAULT_S3_REGION):
+    """LocalObjectStore untuk path folder, S3ObjectStore untuk "s3://bucket/prefix" (endpoint wajib)."""
+    parts = urlsplit(location)
+    if parts.scheme != "s3":
+        return LocalObjectStore(location)
+    if not endpoint:
+        raise ValueError("Endpoint S3 wajib diisi untuk penyimpanan objek s3://")
+    prefix = parts.path.lstrip('/')
+    if prefix and not prefix.endswith('/'):
+        prefix += '/'
+    return S3ObjectStore(endpoint, parts.netloc, prefix, access_key, secret_key, region)
+
+
+class LargeObjectOffload:
+    """Memindahkan foto asli berukuran besar dari repositori ke penyimpanan objek terpisah.
+
+    offload(data) menyimpan isi di atas threshold_bytes ke store lalu mengembalikan file pointer
+    kecil (oid SHA-256 + ukuran) untuk di-commit menggantikan isinya; isi yang lebih kecil
+    dikembalikan apa adanya. resolve(data) membalik prosesnya: pointer diganti dengan isi objek
+    (diverifikasi terhadap oid), selain pointer dikembalikan apa adanya. discard(data) menghapus
+    objek milik pointer dari store, setelah foto yang memakainya dihapus dari galeri. Tanpa store
+    (None), offload tidak memindahkan apa pun dan resolve hanya gagal jika menemukan pointer.
+    """
+
+    def __init__(self, store=None, threshold_bytes=DEFAULT_THRESHOLD_MB * 1024 * 1024):
+        self.store = store
+        self.threshold_bytes = threshold_bytes
+        self._lock = threading.Lock()
+        self.stats = {'offloaded': 0, 'offloaded_bytes': 0, 'resolved': 0, 'resolved_bytes': 0, 'deleted': 0}
+
+    def offload(self, data):
+        if self.store is None or len(data) <= self.threshold_bytes:
+            return data
+        data = bytes(data)
+        oid = hashlib.sha256(data).hexdigest()
+        self.store.put(oid, data) # Objek disimpan dulu: pointer tidak pernah menunjuk objek yang belum ada
+        with self._lock:
+            self.stats['offloaded'] += 1
+            self.stats['offloaded_bytes'] += len(data)
+        return make_pointer(oid, len(data))
+
+    def resolve(self, data):
+        pointer = parse_pointer(data)
+        if pointer is None:
+            return data
+        if self.store is None:
+            raise ValueError("File pointer ditemukan, tetapi penyimpanan objek besar tidak dikonfigurasi")
+        oid, size = pointer
+        content = self.store.get(oid)
+        if len(content) != size or hashlib.sha256(content).hexdigest() != oid:
+            raise ValueError(f"Isi objek {oid} tidak cocok dengan pointer-nya")
+        with self._lock:
+            self.stats['resolved'] += 1
+            self.stats['resolved_bytes'] += size
+        return content
+
+    def discard(self, data):
+        pointer = parse_pointer(data)
+        if pointer is None or self.store is None:
+            return
+        self.store.delete(pointer[0])
+        with self._lock:
+            self.stats['deleted'] += 1
+
+
+def main():
+    """Periksa pointer di folder galeri lokal: apakah setiap objeknya ada di penyimpanan objek."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("folder", help="Folder berisi file galeri (misalnya checkout repositori)")
+    parser.add_argument("--store", required=True, help="Folder objek atau s3://bucket/prefix")
+    parser.add_argument("--endpoint", default=os.getenv("LARGE_OBJECT_S3_ENDPOINT"))
+    args = parser.parse_args()
+
+    store = open_object_store(
+        args.store, args.endpoint, os.getenv("LARGE_OBJECT_S3_ACCESS_KEY"), os.getenv("LARGE_OBJECT_S3_SECRET_KEY"),
+        os.getenv("LARGE_OBJECT_S3_REGION", DEFAULT_S3_REGION)
+    )
+    pointers = missing = 0
+    for dir_path, _, filenames in os.walk(args.folder):
+        for filename in filenames:
+            with open(os.path.join(dir_path, filename), 'rb') as f:
+                pointer = parse_pointer(f.read(MAX_POINTER_SIZE + 1))
+            if pointer is None:
+                continue
+            pointers += 1
+            if not store.exists(pointer[0]):
+                missing += 1
+                print(f"Objek hilang: {os.path.relpath(os.path.join(dir_path, filename), args.folder)} ({pointer[0]})")
+    print(f"{pointers} pointer, {missing} objek hilang")
+
+
+if __name__ == "__main__":
+    main()
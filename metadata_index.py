@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from PIL import Image
+
+EXIF_IFD_POINTER = 0x8769 # IFD Exif berisi DateTimeOriginal
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+
+# Urutan yang didukung: nama -> klausa ORDER BY (semuanya memakai indeks)
+SORT_ORDERS = {
+    'mtime': "mtime DESC, filename DESC",
+    'taken_at': "taken_at IS NULL, taken_at DESC, mtime DESC",
+    'filename': "filename ASC",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    filename TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    format TEXT,
+    taken_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_photos_mtime ON photos (mtime DESC);
+CREATE INDEX IF NOT EXISTS idx_photos_taken_at ON photos (taken_at DESC);
+CREATE INDEX IF NOT EXISTS idx_photos_format ON photos (format);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def read_image_metadata(file_path):
+    """Baca dimensi, format, dan tanggal pengambilan EXIF tanpa decode piksel."""
+    try:
+        with Image.open(file_path) as img: # Image.open hanya membaca header
+            width, height = img.size
+            image_format = img.format
+            taken_at = None
+            exif = img.getexif()
+            raw_date = exif.get_ifd(EXIF_IFD_POINTER).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+            if raw_date:
+                try:
+                    taken_at = datetime.strptime(str(raw_date).strip('\x00 '), "%Y:%m:%d %H:%M:%S").isoformat()
+                except ValueError:
+                    taken_at = None
+            return width, height, image_format, taken_at
+    except Exception:
+        # File rusak atau format belum didukung: tetap diindeks tanpa dimensi
+        return None, None, None, None
+
+
+class MetadataIndex:
+    """Indeks metadata foto di SQLite yang diperbarui secara inkremental.
+
+    Jalur upload/hapus memanggil add()/remove(); reconcile() hanya memindai folder
+    jika mtime direktori berubah dari yang terakhir dicatat (misalnya diubah dari luar aplikasi).
+    """
+
+    def __init__(self, db_path, folder, allowed_file):
+        self.folder = folder
+        self.allowed_file = allowed_file
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def _dir_mtime(self):
+        return str(os.stat(self.folder).st_mtime_ns)
+
+    def _set_meta(self, key, value):
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    def _get_meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _row_for(self, filename, stat_result):
+        width, height, image_format, taken_at = read_image_metadata(os.path.join(self.folder, filename))
+        return (filename, stat_result.st_size, stat_result.st_mtime, width, height, image_format, taken_at)
+
+    def _upsert(self, row):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO photos (filename, size, mtime, width, height, format, taken_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            row
+        )
+
+    def reconcile(self, force=False):
+        """Sinkronkan indeks dengan folder. Kembalikan True jika folder benar-benar dipindai."""
+        with self._lock:
+            dir_mtime = self._dir_mtime()
+            if not force and self._get_meta('dir_mtime') == dir_mtime:
+                return False
+
+            known = {
+                filename: (size, mtime)
+                for filename, size, mtime in self._conn.execute("SELECT filename, size, mtime FROM photos")
+            }
+            seen = set()
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not self.allowed_file(entry.name):
+                        continue
+                    seen.add(entry.name)
+                    stat_result = entry.stat()
+                    if known.get(entry.name) != (stat_result.st_size, stat_result.st_mtime):
+                        self._upsert(self._row_for(entry.name, stat_result))
+            removed = [(filename,) for filename in known if filename not in seen]
+            self._conn.executemany("DELETE FROM photos WHERE filename = ?", removed)
+            self._set_meta('dir_mtime', dir_mtime)
+            self._conn.commit()
+            return True
+
+    def add(self, filename):
+        """Catat file yang baru saja ditulis ke folder upload."""
+        with self._lock:
+            self._upsert(self._row_for(filename, os.stat(os.path.join(self.folder, filename))))
+            self._mark_synced()
+
+    def remove(self, filename):
+        """Hapus file dari indeks setelah file dihapus dari folder upload."""
+        with self._lock:
+            self._conn.execute("DELETE FROM photos WHERE filename = ?", (filename,))
+            self._mark_synced()
+
+    def _mark_synced(self):
+        # Perubahan folder berasal dari aplikasi ini sendiri, jadi tidak perlu pindai ulang.
+        # Jika folder belum pernah dipindai, biarkan reconcile() berikutnya memindai penuh.
+        if self._get_meta('dir_mtime') is not None:
+            self._set_meta('dir_mtime', self._dir_mtime())
+        self._conn.commit()
+
+    def list_files(self, order='mtime', formats=None, limit=None, offset=0):
+        """Daftar nama file terurut memakai query berindeks."""
+        query = "SELECT filename FROM photos"
+        params = []
+        if formats:
+            query += f" WHERE format IN ({', '.join('?' for _ in formats)})"
+            params.extend(formats)
+        query += f" ORDER BY {SORT_ORDERS[order]}"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params)]
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM photos").fetchone()[0]
+
+    def get(self, filename):
+        """Metadata lengkap satu file sebagai dict, atau None jika tidak ada."""
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM photos WHERE filename = ?", (filename,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip([column[0] for column in cursor.description], row))
@@ -0,0 +1,397 @@
+"""Hash perseptual foto dan indeks foto mirip (near-duplicate).
+
+Hash SHA-256 (content_address.py) hanya mengenali file yang identik byte demi byte. Foto yang
+sama tetapi disimpan ulang, diperkecil, atau dikonversi dari HEIC ke JPEG menghasilkan hash
+perseptual 64 bit yang hanya berbeda beberapa bit. Jarak Hamming kecil = foto mirip.
+
+Contoh (mencari kelompok foto mirip di seluruh galeri):
+    python perceptual_hash.py --folder uploads_galeri_wdf
+    python perceptual_hash.py --git .galeri_wdf.git --radius 6
+    python perceptual_hash.py   # indeks yang sudah diisi aplikasi (misalnya galeri GitHub)
+"""
+import os
+import re
+import sqlite3
+import argparse
+import functools
+import itertools
+import threading
+from io import BytesIO
+import numpy as np
+from PIL import Image, ImageOps
+
+HASH_SIZE = 8 # Hash 8x8 = 64 bit
+PHASH_SAMPLE = 32 # pHash: DCT dari gambar 32x32, diambil 8x8 frekuensi terendah
+DEFAULT_METHOD = 'phash'
+NEAR_DUPLICATE_RADIUS = 8 # Jarak Hamming maksimum (dari 64 bit) yang masih dianggap foto yang sama
+DEFAULT_INDEX_DIR = '.cache_galeri_wdf'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_hashes (
+    name TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    version TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _dct_matrix(n):
+    """Matriks DCT-II ortonormal n x n (DCT 2D = M @ X @ M.T)."""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    matrix = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_SAMPLE)
+
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def _grayscale(img, size):
+    """Array float grayscale berukuran size (lebar, tinggi), orientasi EXIF sudah diterapkan."""
+    img.draft('L', (size[0] * 4, size[1] * 4)) # Decoder JPEG langsung memperkecil skala
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info):
+        background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img.convert('RGBA')) # Transparan dianggap putih
+    return np.asarray(img.convert('L').resize(size, Image.Resampling.LANCZOS), dtype=np.float64)
+
+
+def average_hash(img, hash_size=HASH_SIZE):
+    """aHash: bit = piksel 8x8 lebih terang dari rata-ratanya."""
+    pixels = _grayscale(img, (hash_size, hash_size))
+    return _bits_to_int(pixels > pixels.mean())
+
+
+def difference_hash(img, hash_size=HASH_SIZE):
+    """dHash: bit = piksel lebih terang dari tetangga kanannya (gambar 9x8)."""
+    pixels = _grayscale(img, (hash_size + 1, hash_size))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(img, hash_size=HASH_SIZE):
+    """pHash: bit = koefisien DCT frekuensi rendah di atas mediannya (tahan kompresi dan resize)."""
+    pixels = _grayscale(img, (PHASH_SAMPLE, PHASH_SAMPLE))
+    low = (_DCT @ pixels @ _DCT.T)[:hash_size, :hash_size]
+    return _bits_to_int(low > np.median(low.ravel()[1:])) # Koefisien DC (kecerahan rata-rata) tidak ikut median
+
+
+HASH_METHODS = {
+    'ahash': average_hash,
+    'dhash': difference_hash,
+    'phash': phash,
+}
+
+
+def image_hash(source, method=DEFAULT_METHOD):
+    """Hash perseptual dari path file, bytes, atau file-like (HEIC didukung jika pillow_heif terdaftar)."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BytesIO(bytes(source))
+    with Image.open(source) as img:
+        return HASH_METHODS[method](img)
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+@functools.lru_cache(maxsize=None)
+def _flip_masks(bits, radius):
+    """Semua mask bits-bit dengan paling banyak radius bit menyala (termasuk 0)."""
+    return tuple(
+        sum(1 << position for position in positions)
+        for count in range(radius + 1)
+        for positions in itertools.combinations(range(bits), count)
+    )
+
+
+class MultiIndexHash:
+    """Tabel hash multi-indeks (Norouzi dkk.) untuk query radius Hamming yang sub-linear.
+
+    Hash 64 bit dipecah menjadi `chunks` potongan, masing-masing punya tabel sendiri. Jika dua
+    hash berjarak <= r, minimal satu potongannya berjarak <= r // chunks (prinsip sarang merpati),
+    jadi query hanya memeriksa isi bucket tetangga dekat setiap potongan, bukan seluruh galeri.
+    Beberapa nama dengan hash identik berbagi satu entri.
+    """
+
+    def __init__(self, bits=HASH_SIZE * HASH_SIZE, chunks=4):
+        self.chunks = chunks
+        self.chunk_bits = bits // chunks
+        self._chunk_mask = (1 << self.chunk_bits) - 1
+        self._tables = [{} for _ in range(chunks)] # potongan -> set hash
+        self._names = {} # hash -> set nama
+
+    def __len__(self):
+        return sum(len(names) for names in self._names.values())
+
+    def _split(self, hash_value):
+        return [(hash_value >> (i * self.chunk_bits)) & self._chunk_mask for i in range(self.chunks)]
+
+    def add(self, hash_value, name):
+        names = self._names.get(hash_value)
+        if names is None:
+            names = self._names[hash_value] = set()
+            for table, chunk in zip(self._tables, self._split(hash_value)):
+                table.setdefault(chunk, set()).add(hash_value)
+        names.add(name)
+
+    def remove(self, hash_value, name):
+        names = self._names.get(hash_value)
+        if names is None:
+            return
+        names.discard(name)
+        if names:
+            return
+        del self._names[hash_value]
+        for table, chunk in zip(self._tables, self._split(hash_value)):
+            bucket = table[chunk]
+            bucket.discard(hash_value)
+            if not bucket:
+                del table[chunk]
+
+    def query(self, hash_value, radius):
+        """Daftar (jarak, nama) dengan jarak <= radius, terdekat dulu."""
+        flips = _flip_masks(self.chunk_bits, min(radius // self.chunks, self.chunk_bits))
+        candidates = set()
+        for table, chunk in zip(self._tables, self._split(hash_value)):
+            for flip in flips:
+                bucket = table.get(chunk ^ flip)
+                if bucket:
+                    candidates.update(bucket)
+        matches = []
+        for candidate in candidates:
+            distance = hamming(hash_value, candidate)
+            if distance <= radius:
+                matches.extend((distance, name) for name in self._names[candidate])
+        return sorted(matches)
+
+
+class PerceptualHashIndex:
+    """Hash perseptual setiap foto galeri di SQLite, dengan tabel multi-indeks di memori untuk query.
+
+    Jalur upload/hapus memanggil add()/remove(); sync() mengisi hash foto yang belum diindeks
+    (misalnya foto lama) dan membuang foto yang sudah tidak ada. Hash dihitung di luar lock,
+    jadi query dari sesi lain tetap jalan selama sync berlangsung.
+    Satu instance aman dipakai bersama oleh banyak sesi (thread).
+    """
+
+    def __init__(self, db_path, method=DEFAULT_METHOD):
+        self.method = method
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'method'").fetchone()
+        if row is None or row[0] != method:
+            self._conn.execute("DELETE FROM image_hashes") # Hash metode lain tidak bisa dibandingkan
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('method', ?)", (method,))
+        self._conn.commit()
+        self._hashes = {} # nama -> (hash, versi)
+        self._tree = MultiIndexHash()
+        for name, hex_hash, version in self._conn.execute("SELECT name, hash, version FROM image_hashes"):
+            self._hashes[name] = (int(hex_hash, 16), version)
+            self._tree.add(int(hex_hash, 16), name)
+        self._sync_thread = None
+        self.sync_progress = {'running': False, 'done': 0, 'total': 0, 'failed': 0, 'error': None}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._hashes)
+
+    def hash_source(self, source):
+        return image_hash(source, self.method)
+
+    def _store(self, name, hash_value, version):
+        previous = self._hashes.get(name)
+        if previous is not None:
+            self._tree.remove(previous[0], name)
+        self._hashes[name] = (hash_value, version)
+        self._tree.add(hash_value, name)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO image_hashes (name, hash, version) VALUES (?, ?, ?)",
+            (name, f"{hash_value:016x}", version)
+        )
+
+    def add(self, name, hash_value, version=None):
+        """Catat hash foto yang baru saja disimpan ke galeri."""
+        with self._lock:
+            self._store(name, hash_value, version)
+            self._conn.commit()
+
+    def remove(self, name):
+        with self._lock:
+            previous = self._hashes.pop(name, None)
+            if previous is None:
+                return
+            self._tree.remove(previous[0], name)
+            self._conn.execute("DELETE FROM image_hashes WHERE name = ?", (name,))
+            self._conn.commit()
+
+    def get(self, name):
+        with self._lock:
+            entry = self._hashes.get(name)
+        return entry[0] if entry else None
+
+    def query(self, hash_value, radius=NEAR_DUPLICATE_RADIUS, exclude=None):
+        """Foto yang hash-nya berjarak <= radius: daftar (jarak, nama), terdekat dulu."""
+        with self._lock:
+            matches = self._tree.query(hash_value, radius)
+        return [(distance, name) for distance, name in matches if name != exclude]
+
+    def sync(self, entries, open_source):
+        """Samakan indeks dengan entries (hasil StorageBackend.list(), hanya foto utama).
+
+        open_source(entry) -> path, bytes, atau file-like yang dibaca untuk menghitung hash.
+        Foto dengan versi yang sama (SHA blob atau ukuran file) tidak di-hash ulang; versi None
+        (dari add()) dianggap masih berlaku. Kembalikan jumlah foto yang di-hash.
+        """
+        versions = {entry['name']: entry.get('sha') or str(entry.get('size')) for entry in entries}
+        with self._lock:
+            for name in [name for name in self._hashes if name not in versions]:
+                self._tree.remove(self._hashes.pop(name)[0], name)
+                self._conn.execute("DELETE FROM image_hashes WHERE name = ?", (name,))
+            pending = []
+            for entry in entries:
+                known = self._hashes.get(entry['name'])
+                if known is None or known[1] not in (None, versions[entry['name']]):
+                    pending.append(entry)
+                elif known[1] is None:
+                    self._store(entry['name'], known[0], versions[entry['name']])
+            self._conn.commit()
+            self.sync_progress.update(done=0, total=len(pending), failed=0)
+
+        hashed = 0
+        for entry in pending:
+            try:
+                hash_value = self.hash_source(open_source(entry))
+            except Exception:
+                # Foto rusak atau format belum didukung: dilewati, dicoba lagi pada sync berikutnya
+                self.sync_progress['failed'] += 1
+                continue
+            with self._lock:
+                if entry['name'] in versions:
+                    self._store(entry['name'], hash_value, versions[entry['name']])
+                    self._conn.commit()
+            hashed += 1
+            self.sync_progress['done'] += 1
+        return hashed
+
+    def start_sync(self, list_entries, open_source):
+        """Jalankan sync() di thread latar belakang (sekali jalan); abaikan jika masih berjalan."""
+        if self._sync_thread is not None and self._sync_thread.is_alive():
+            return False
+
+        def run():
+            self.sync_progress.update(running=True, error=None)
+            try:
+                self.sync(list_entries(), open_source)
+            except Exception as e:
+                self.sync_progress['error'] = str(e) # Misalnya daftar foto gagal dimuat; dicoba lagi saat restart
+            finally:
+                self.sync_progress['running'] = False
+
+        self._sync_thread = threading.Thread(target=run, name="phash-sync", daemon=True)
+        self._sync_thread.start()
+        return True
+
+    def clusters(self, radius=NEAR_DUPLICATE_RADIUS):
+        """Kelompok foto mirip di seluruh indeks (union-find atas query multi-indeks).
+
+        Kembalikan daftar kelompok (daftar nama terurut) berisi minimal dua foto, terbesar dulu.
+        Foto A~B dan B~C masuk satu kelompok meskipun A dan C berjarak lebih dari radius.
+        """
+        with self._lock:
+            hashes = {name: hash_value for name, (hash_value, _) in self._hashes.items()}
+            parent = {name: name for name in hashes}
+
+            def find(name):
+                while parent[name] != name:
+                    parent[name] = parent[parent[name]]
+                    name = parent[name]
+                return name
+
+            for name, hash_value in hashes.items():
+                for _, other in self._tree.query(hash_value, radius):
+                    root_a, root_b = find(name), find(other)
+                    if root_a != root_b:
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        groups = {}
+        for name in hashes:
+            groups.setdefault(find(name), []).append(name)
+        return sorted((sorted(group) for group in groups.values() if len(group) > 1), key=lambda group: (-len(group), group))
+
+
+def index_path(gallery_key, cache_dir=DEFAULT_INDEX_DIR):
+    """Lokasi indeks untuk satu galeri, misalnya "folder_uploads_galeri_wdf" atau "github_owner_repo".
+
+    Setiap galeri (folder upload atau repositori) punya indeks sendiri: sync() membuang nama yang
+    tidak ada di galeri, jadi aplikasi yang berbagi satu indeks akan saling menghapus entri.
+    """
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", os.path.normpath(gallery_key)).strip("_.")
+    return os.path.join(cache_dir, f"phash_{slug}.sqlite3")
+
+
+def folder_index_key(folder):
+    return f"folder_{os.path.normpath(folder)}"
+
+
+def git_index_key(repo_path):
+    return f"git_{os.path.normpath(repo_path)}"
+
+
+def gallery_images(entries, allowed_extensions):
+    """Entri foto utama dari StorageBackend.list(): tanpa varian tampilan di sub-folder dan tanpa caption."""
+    return [
+        entry for entry in entries
+        if '/' not in entry['name'] and os.path.splitext(entry['name'])[1].lower().lstrip('.') in allowed_extensions
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cari kelompok foto mirip di seluruh Galeri WDF.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--folder", help="Folder upload lokal (test.py)")
+    source.add_argument("--git", help="Repositori git bare lokal (GALLERY_STORAGE=git)")
+    parser.add_argument("--base-path", default="gallery_images", help="Sub-direktori foto di repositori git")
+    parser.add_argument("--db", help="Indeks hash (dipakai ulang, sehingga hanya foto baru yang di-hash); "
+                                     "default: indeks milik --folder/--git yang sama dengan aplikasi")
+    parser.add_argument("--method", choices=sorted(HASH_METHODS), default=DEFAULT_METHOD)
+    parser.add_argument("--radius", type=int, default=NEAR_DUPLICATE_RADIUS)
+    args = parser.parse_args()
+
+    if args.db is None:
+        if not (args.folder or args.git):
+            parser.error("--db wajib diisi jika --folder maupun --git tidak diberikan")
+        args.db = index_path(folder_index_key(args.folder) if args.folder else git_index_key(args.git))
+    index = PerceptualHashIndex(args.db, method=args.method)
+    if args.folder or args.git:
+        import heic_converter # noqa: F401 -- mendaftarkan pembuka HEIC ke PIL
+        from storage import LocalFolderStorage, LocalGitStorage
+        storage = LocalFolderStorage(args.folder) if args.folder else LocalGitStorage(args.git, args.base_path)
+        entries = gallery_images(storage.list(), {'png', 'jpg', 'jpeg', 'gif', 'webp', 'heic'})
+        hashed = index.sync(entries, lambda entry: storage.get(entry['name']))
+        print(f"{len(entries)} foto, {hashed} baru di-hash, {index.sync_progress['failed']} gagal dibaca")
+    else:
+        print(f"{len(index)} foto di indeks {args.db}")
+    groups = index.clusters(args.radius)
+    for number, group in enumerate(groups, 1):
+        anchor = index.get(group[0])
+        print(f"\nKelompok {number} ({len(group)} foto):")
+        for name in group:
+            print(f"  {name}  jarak {hamming(anchor, index.get(name))}")
+    if not groups:
+        print("Tidak ada foto mirip.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextlib
+from datetime import datetime, timezone
+import streamlit as st
+
+DIAGNOSTICS_LOG_PATH = os.getenv("GALLERY_DIAGNOSTICS_LOG", os.path.join('.cache_galeri_wdf', 'diagnostics.jsonl'))
+DIAGNOSTICS_DEFAULT = os.getenv("GALLERY_DIAGNOSTICS", "") == "1" # Aktif sejak awal untuk semua sesi
+
+_NULL_SPAN = contextlib.nullcontext() # Dipakai ulang saat timer nonaktif: tanpa alokasi, tanpa jam
+_log_lock = threading.Lock()
+
+
+class RerunTimer:
+    """Pencatat durasi per tahap untuk satu rerun.
+
+    span(name) dipakai sebagai context manager dan boleh dipanggil berulang (misalnya sekali per
+    kartu foto); durasi dan jumlah panggilan dijumlahkan per nama tahap. Saat enabled=False,
+    span() mengembalikan context manager kosong yang sama dan count() langsung kembali.
+    """
+
+    def __init__(self, enabled=False, app=None, session_id=None, rerun_id=0, log_path=DIAGNOSTICS_LOG_PATH,
+                 fragment=None):
+        self.enabled = enabled
+        self.app = app
+        self.fragment = fragment # Nama fragment jika yang diukur hanya rerun satu st.fragment
+        self.session_id = session_id
+        self.rerun_id = rerun_id
+        self.log_path = log_path
+        self.stages = {} # nama -> [detik, jumlah panggilan]
+        self.counts = {}
+        self.finished = False
+        self._started = time.perf_counter()
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name)
+
+    @contextlib.contextmanager
+    def _span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(name, [0.0, 0])
+            stage[0] += time.perf_counter() - started
+            stage[1] += 1
+
+    def count(self, name, value=1):
+        if self.enabled:
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def record(self, interrupted=False):
+        return {
+            'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'app': self.app,
+            'session_id': self.session_id,
+            'rerun_id': self.rerun_id,
+            'fragment': self.fragment,
+            'total_ms': round((time.perf_counter() - self._started) * 1000, 3),
+            'interrupted': interrupted, # Rerun dipotong st.rerun()/st.stop() sebelum selesai
+            'stages': {name: {'ms': round(seconds * 1000, 3), 'calls': calls} for name, (seconds, calls) in self.stages.items()},
+            'counts': dict(self.counts),
+        }
+
+    def finish(self, interrupted=False):
+        """Tutup rerun ini dan tambahkan satu baris JSONL ke log_path; kembalikan record (None jika nonaktif)."""
+        if not self.enabled or self.finished:
+            return None
+        self.finished = True
+        record = self.record(interrupted)
+        if self.log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            with _log_lock, open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        return record
+
+
+def start_rerun(app):
+    """Buat RerunTimer untuk rerun ini berdasarkan toggle diagnostik di sidebar.
+
+    Dipanggil sedini mungkin di skrip. Rerun sebelumnya yang terpotong st.rerun() (sehingga
+    tidak sempat memanggil finish_rerun) dicatat di sini dengan interrupted=True.
+    """
+    if 'diagnostics_session_id' not in st.session_state:
+        st.session_state.diagnostics_session_id = uuid.uuid4().hex[:12]
+        st.session_state.diagnostics_rerun_id = 0
+    previous = st.session_state.get('diagnostics_timer')
+    if previous is not None and not previous.finished:
+        st.session_state.diagnostics_last = previous.finish(interrupted=True)
+
+    enabled = st.sidebar.toggle("Diagnostik rerun", value=DIAGNOSTICS_DEFAULT, key="diagnostics_enabled")
+    st.session_state.diagnostics_rerun_id += 1
+    timer = RerunTimer(
+        enabled=enabled,
+        app=app,
+        session_id=st.session_state.diagnostics_session_id,
+        rerun_id=st.session_state.diagnostics_rerun_id,
+    )
+    st.session_state.diagnostics_timer = timer
+    return timer
+
+
+@contextlib.contextmanager
+def fragment_timer(timer, name):
+    """Timer untuk badan st.fragment; dipakai sebagai context manager.
+
+    Saat fragment ikut berjalan dalam rerun penuh, timer rerun tersebut yang dipakai. Saat
+    fragment dijalankan ulang sendirian, timer rerun penuh terakhir sudah ditutup dan dicatat,
+    jadi fragment mendapat timer sendiri (fragment=name) yang dicatat ke log ketika selesai.
+    """
+    if not timer.enabled or not timer.finished:
+        yield timer
+        return
+    st.session_state.diagnostics_rerun_id += 1
+    fragment = RerunTimer(
+        enabled=True,
+        app=timer.app,
+        session_id=timer.session_id,
+        rerun_id=st.session_state.diagnostics_rerun_id,
+        log_path=timer.log_path,
+        fragment=name,
+    )
+    try:
+        yield fragment
+    except BaseException:
+        fragment.finish(interrupted=True) # Misalnya st.rerun() dari dalam fragment
+        raise
+    fragment.finish()
+
+
+def finish_rerun(timer):
+    """Tutup timer di akhir skrip dan tampilkan rincian tahap di sidebar (hanya jika aktif)."""
+    record = timer.finish()
+    if record is None:
+        return
+    previous = st.session_state.pop('diagnostics_last', None)
+    with st.sidebar.expander("⏱️ Rincian rerun", expanded=True):
+        st.caption(f"Sesi {record['session_id']} · rerun #{record['rerun_id']} · total {record['total_ms']:.1f} ms")
+        if record['stages']:
+            st.dataframe(
+                [
+                    {'Tahap': name, 'ms': stage['ms'], 'Panggilan': stage['calls']}
+                    for name, stage in sorted(record['stages'].items(), key=lambda item: -item[1]['ms'])
+                ],
+                hide_index=True,
+            )
+        for name, value in record['counts'].items():
+            st.caption(f"{name}: {value}")
+        if previous is not None:
+            st.caption(f"Rerun #{previous['rerun_id']} sebelumnya terpotong setelah {previous['total_ms']:.1f} ms")
+        st.caption(f"Log JSONL: {timer.log_path}")
@@ -0,0 +1,465 @@
+import os
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+import subprocess
+from collections import namedtuple
+from github_batch import GitBatchWriter, BlobRef
+from image_proxy import git_blob_sha
+
+GIT_FILE_MODE = "100644"
+GIT_ZERO_SHA = "0" * 40
+DEFAULT_GIT_BRANCH = "main" # Branch untuk repositori git lokal yang baru dibuat
+GIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "Galeri WDF",
+    "GIT_AUTHOR_EMAIL": "galeri-wdf@localhost",
+    "GIT_COMMITTER_NAME": "Galeri WDF",
+    "GIT_COMMITTER_EMAIL": "galeri-wdf@localhost",
+}
+
+
+WRITE_CHUNK_SIZE = 1024 * 1024 # Isi file ditulis ke disk per potongan, bukan disalin utuh sekali jalan
+DEFAULT_MAX_CONCURRENT_WRITES = 2 # Penulisan file besar yang boleh berjalan bersamaan (LocalFolderStorage)
+STALE_TMP_SECONDS = 3600 # File sementara setua ini sisa penulisan yang terputus (server mati)
+
+# File yang sudah ditulis lengkap dan di-fsync ke file sementara, tinggal di-rename ke nama akhir
+StagedFile = namedtuple('StagedFile', ['tmp_path', 'sha256', 'size'])
+
+
+def _as_bytes(data):
+    return data.encode('utf-8') if isinstance(data, str) else bytes(data)
+
+
+def _iter_chunks(data, chunk_size=WRITE_CHUNK_SIZE):
+    """Potongan isi dari bytes/str/memoryview atau file-like (dibaca dari awal, tanpa disalin utuh)."""
+    if hasattr(data, 'read'):
+        data.seek(0)
+        yield from iter(lambda: data.read(chunk_size), b"")
+        data.seek(0)
+        return
+    view = memoryview(data.encode('utf-8') if isinstance(data, str) else data)
+    for start in range(0, len(view), chunk_size):
+        yield view[start:start + chunk_size]
+
+
+def _fsync_dir(dir_path):
+    """Pastikan rename di dir_path tercatat di disk (tidak didukung di Windows, diabaikan)."""
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class StorageBackend:
+    """Antarmuka penyimpanan galeri yang dipakai ketiga aplikasi.
+
+    Nama file relatif terhadap folder galeri, misalnya "abc.jpg" atau "web/abc.webp".
+    list() mengembalikan entri {name, path, sha, size, type: 'file'}, sama seperti snapshot
+    GalleryListing; sha adalah SHA blob git jika backend mengenalnya, atau None.
+    Semua perubahan lewat batch(), yang menerapkan puts dan deletes sekaligus (atomik untuk
+    backend berbasis git dan memori).
+    """
+
+    last_error = None
+
+    def list(self):
+        raise NotImplementedError
+
+    def get(self, name):
+        """Isi file sebagai bytes, atau None jika tidak ada."""
+        raise NotImplementedError
+
+    def metadata(self, name):
+        """Entri list() untuk satu file, atau None jika tidak ada."""
+        for entry in self.list():
+            if entry['name'] == name:
+                return entry
+        return None
+
+    def read_blob(self, sha):
+        """Isi file berdasarkan SHA blob (untuk BlobCache/ImageProxy)."""
+        raise NotImplementedError(f"{type(self).__name__} tidak mengenal SHA blob")
+
+    def stage(self, data):
+        """Siapkan isi file sebelum batch() (misalnya diunggah paralel); hasilnya dipakai sebagai nilai puts."""
+        return data
+
+    def discard(self, staged):
+        """Buang hasil stage() yang tidak jadi di-commit (batch() gagal); aman dipanggil setelah batch() berhasil."""
+
+    def batch(self, message, build_changes):
+        """Terapkan build_changes(read_file) -> (puts, deletes) sebagai satu perubahan.
+
+        read_file(name) -> bytes atau None membaca isi file pada versi yang sedang diubah.
+        puts adalah dict nama -> bytes, str, atau hasil stage(); deletes adalah daftar nama.
+        Kembalikan True jika ada yang ditulis.
+        """
+        raise NotImplementedError
+
+    def put(self, name, data, message=None):
+        return self.batch(message or f"Upload {name}", lambda read_file: ({name: data}, []))
+
+    def delete(self, names, message=None):
+        names = list(names)
+        return self.batch(message or f"Delete {len(names)} file(s)", lambda read_file: ({}, names))
+
+    def refresh(self):
+        """Paksa daftar file dibaca ulang dari sumbernya (no-op untuk backend lokal)."""
+
+    def age(self):
+        """Umur (detik) daftar file yang dikembalikan list()."""
+        return 0.0
+
+
+class LocalFolderStorage(StorageBackend):
+    """Folder biasa di disk (test.py). Setiap file ditulis atomik lewat file sementara + rename.
+
+    Isi file ditulis per potongan ke file sementara di folder galeri sambil di-hash, di-fsync,
+    lalu di-rename ke nama akhirnya, sehingga server yang mati di tengah penulisan tidak
+    meninggalkan foto terpotong. Paling banyak max_concurrent_writes penulisan berjalan
+    bersamaan; sisanya menunggu, agar lonjakan unggahan besar tidak saling memperlambat.
+    Isi yang sudah di-stage() sebelum batch() ditulis di luar lock batch, yang cukup me-rename.
+    """
+
+    def __init__(self, root, max_concurrent_writes=DEFAULT_MAX_CONCURRENT_WRITES):
+        self.root = os.path.abspath(root)
+        self._lock = threading.Lock()
+        self._write_slots = threading.BoundedSemaphore(max_concurrent_writes)
+        self._stats_lock = threading.Lock()
+        self.stats = {'writes': 0, 'bytes_written': 0, 'write_wait_seconds': 0.0}
+        os.makedirs(self.root, exist_ok=True)
+        self._remove_stale_tmp()
+
+    def _remove_stale_tmp(self):
+        cutoff = time.time() - STALE_TMP_SECONDS
+        for dir_path, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                tmp_path = os.path.join(dir_path, filename)
+                try:
+                    if filename.endswith(".tmp") and os.path.getmtime(tmp_path) < cutoff:
+                        os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def path(self, name):
+        """Path absolut untuk name; ValueError jika name keluar dari folder galeri (path traversal)."""
+        file_path = os.path.abspath(os.path.join(self.root, name))
+        if '..' in name.split('/') or os.path.commonpath([self.root, file_path]) != self.root or file_path == self.root:
+            raise ValueError(f"Nama file tidak valid atau akses ditolak: {name}")
+        return file_path
+
+    def list(self):
+        entries = []
+        pending = [""]
+        while pending:
+            prefix = pending.pop()
+            with os.scandir(os.path.join(self.root, prefix)) as it:
+                for dir_entry in it:
+                    name = f"{prefix}{dir_entry.name}"
+                    if dir_entry.is_dir():
+                        pending.append(f"{name}/")
+                    elif dir_entry.is_file() and not name.endswith(".tmp"):
+                        stat = dir_entry.stat()
+                        entries.append({'name': name, 'path': name, 'sha': None, 'size': stat.st_size,
+                                        'mtime': stat.st_mtime, 'type': "file"})
+        return entries
+
+    def get(self, name):
+        try:
+            with open(self.path(name), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def metadata(self, name):
+        try:
+            stat = os.stat(self.path(name))
+        except FileNotFoundError:
+            return None
+        return {'name': name, 'path': name, 'sha': None, 'size': stat.st_size, 'mtime': stat.st_mtime, 'type': "file"}
+
+    def stage(self, data, expected_sha256=None, max_bytes=None):
+        """Tulis data (bytes, str, atau file-like) ke file sementara; hasilnya dipakai sebagai nilai puts.
+
+        SHA-256 dan ukuran dihitung sambil menulis. ValueError (dan file sementara dibuang) jika
+        isinya lebih dari max_bytes atau SHA-256-nya tidak sama dengan expected_sha256.
+        """
+        wait_started = time.perf_counter()
+        with self._write_slots:
+            waited = time.perf_counter() - wait_started
+            tmp_path = os.path.join(self.root, f".{uuid.uuid4().hex}.tmp") # Satu folder dengan tujuan: rename atomik
+            try:
+                digest = hashlib.sha256()
+                size = 0
+                with open(tmp_path, 'xb') as f:
+                    for chunk in _iter_chunks(data):
+                        size += len(chunk)
+                        if max_bytes is not None and size > max_bytes:
+                            raise ValueError(f"Ukuran file melebihi batas {max_bytes} byte")
+                        digest.update(chunk)
+                        f.write(chunk)
+                    f.flush()
+                    os.fsync(f.fileno()) # Isi sudah di disk sebelum file terlihat dengan nama akhirnya
+                if expected_sha256 is not None and digest.hexdigest() != expected_sha256:
+                    raise ValueError("Isi file berubah saat ditulis (SHA-256 tidak cocok)")
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        with self._stats_lock:
+            self.stats['writes'] += 1
+            self.stats['bytes_written'] += size
+            self.stats['write_wait_seconds'] += waited
+        return StagedFile(tmp_path, digest.hexdigest(), size)
+
+    def _write(self, name, data):
+        file_path = self.path(name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        staged = data if isinstance(data, StagedFile) else self.stage(data)
+        try:
+            os.replace(staged.tmp_path, file_path) # Atomik: tidak ada foto setengah jadi di galeri
+        except BaseException:
+            self.discard(staged)
+            raise
+        _fsync_dir(os.path.dirname(file_path))
+
+    def discard(self, staged):
+        if isinstance(staged, StagedFile):
+            try:
+                os.remove(staged.tmp_path)
+            except FileNotFoundError:
+                pass # Sudah di-rename ke nama akhirnya oleh batch()
+
+    def batch(self, message, build_changes):
+        with self._lock:
+            puts, deletes = build_changes(self.get)
+            for name, data in puts.items():
+                self._write(name, data)
+            for name in deletes:
+                try:
+                    os.remove(self.path(name))
+                except FileNotFoundError:
+                    pass
+        return bool(puts or deletes)
+
+
+class MemoryStorage(StorageBackend):
+    """Penyimpanan di memori untuk benchmark dan pengujian tanpa jaringan maupun disk."""
+
+    def __init__(self, files=None):
+        self._lock = threading.Lock()
+        self._files = {} # nama -> sha
+        self._blobs = {} # sha -> bytes (seperti object store git, blob lama tidak dibuang)
+        self.stats = {'reads': 0, 'batches': 0}
+        if files:
+            self.batch("Initial files", lambda read_file: (files, []))
+
+    def _store(self, data):
+        data = _as_bytes(data)
+        sha = git_blob_sha(data)
+        self._blobs[sha] = data
+        return sha
+
+    def list(self):
+        with self._lock:
+            return [
+                {'name': name, 'path': name, 'sha': sha, 'size': len(self._blobs[sha]), 'type': "file"}
+                for name, sha in self._files.items()
+            ]
+
+    def get(self, name):
+        with self._lock:
+            self.stats['reads'] += 1
+            sha = self._files.get(name)
+            return None if sha is None else self._blobs[sha]
+
+    def read_blob(self, sha):
+        with self._lock:
+            self.stats['reads'] += 1
+            return self._blobs[sha]
+
+    def batch(self, message, build_changes):
+        with self._lock:
+            def read_file(name):
+                sha = self._files.get(name)
+                return None if sha is None else self._blobs[sha]
+
+            puts, deletes = build_changes(read_file)
+            for name, data in puts.items():
+                self._files[name] = data.sha if isinstance(data, BlobRef) else self._store(data)
+            for name in deletes:
+                self._files.pop(name, None)
+            self.stats['batches'] += 1
+        return bool(puts or deletes)
+
+    def stage(self, data):
+        with self._lock:
+            return BlobRef(self._store(data))
+
+
+class LocalGitStorage(StorageBackend):
+    """Folder galeri di dalam repositori git bare lokal, diakses lewat perintah plumbing git.
+
+    Perilakunya sama dengan repositori GitHub (satu commit per batch, SHA blob, deteksi
+    konflik lewat compare-and-swap pada ref) tetapi tanpa jaringan, sehingga cocok untuk
+    benchmark. Repositori dibuat otomatis jika belum ada.
+    """
+
+    def __init__(self, repo_path, base_path="gallery_images", branch=None, max_retries=4):
+        self.repo_path = os.path.abspath(repo_path)
+        self.base_path = base_path.strip('/')
+        self.max_retries = max_retries
+        self._list_cache = (None, []) # (sha commit, entri) agar list() berulang tidak memanggil ls-tree
+        self.stats = {'git_calls': 0, 'commits': 0, 'conflicts': 0}
+        if not os.path.exists(self.repo_path):
+            subprocess.run(["git", "init", "--bare", "-q", "-b", branch or DEFAULT_GIT_BRANCH, self.repo_path], check=True)
+        # Tanpa branch: branch yang ditunjuk HEAD repositori (main, master, ...)
+        self.branch = branch or self._git("symbolic-ref", "--short", "HEAD").stdout.decode('utf-8').strip()
+
+    def _git(self, *args, input=None, env=None, check=True):
+        self.stats['git_calls'] += 1
+        result = subprocess.run(
+            ["git", f"--git-dir={self.repo_path}", *args], input=input, capture_output=True,
+            env={**os.environ, **GIT_IDENTITY, **(env or {})}
+        )
+        if check and result.returncode != 0:
+            raise RuntimeError(f"git {args[0]} gagal: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return result
+
+    def _full_path(self, name):
+        return f"{self.base_path}/{name}" if self.base_path else name
+
+    def _head(self):
+        result = self._git("rev-parse", "--verify", "-q", f"refs/heads/{self.branch}", check=False)
+        return result.stdout.decode('ascii').strip() or None
+
+    def list(self):
+        head = self._head()
+        if head is None:
+            return []
+        if self._list_cache[0] == head:
+            return list(self._list_cache[1])
+        output = self._git("ls-tree", "-r", "-l", "-z", head, "--", f"{self.base_path}/" if self.base_path else ".").stdout
+        entries = []
+        prefix_len = len(self.base_path) + 1 if self.base_path else 0
+        for record in output.split(b"\0"):
+            if not record:
+                continue
+            info, path = record.decode('utf-8').split("\t", 1)
+            _, kind, sha, size = info.split()
+            if kind == "blob":
+                name = path[prefix_len:]
+                entries.append({'name': name, 'path': name, 'sha': sha, 'size': int(size), 'type': "file"})
+        self._list_cache = (head, entries)
+        return list(entries)
+
+    def _read_at(self, commit_sha, name):
+        if commit_sha is None:
+            return None
+        result = self._git("cat-file", "blob", f"{commit_sha}:{self._full_path(name)}", check=False)
+        return result.stdout if result.returncode == 0 else None
+
+    def get(self, name):
+        return self._read_at(self._head(), name)
+
+    def read_blob(self, sha):
+        return self._git("cat-file", "blob", sha).stdout
+
+    def stage(self, data):
+        return BlobRef(self._git("hash-object", "-w", "--stdin", input=_as_bytes(data)).stdout.decode('ascii').strip())
+
+    def batch(self, message, build_changes):
+        for attempt in range(self.max_retries + 1):
+            head = self._head()
+            puts, deletes = build_changes(lambda name, head=head: self._read_at(head, name))
+            if not puts and not deletes:
+                return False
+
+            index_lines = []
+            for name, data in puts.items():
+                blob = data if isinstance(data, BlobRef) else self.stage(data)
+                index_lines.append(f"{GIT_FILE_MODE} {blob.sha}\t{self._full_path(name)}")
+            for name in deletes:
+                index_lines.append(f"0 {GIT_ZERO_SHA}\t{self._full_path(name)}")
+
+            # Index sementara agar batch yang berjalan bersamaan tidak saling mengganggu
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                index_env = {"GIT_INDEX_FILE": os.path.join(tmp_dir, "index")}
+                if head:
+                    self._git("read-tree", head, env=index_env)
+                self._git("update-index", "--index-info", input="\n".join(index_lines).encode('utf-8') + b"\n", env=index_env)
+                tree = self._git("write-tree", env=index_env).stdout.decode('ascii').strip()
+
+            parents = ["-p", head] if head else []
+            commit = self._git("commit-tree", tree, *parents, "-m", message).stdout.decode('ascii').strip()
+            # Compare-and-swap: gagal jika branch sudah digeser batch lain sejak head dibaca
+            result = self._git("update-ref", f"refs/heads/{self.branch}", commit, head or GIT_ZERO_SHA, check=False)
+            if result.returncode == 0:
+                self.stats['commits'] += 1
+                return True
+            if attempt == self.max_retries:
+                raise RuntimeError(f"Branch {self.branch} terus berubah, batch dibatalkan")
+            self.stats['conflicts'] += 1
+            time.sleep(0.05 * (2 ** attempt))
+        return False
+
+
+class GitHubStorage(StorageBackend):
+    """Folder galeri di repositori GitHub.
+
+    Daftar file dibaca dari snapshot GalleryListing bersama, isi file per SHA lewat read_blob
+    (misalnya GitHubBlobReader.read), dan setiap batch menjadi satu commit Git Data API.
+    """
+
+    def __init__(self, repo, listing, read_blob, base_path="gallery_images", branch=None, scheduler=None):
+        self.repo = repo
+        self.listing = listing
+        self._read_blob = read_blob
+        self.base_path = base_path.strip('/')
+        self.writer = GitBatchWriter(repo, branch, scheduler=scheduler)
+
+    @property
+    def last_error(self):
+        return self.listing.last_error
+
+    def list(self):
+        return [entry for entry in self.listing.snapshot() if entry['type'] == "file"]
+
+    def get(self, name):
+        entry = self.metadata(name)
+        return None if entry is None else self._read_blob(entry['sha'])
+
+    def read_blob(self, sha):
+        return self._read_blob(sha)
+
+    def stage(self, data):
+        return self.writer.create_blob(_as_bytes(data))
+
+    def batch(self, message, build_changes):
+        def build_repo_changes(read_file):
+            puts, deletes = build_changes(lambda name: read_file(f"{self.base_path}/{name}"))
+            return (
+                {f"{self.base_path}/{name}": data for name, data in puts.items()},
+                [f"{self.base_path}/{name}" for name in deletes],
+            )
+
+        committed = self.writer.commit(message, build_repo_changes) is not None
+        if committed:
+            self.listing.force_refresh() # Perubahan langsung terlihat di snapshot
+        return committed
+
+    def refresh(self):
+        self.listing.force_refresh()
+
+    def age(self):
+        return self.listing.age()
@@ -1,16 +1,85 @@
 import streamlit as st
 import os
-from PIL import Image
-import uuid # Untuk nama file unik
+import functools
 from datetime import datetime # Untuk tahun di footer
+from thumbnail_cache import ThumbnailCache # Cache thumbnail di disk
+from image_memory_cache import ImageBytesCache, stats_delta # Cache isi thumbnail di memori
+from metadata_index import MetadataIndex # Indeks metadata foto (SQLite)
+from gallery_pagination import page_size_selector, paginate, render_page_controls
+from heic_converter import HeicConverter, is_heic # Konversi HEIC di process pool
+from derivatives import build_display_variants, derivative_name, format_savings
+from storage import LocalFolderStorage # Backend penyimpanan folder lokal
+from rerun_timing import start_rerun, finish_rerun, fragment_timer # Rincian waktu per tahap (opsional, sidebar)
+from content_address import content_filename, digest_stream, find_duplicate # Nama file = hash isi
+from perceptual_hash import PerceptualHashIndex, gallery_images, index_path, folder_index_key # Indeks foto mirip (hash perseptual)
 
 # Konfigurasi
 UPLOAD_FOLDER = 'uploads_galeri_wdf'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'heic'}
 MAX_FILE_SIZE_MB = 32 # Max 32MB
-
-# Buat folder upload jika belum ada
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+THUMBNAIL_CACHE_DIR = os.path.join('.cache_galeri_wdf', 'thumbnails') # Lokasi cache thumbnail
+THUMBNAIL_CACHE_MAX_MB = 512 # Batas total ukuran cache thumbnail
+IMAGE_MEMORY_CACHE_MB = 64 # Batas isi thumbnail yang disimpan di memori (dipakai bersama semua sesi)
+METADATA_INDEX_PATH = os.path.join('.cache_galeri_wdf', 'metadata.sqlite3') # Lokasi indeks metadata
+PHASH_INDEX_PATH = index_path(folder_index_key(UPLOAD_FOLDER)) # Lokasi indeks foto mirip (satu per folder upload)
+DISPLAY_VARIANT_FORMATS = ('webp',) # Tambahkan 'avif' untuk varian yang lebih kecil (encode lebih lambat)
+
+@st.cache_resource
+def get_storage():
+    """Backend penyimpanan folder upload (membuat folder jika belum ada); semua tulis/hapus lewat sini."""
+    return LocalFolderStorage(UPLOAD_FOLDER)
+
+@st.cache_resource
+def get_thumbnail_cache():
+    """Satu cache thumbnail untuk seluruh proses, dipakai bersama oleh semua sesi."""
+    return ThumbnailCache(THUMBNAIL_CACHE_DIR, max_bytes=THUMBNAIL_CACHE_MAX_MB * 1024 * 1024)
+
+@st.cache_resource
+def get_image_memory_cache():
+    """Isi thumbnail di memori untuk seluruh proses, agar rerun tidak membaca ulang file dari disk."""
+    return ImageBytesCache(max_bytes=IMAGE_MEMORY_CACHE_MB * 1024 * 1024)
+
+@st.cache_resource
+def get_metadata_index():
+    """Satu indeks metadata untuk seluruh proses, dipakai bersama oleh semua sesi."""
+    return MetadataIndex(METADATA_INDEX_PATH, get_storage().root, allowed_file)
+
+@st.cache_resource
+def get_heic_converter():
+    """Satu process pool konversi HEIC untuk seluruh proses."""
+    return HeicConverter()
+
+def phash_source(storage, thumbnail_cache, entry):
+    """Thumbnail kecil foto (yang juga dipakai galeri) sebagai bahan hash perseptual."""
+    webp_path = storage.path(derivative_name(entry['name'], 'webp'))
+    source_path = webp_path if os.path.exists(webp_path) else storage.path(entry['name'])
+    return thumbnail_cache.get(source_path, 'small', filename=entry['name'])
+
+@st.cache_resource
+def get_phash_index():
+    """Satu indeks foto mirip untuk seluruh proses; foto yang belum di-hash diisi di latar belakang."""
+    storage = get_storage()
+    phash_index = PerceptualHashIndex(PHASH_INDEX_PATH)
+    phash_index.start_sync(
+        lambda: gallery_images(storage.list(), ALLOWED_EXTENSIONS),
+        functools.partial(phash_source, storage, get_thumbnail_cache())
+    )
+    return phash_index
+
+def display_source_path(image_name):
+    """Path varian tampilan WebP jika ada (lebih kecil dan sudah diputar), jika tidak path foto asli."""
+    webp_path = get_storage().path(derivative_name(image_name, 'webp'))
+    if os.path.exists(webp_path):
+        return webp_path
+    return get_storage().path(image_name)
+
+def thumbnail_variant_for(num_cols):
+    """Pilih varian thumbnail terkecil yang masih tajam untuk jumlah kolom."""
+    if num_cols <= 2:
+        return 'large'
+    if num_cols <= 4:
+        return 'medium'
+    return 'small'
 
 def allowed_file(filename):
     return '.' in filename and \
@@ -22,6 +91,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+rerun_timer = start_rerun("test.py")
 
 # --- Header ---
 st.markdown(
@@ -131,6 +201,27 @@ if 'uploader_key_counter' not in st.session_state:
 if 'image_descriptions' not in st.session_state:
     st.session_state.image_descriptions = {}
 
+# Laporan penghematan ukuran dari unggahan terakhir (ditampilkan sekali setelah rerun)
+if 'last_upload_report' in st.session_state:
+    st.success(f"Foto berhasil diunggah ke Galeri WDF! 📸 {st.session_state.pop('last_upload_report')}")
+if 'last_upload_duplicate' in st.session_state:
+    st.info(f"Foto yang sama sudah ada di galeri ({st.session_state.pop('last_upload_duplicate')}), jadi tidak disimpan lagi.")
+if st.session_state.get('last_upload_similar'):
+    similar_names = st.session_state.pop('last_upload_similar')
+    st.warning(
+        f"Foto ini mirip dengan {len(similar_names)} foto yang sudah ada di galeri "
+        "(mungkin foto yang sama yang disimpan ulang atau diperkecil). Hapus salah satunya jika memang ganda."
+    )
+    similar_cols = st.columns(6)
+    for similar_idx, similar_name in enumerate(similar_names[:6]):
+        try:
+            similar_cols[similar_idx].image(
+                get_thumbnail_cache().get(display_source_path(similar_name), 'small', filename=similar_name),
+                caption=similar_name[:12]
+            )
+        except OSError:
+            pass # Foto sudah dihapus
+
 uploaded_file_object = st.file_uploader(
     f"Pilih Foto (Max: {MAX_FILE_SIZE_MB}MB, Format: {', '.join(ALLOWED_EXTENSIONS)})",
     type=list(ALLOWED_EXTENSIONS),
@@ -145,21 +236,70 @@ if uploaded_file_object is not None:
         elif not allowed_file(uploaded_file_object.name):
             st.error(f"Jenis file tidak diizinkan. Hanya: {', '.join(ALLOWED_EXTENSIONS)}.")
         else:
-            # Simpan file dengan nama unik (UUID)
+            # Simpan file dengan nama dari hash isinya: foto yang sama selalu bernama sama
             original_filename = uploaded_file_object.name
-            unique_id = uuid.uuid4().hex # Gunakan seluruh UUID untuk keunikan maksimal
-            _, ext = os.path.splitext(original_filename) # Ambil hanya ekstensi dari nama asli
-            unique_filename = f"{unique_id}{ext}" # Nama file hanya UUID + ekstensi
-            file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
+            upload_digest = digest_stream(uploaded_file_object)
+            unique_filename = content_filename(original_filename, upload_digest)
 
             try:
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file_object.getbuffer())
+                if find_duplicate(get_storage().list(), unique_filename):
+                    # Sudah ada di galeri: tidak ada yang ditulis ke disk
+                    st.session_state.last_upload_duplicate = unique_filename
+                    st.session_state.uploader_key_counter += 1
+                    st.rerun()
+                file_content = uploaded_file_object.getbuffer()
+                original_sha256 = upload_digest # Diperiksa ulang saat ditulis ke disk
+                if is_heic(original_filename):
+                    # HEIC tidak bisa ditampilkan browser, jadi simpan sebagai JPEG
+                    with st.spinner("Mengonversi HEIC ke JPEG..."), rerun_timer.span("heic_convert"):
+                        file_content, heic_info = get_heic_converter().convert(uploaded_file_object.getvalue())
+                    original_sha256 = None # Isi yang disimpan adalah hasil konversi
+
+                files_to_write = {unique_filename: file_content}
+
+                # Varian tampilan ringkas ditulis di samping foto asli (asli tetap utuh untuk diunduh)
+                try:
+                    with rerun_timer.span("derivatives"):
+                        display_variants, derivative_report = build_display_variants(
+                            bytes(file_content), formats=DISPLAY_VARIANT_FORMATS
+                        )
+                except Exception as e:
+                    display_variants, derivative_report = {}, None
+                    st.warning(f"Varian tampilan tidak dapat dibuat, galeri akan memakai foto asli: {e}")
+                for image_format, variant_bytes in display_variants.items():
+                    files_to_write[derivative_name(unique_filename, image_format)] = variant_bytes
+
+                # Foto yang sama tetapi disimpan ulang/diperkecil tidak tertangkap hash isi
+                try:
+                    with rerun_timer.span("phash"):
+                        upload_hash = get_phash_index().hash_source(bytes(file_content))
+                        similar_matches = get_phash_index().query(upload_hash, exclude=unique_filename)
+                except Exception:
+                    upload_hash, similar_matches = None, []
+
+                with rerun_timer.span("storage_write"):
+                    # Ditulis per potongan ke file sementara (di-hash dan di-fsync) di luar lock batch,
+                    # dengan jumlah penulisan bersamaan dibatasi; batch cukup me-rename ke nama akhir
+                    storage = get_storage()
+                    staged_files = {}
+                    try:
+                        for name, data in files_to_write.items():
+                            staged_files[name] = storage.stage(
+                                data, expected_sha256=original_sha256 if name == unique_filename else None
+                            )
+                        storage.batch(f"Upload {unique_filename}", lambda read_file: (staged_files, []))
+                    finally:
+                        for staged in staged_files.values(): # Yang belum di-rename (error) tidak boleh tertinggal
+                            storage.discard(staged)
+                get_metadata_index().add(unique_filename) # Perbarui indeks tanpa memindai folder
+                if upload_hash is not None:
+                    get_phash_index().add(unique_filename, upload_hash)
+                st.session_state.last_upload_similar = [name for _, name in similar_matches]
                 
                 # Inisialisasi deskripsi untuk gambar yang baru diunggah
                 st.session_state.image_descriptions[unique_filename] = "" 
                 
-                st.success("Foto berhasil diunggah ke Galeri WDF! 📸")
+                st.session_state.last_upload_report = format_savings(derivative_report) if derivative_report else ""
                 
                 # Increment counter untuk mereset file uploader pada rerun berikutnya
                 st.session_state.uploader_key_counter += 1
@@ -175,15 +315,76 @@ st.markdown("---")
 # --- Bagian Galeri ---
 st.header("Koleksi Foto")
 
-image_files = []
-if os.path.exists(UPLOAD_FOLDER):
-    valid_files = [f for f in os.listdir(UPLOAD_FOLDER) if allowed_file(f)]
-    # Urutkan berdasarkan waktu modifikasi terbaru
-    image_files = sorted(
-        valid_files,
-        key=lambda x: os.path.getmtime(os.path.join(UPLOAD_FOLDER, x)),
-        reverse=True
-    )
+SORT_OPTIONS = {
+    "Terbaru diunggah": 'mtime',
+    "Tanggal foto diambil": 'taken_at',
+    "Nama file": 'filename',
+}
+sort_label = st.selectbox("Urutkan Berdasarkan", list(SORT_OPTIONS.keys()), key="gallery_sort")
+
+# Folder hanya dipindai ulang jika mtime direktori berubah; selebihnya cukup query berindeks
+metadata_index = get_metadata_index()
+get_phash_index() # Foto lama mulai di-hash di latar belakang sejak halaman pertama dibuka
+with rerun_timer.span("index_reconcile"): # os.listdir/getmtime hanya jika folder berubah
+    metadata_index.reconcile()
+with rerun_timer.span("index_list"):
+    image_files = metadata_index.list_files(order=SORT_OPTIONS[sort_label])
+rerun_timer.count("images_total", len(image_files))
+
+def update_description(image_name):
+    """Callback input deskripsi: cukup simpan ke session state, tanpa rerun seluruh galeri."""
+    st.session_state.image_descriptions[image_name] = st.session_state[f"description_{image_name}"]
+
+def toggle_delete_selection(image_name):
+    """Callback checkbox hapus: pilihan disimpan di session state, bukan dibaca ulang oleh seluruh skrip."""
+    if st.session_state[f"delete_cb_{image_name}"]:
+        st.session_state.selected_for_delete.add(image_name)
+    else:
+        st.session_state.selected_for_delete.discard(image_name)
+    st.session_state.delete_selection_changed = True # Ditampilkan oleh kartu, bukan dari callback
+
+@st.fragment
+def render_gallery_card(image_name, thumbnail_variant):
+    """Satu kartu foto. Widget di dalamnya (deskripsi, checkbox hapus) hanya me-rerun kartu ini."""
+    with fragment_timer(rerun_timer, "gallery_card") as card_timer:
+        try:
+            # Tampilkan thumbnail dari cache (dibuat dari varian WebP), bukan file asli beresolusi penuh
+            with card_timer.span("thumbnail"):
+                thumbnail_path = get_thumbnail_cache().get(display_source_path(image_name), thumbnail_variant, filename=image_name)
+                thumbnail_data = get_image_memory_cache().read(thumbnail_path) # File dibuka dan ditutup di dalam cache
+
+            with st.container(border=True), card_timer.span("render_card"): # Menggunakan border=True untuk tampilan seperti kartu
+                # Menampilkan gambar tanpa caption default
+                st.image(thumbnail_data, use_container_width=True)
+
+                # Input teks untuk deskripsi (kunci unik untuk setiap input)
+                st.text_input(
+                    "Deskripsi:",
+                    value=st.session_state.image_descriptions.get(image_name, ""),
+                    key=f"description_{image_name}",
+                    on_change=update_description,
+                    args=(image_name,)
+                )
+
+                st.download_button(
+                    "⬇️ Unduh Asli",
+                    data=functools.partial(get_storage().get, image_name), # Dibaca hanya saat diklik
+                    file_name=image_name,
+                    key=f"download_{image_name}"
+                )
+
+                if st.session_state.delete_mode:
+                    st.checkbox(
+                        "Pilih untuk hapus",
+                        value=image_name in st.session_state.selected_for_delete,
+                        key=f"delete_cb_{image_name}",
+                        on_change=toggle_delete_selection,
+                        args=(image_name,)
+                    )
+                    if st.session_state.pop('delete_selection_changed', False):
+                        st.toast(f"{len(st.session_state.selected_for_delete)} foto dipilih untuk dihapus")
+        except Exception as e:
+            st.error(f"Tidak dapat memuat gambar {image_name}: {e}")
 
 if not image_files:
     st.info("Belum ada foto di Galeri WDF. Jadilah yang pertama mengunggah! 🌟")
@@ -223,76 +424,61 @@ else:
     # Tampilkan Galeri
     # Slider untuk jumlah kolom responsif
     num_cols = st.columns(1)[0].slider("Jumlah Kolom Tampilan", 1, 6, 4) 
+    page_size = page_size_selector()
+
+    # Hanya foto di halaman yang sedang dilihat yang diproses dan dikirim ke browser
+    visible_files, page_info = paginate(image_files, page_size)
+    render_page_controls(page_info, position="top")
+    rerun_timer.count("images_visible", len(visible_files))
 
     # Tampilkan gambar dalam grid
     cols = st.columns(num_cols)
     col_idx = 0
+    thumbnail_variant = thumbnail_variant_for(num_cols)
+    memory_stats_before = get_image_memory_cache().stats()
 
-    for image_name in image_files:
+    for image_name in visible_files:
         with cols[col_idx]:
-            file_path = os.path.join(UPLOAD_FOLDER, image_name)
-            try:
-                img = Image.open(file_path)
-                
-                with st.container(border=True): # Menggunakan border=True untuk tampilan seperti kartu
-                    # Perbaikan: Mengganti use_column_width dengan use_container_width
-                    # Menampilkan gambar tanpa caption default
-                    st.image(img, use_container_width=True) 
-
-                    # Input teks untuk deskripsi
-                    current_description = st.session_state.image_descriptions.get(image_name, "")
-                    new_description = st.text_input(
-                        "Deskripsi:",
-                        value=current_description,
-                        key=f"description_{image_name}" # Kunci unik untuk setiap input
-                    )
-                    # Perbarui deskripsi jika ada perubahan
-                    if new_description != current_description:
-                        st.session_state.image_descriptions[image_name] = new_description
-                        st.rerun() # Rerun untuk memperbarui tampilan (opsional, bisa juga tanpa rerun jika tidak ada efek samping besar)
-
-                    if st.session_state.delete_mode:
-                        checkbox_key = f"delete_cb_{image_name}"
-                        is_checked = image_name in st.session_state.selected_for_delete
-                        
-                        if st.checkbox(f"Pilih untuk hapus", value=is_checked, key=checkbox_key):
-                            st.session_state.selected_for_delete.add(image_name)
-                        else:
-                            if image_name in st.session_state.selected_for_delete:
-                                st.session_state.selected_for_delete.remove(image_name)
-
-            except Exception as e:
-                st.error(f"Tidak dapat memuat gambar {image_name}: {e}")
+            render_gallery_card(image_name, thumbnail_variant)
             
         col_idx = (col_idx + 1) % num_cols
+    for counter, value in stats_delta(memory_stats_before, get_image_memory_cache().stats()).items():
+        rerun_timer.count(f"image_memory_{counter}", value) # Sesi lain yang aktif ikut terhitung
 
-    if st.session_state.delete_mode and st.session_state.selected_for_delete:
+    render_page_controls(page_info, position="bottom")
+
+    if st.session_state.delete_mode:
+        # Centang di kartu hanya me-rerun kartu itu, jadi jumlah pilihan dibaca saat tombol diklik
         st.markdown("---")
-        st.markdown(
-            f"<h3 style='text-align: center; color: #e9ecef;'>{len(st.session_state.selected_for_delete)} Foto Terpilih</h3>",
-            unsafe_allow_html=True
-        )
-        if st.button(
-            f"Hapus {len(st.session_state.selected_for_delete)} Foto Terpilih",
-            key="confirm_delete",
-            type="primary" # Menggunakan type primary untuk tombol utama
-        ):
+        st.caption("Centang foto yang ingin dihapus (bisa di beberapa halaman), lalu klik tombol di bawah.")
+        confirm_delete = st.button("🗑️ Hapus Foto Terpilih", key="confirm_delete", type="primary")
+        if confirm_delete and not st.session_state.selected_for_delete:
+            st.info("Belum ada foto yang dipilih.")
+        elif confirm_delete:
             deleted_count = 0
             error_count = 0
-            upload_folder_abs = os.path.abspath(UPLOAD_FOLDER)
+            storage = get_storage()
 
             for filename_to_delete in st.session_state.selected_for_delete:
-                file_path_abs = os.path.abspath(os.path.join(UPLOAD_FOLDER, filename_to_delete))
-
-                # Validasi keamanan untuk mencegah path traversal
-                if not file_path_abs.startswith(upload_folder_abs) or '..' in filename_to_delete:
-                    st.error(f"Nama file tidak valid atau akses ditolak: {filename_to_delete}")
+                # Validasi keamanan untuk mencegah path traversal (storage.path menolak nama di luar folder)
+                try:
+                    file_path_abs = storage.path(filename_to_delete)
+                except ValueError as e:
+                    st.error(str(e))
                     error_count += 1
                     continue
 
                 if os.path.exists(file_path_abs):
                     try:
-                        os.remove(file_path_abs)
+                        # Foto asli beserta varian tampilannya
+                        with rerun_timer.span("storage_delete"):
+                            storage.delete(
+                                [filename_to_delete] + [derivative_name(filename_to_delete, image_format) for image_format in ('webp', 'avif')],
+                                f"Delete {filename_to_delete}"
+                            )
+                        get_thumbnail_cache().discard(filename_to_delete)
+                        metadata_index.remove(filename_to_delete)
+                        get_phash_index().remove(filename_to_delete)
                         # Hapus deskripsi terkait dari session state
                         if filename_to_delete in st.session_state.image_descriptions:
                             del st.session_state.image_descriptions[filename_to_delete]
@@ -312,8 +498,6 @@ else:
             st.session_state.delete_mode = False
             st.session_state.selected_for_delete = set()
             st.rerun() # Refresh halaman setelah penghapusan
-    elif st.session_state.delete_mode and not st.session_state.selected_for_delete:
-        st.info("Pilih foto untuk mengaktifkan tombol hapus.")
 
 
 # --- Footer ---
@@ -326,3 +510,5 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+finish_rerun(rerun_timer)
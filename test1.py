@@ -1,10 +1,24 @@
 import streamlit as st
 import os
 from PIL import Image
-import uuid
+import functools
 from datetime import datetime
-from github import Github 
+from github_client import connect_repo, pooled_session, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT 
+from github_scheduler import RateLimitScheduler, DEFAULT_WRITE_INTERVAL
 from dotenv import load_dotenv 
+from gallery_pagination import page_size_selector, paginate, render_page_controls
+from github_listing import GalleryListing, GITHUB_API_URL as DEFAULT_GITHUB_API_URL
+from storage import GitHubStorage, LocalGitStorage, MemoryStorage
+from derivatives import build_display_variants, derivative_name, format_savings
+from image_proxy import BlobCache, GitHubBlobReader, ImageProxy, ImageProxyServer
+from thumbnail_cache import ThumbnailCache
+from image_memory_cache import ImageBytesCache, stats_delta
+from gallery_grid import gallery_grid, proxy_item
+from heic_converter import HeicConverter, is_heic
+from large_objects import LargeObjectOffload, open_object_store, orphaned_pointers, DEFAULT_S3_REGION, DEFAULT_THRESHOLD_MB
+from rerun_timing import start_rerun, finish_rerun, fragment_timer
+from content_address import content_filename, digest_stream, find_duplicate
+from perceptual_hash import PerceptualHashIndex, gallery_images, index_path, git_index_key
 
 # Muat variabel lingkungan jika berjalan secara lokal
 load_dotenv() 
@@ -13,17 +27,146 @@ load_dotenv()
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_REPO_OWNER = os.getenv("GITHUB_REPO_OWNER")
 GITHUB_REPO_NAME = os.getenv("GITHUB_REPO_NAME")
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", DEFAULT_GITHUB_API_URL) # Bisa diarahkan ke server fake lokal
+GITHUB_BRANCH = os.getenv("GITHUB_BRANCH") # Kosong = branch default repositori
+GITHUB_POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", DEFAULT_POOL_SIZE)) # Koneksi keep-alive ke GitHub
+GITHUB_TIMEOUT = int(os.getenv("GITHUB_TIMEOUT", DEFAULT_TIMEOUT)) # detik per request (PyGithub hanya menerima int)
+GITHUB_WRITE_INTERVAL = float(os.getenv("GITHUB_WRITE_INTERVAL", DEFAULT_WRITE_INTERVAL)) # Jeda antar-request tulis
+# Foto dibaca lewat proxy lokal (cache disk per SHA blob), bukan URL raw.githubusercontent.com,
+# sehingga repositori privat juga bisa ditampilkan
+BLOB_CACHE_DIR = ".cache_galeri_wdf/blobs"
+BLOB_CACHE_MAX_MB = 1024
+BLOB_THUMBNAIL_CACHE_DIR = ".cache_galeri_wdf/blob_thumbnails"
+IMAGE_MEMORY_CACHE_MB = 64 # Isi thumbnail yang disimpan di memori, agar rerun tidak membaca ulang disk
+IMAGE_PROXY_PORT = os.getenv("IMAGE_PROXY_PORT") # Jika diisi, browser mengambil foto langsung dari server proxy
+IMAGE_PROXY_HOST = os.getenv("IMAGE_PROXY_HOST", "127.0.0.1") # Proxy tanpa autentikasi: hanya lokal, kecuali sengaja dibuka (mis. "0.0.0.0" di belakang reverse proxy)
+IMAGE_PROXY_PUBLIC_URL = os.getenv("IMAGE_PROXY_PUBLIC_URL", f"http://localhost:{IMAGE_PROXY_PORT}")
 GITHUB_UPLOAD_PATH = "gallery_images" # Sub-direktori di repositori GitHub untuk gambar
+# Foto asli yang besar bisa disimpan di luar repositori: repositori hanya berisi file pointer
+# kecil plus varian tampilan, dan proxy gambar mengganti pointer dengan isi aslinya
+LARGE_OBJECT_STORE = os.getenv("LARGE_OBJECT_STORE") # Folder lokal atau s3://bucket/prefix; kosong = semua di repositori
+LARGE_OBJECT_THRESHOLD_MB = float(os.getenv("LARGE_OBJECT_THRESHOLD_MB", DEFAULT_THRESHOLD_MB))
+LARGE_OBJECT_S3_ENDPOINT = os.getenv("LARGE_OBJECT_S3_ENDPOINT") # Misalnya http://localhost:9000 (MinIO)
+LARGE_OBJECT_S3_ACCESS_KEY = os.getenv("LARGE_OBJECT_S3_ACCESS_KEY")
+LARGE_OBJECT_S3_SECRET_KEY = os.getenv("LARGE_OBJECT_S3_SECRET_KEY")
+LARGE_OBJECT_S3_REGION = os.getenv("LARGE_OBJECT_S3_REGION", DEFAULT_S3_REGION)
+GALLERY_STORAGE = os.getenv("GALLERY_STORAGE", "github") # github | git (repositori bare lokal) | memory
+GALLERY_GIT_PATH = os.getenv("GALLERY_GIT_PATH", ".galeri_wdf.git") # Dipakai jika GALLERY_STORAGE=git
+# Hash perseptual setiap foto, untuk mengenali foto mirip; satu indeks per repositori galeri
+PHASH_INDEX_PATH = index_path({
+    "github": f"github_{GITHUB_REPO_OWNER}_{GITHUB_REPO_NAME}",
+    "git": git_index_key(GALLERY_GIT_PATH),
+}.get(GALLERY_STORAGE, GALLERY_STORAGE))
 
 # Pastikan semua variabel lingkungan diatur
-if not all([GITHUB_TOKEN, GITHUB_REPO_OWNER, GITHUB_REPO_NAME]):
+if GALLERY_STORAGE == "github" and not all([GITHUB_TOKEN, GITHUB_REPO_OWNER, GITHUB_REPO_NAME]):
     st.error("Error: Variabel lingkungan GITHUB_TOKEN, GITHUB_REPO_OWNER, atau GITHUB_REPO_NAME tidak diatur.")
     st.stop() 
 
-# Inisialisasi GitHub API
+@st.cache_resource
+def get_github_scheduler():
+    """Satu penjadwal kuota GitHub untuk seluruh proses: semua request baca/tulis melewatinya."""
+    return RateLimitScheduler(write_interval=GITHUB_WRITE_INTERVAL)
+
+@st.cache_resource
+def get_github_repo():
+    """Satu client GitHub (pool koneksi keep-alive) dan handle repositori untuk seluruh proses."""
+    _, github_repo = connect_repo(
+        GITHUB_TOKEN, GITHUB_REPO_OWNER, GITHUB_REPO_NAME, api_url=GITHUB_API_URL,
+        pool_size=GITHUB_POOL_SIZE, timeout=GITHUB_TIMEOUT, scheduler=get_github_scheduler()
+    )
+    return github_repo
+
+@st.cache_resource
+def get_github_branch():
+    """Branch galeri, ditentukan sekali: GITHUB_BRANCH, atau branch default repositori."""
+    return GITHUB_BRANCH or get_github_repo().default_branch
+
+@st.cache_resource
+def get_gallery_listing():
+    """Satu snapshot daftar foto untuk seluruh proses, disegarkan oleh satu poller latar belakang."""
+    listing = GalleryListing(
+        GITHUB_TOKEN, GITHUB_REPO_OWNER, GITHUB_REPO_NAME, GITHUB_UPLOAD_PATH, branch=get_github_branch(),
+        api_url=GITHUB_API_URL,
+        recursive=True, # Ikut mendaftar varian tampilan di sub-folder web/
+        session=pooled_session(GITHUB_POOL_SIZE, get_github_scheduler()), timeout=GITHUB_TIMEOUT
+    )
+    return listing.start()
+
+@st.cache_resource
+def get_storage():
+    """Backend penyimpanan galeri untuk seluruh proses; aplikasi hanya menampilkan isinya."""
+    if GALLERY_STORAGE == "git":
+        return LocalGitStorage(GALLERY_GIT_PATH, GITHUB_UPLOAD_PATH)
+    if GALLERY_STORAGE == "memory":
+        return MemoryStorage()
+    blob_reader = GitHubBlobReader(
+        GITHUB_TOKEN, GITHUB_REPO_OWNER, GITHUB_REPO_NAME, api_url=GITHUB_API_URL,
+        session=pooled_session(GITHUB_POOL_SIZE, get_github_scheduler()), timeout=GITHUB_TIMEOUT
+    )
+    return GitHubStorage(
+        get_github_repo(), get_gallery_listing(), blob_reader.read, GITHUB_UPLOAD_PATH, branch=get_github_branch(),
+        scheduler=get_github_scheduler()
+    )
+
+@st.cache_resource
+def get_heic_converter():
+    """Satu process pool konversi HEIC untuk seluruh proses."""
+    return HeicConverter()
+
+@st.cache_resource
+def get_large_objects():
+    """Penyimpanan foto asli berukuran besar di luar repositori (nonaktif jika LARGE_OBJECT_STORE kosong)."""
+    store = None
+    if LARGE_OBJECT_STORE:
+        store = open_object_store(
+            LARGE_OBJECT_STORE, LARGE_OBJECT_S3_ENDPOINT, LARGE_OBJECT_S3_ACCESS_KEY, LARGE_OBJECT_S3_SECRET_KEY,
+            LARGE_OBJECT_S3_REGION
+        )
+    return LargeObjectOffload(store, threshold_bytes=int(LARGE_OBJECT_THRESHOLD_MB * 1024 * 1024))
+
+@st.cache_resource
+def get_image_proxy():
+    """Satu cache blob (per SHA) dan thumbnail untuk seluruh proses; setiap blob diambil sekali saja."""
+    blob_cache = BlobCache(
+        BLOB_CACHE_DIR, get_storage().read_blob, max_bytes=BLOB_CACHE_MAX_MB * 1024 * 1024,
+        resolve=get_large_objects().resolve # File pointer diganti isi aslinya sebelum masuk cache
+    )
+    return ImageProxy(blob_cache, ThumbnailCache(BLOB_THUMBNAIL_CACHE_DIR))
+
+@st.cache_resource
+def get_image_memory_cache():
+    """Isi thumbnail di memori untuk seluruh proses (LRU, dibatasi IMAGE_MEMORY_CACHE_MB)."""
+    return ImageBytesCache(max_bytes=IMAGE_MEMORY_CACHE_MB * 1024 * 1024)
+
+@st.cache_resource
+def get_image_proxy_server():
+    """Server proxy HTTP opsional agar browser bisa meng-cache foto selamanya (header immutable)."""
+    return ImageProxyServer(get_image_proxy(), IMAGE_PROXY_HOST, int(IMAGE_PROXY_PORT)).start()
+
+def phash_entries(storage):
+    """Foto utama galeri, masing-masing dengan SHA varian tampilannya (jika ada) sebagai 'display_sha'."""
+    entries = storage.list()
+    shas = {entry['name']: entry['sha'] for entry in entries}
+    return [
+        dict(entry, display_sha=shas.get(derivative_name(entry['name'], 'webp'), entry['sha']))
+        for entry in gallery_images(entries, ALLOWED_EXTENSIONS)
+    ]
+
+def phash_source(image_proxy, entry):
+    """Thumbnail kecil foto (dari varian tampilan, lebih ringan diunduh) sebagai bahan hash perseptual."""
+    return image_proxy.path_for(entry['display_sha'], 'small')
+
+@st.cache_resource
+def get_phash_index():
+    """Satu indeks foto mirip untuk seluruh proses; foto yang belum di-hash diisi di latar belakang."""
+    phash_index = PerceptualHashIndex(PHASH_INDEX_PATH)
+    phash_index.start_sync(functools.partial(phash_entries, get_storage()), functools.partial(phash_source, get_image_proxy()))
+    return phash_index
+
+# Inisialisasi penyimpanan (client dan snapshot dipakai bersama, rerun tidak memanggil GitHub)
 try:
-    g = Github(GITHUB_TOKEN)
-    repo = g.get_user(GITHUB_REPO_OWNER).get_repo(GITHUB_REPO_NAME)
+    get_storage().list()
 except Exception as e:
     st.error(f"Gagal terhubung ke repositori GitHub. Pastikan token dan detail repositori benar: {e}")
     st.stop()
@@ -31,17 +174,36 @@ except Exception as e:
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'heic'}
 MAX_FILE_SIZE_MB = 32 # Max 32MB
+DISPLAY_VARIANT_FORMATS = ('webp',) # Tambahkan 'avif' untuk varian yang lebih kecil (encode lebih lambat)
+
+get_phash_index() # Foto lama mulai di-hash di latar belakang sejak halaman pertama dibuka
 
 def allowed_file(filename): # Pastikan definisi ini ada di sini, di awal
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def thumbnail_variant_for(num_cols):
+    """Pilih varian thumbnail terkecil yang masih tajam untuk jumlah kolom."""
+    if num_cols <= 2:
+        return 'large'
+    if num_cols <= 4:
+        return 'medium'
+    return 'small'
+
+def image_source(blob_sha, variant):
+    """Sumber gambar untuk st.image: URL server proxy (jika dijalankan) atau isi thumbnail dari cache memori."""
+    if IMAGE_PROXY_PORT:
+        get_image_proxy_server()
+        return f"{IMAGE_PROXY_PUBLIC_URL}/blobs/{blob_sha}/{variant}"
+    return get_image_memory_cache().read(get_image_proxy().path_for(blob_sha, variant))
+
 st.set_page_config(
     page_title="🏕️ Galeri WDF",
     page_icon="📸",
     layout="wide", # Tetap "wide" agar konten bisa mengisi lebar, tapi kita batasi dengan CSS
     initial_sidebar_state="expanded"
 )
+rerun_timer = start_rerun("test1.py")
 
 # --- CSS Styling (Tambahkan Bagian Ini atau Modifikasi yang Sudah Ada) ---
 st.markdown(
@@ -145,6 +307,23 @@ st.header("Bagikan Foto ke Galeri WDF")
 if 'uploader_key_counter' not in st.session_state:
     st.session_state.uploader_key_counter = 0
 
+# Laporan penghematan ukuran dari unggahan terakhir (ditampilkan sekali setelah rerun)
+if 'last_upload_report' in st.session_state:
+    st.success(f"Foto berhasil diunggah ke Galeri WDF di GitHub! 📸 {st.session_state.pop('last_upload_report')}")
+if 'last_upload_duplicate' in st.session_state:
+    st.info(f"Foto yang sama sudah ada di galeri ({st.session_state.pop('last_upload_duplicate')}), jadi tidak diunggah lagi.")
+if st.session_state.get('last_upload_similar'):
+    similar_names = st.session_state.pop('last_upload_similar')
+    st.warning(
+        f"Foto ini mirip dengan {len(similar_names)} foto yang sudah ada di galeri "
+        "(mungkin foto yang sama yang disimpan ulang atau diperkecil). Hapus salah satunya jika memang ganda."
+    )
+    similar_cols = st.columns(6)
+    for similar_idx, similar_name in enumerate(similar_names[:6]):
+        similar_entry = get_storage().metadata(similar_name)
+        if similar_entry is not None:
+            similar_cols[similar_idx].image(image_source(similar_entry['sha'], 'small'), caption=similar_name[:12])
+
 uploaded_file_object = st.file_uploader(
     f"Pilih Foto (Max: {MAX_FILE_SIZE_MB}MB, Format: {', '.join(ALLOWED_EXTENSIONS)})",
     type=list(ALLOWED_EXTENSIONS),
@@ -159,19 +338,56 @@ if uploaded_file_object is not None:
             st.error(f"Jenis file tidak diizinkan. Hanya: {', '.join(ALLOWED_EXTENSIONS)}.")
         else:
             original_filename = uploaded_file_object.name
-            unique_id = uuid.uuid4().hex
-            _, ext = os.path.splitext(original_filename)
-            github_filename = f"{unique_id}{ext}" 
-            github_filepath = f"{GITHUB_UPLOAD_PATH}/{github_filename}"
+            # Nama file = hash isi, sehingga foto yang sama tidak disimpan dan di-commit dua kali
+            github_filename = content_filename(original_filename, digest_stream(uploaded_file_object))
 
             try:
-                repo.create_file(
-                    path=github_filepath,
-                    message=f"Upload {github_filename} from Streamlit app",
-                    content=uploaded_file_object.getvalue(), 
-                    branch="main" 
-                )
-                st.success("Foto berhasil diunggah ke Galeri WDF di GitHub! 📸")
+                file_bytes = uploaded_file_object.getvalue()
+                existing_filename = find_duplicate(get_storage().list(), github_filename, file_bytes)
+                if existing_filename:
+                    st.session_state.last_upload_duplicate = existing_filename
+                    st.session_state.uploader_key_counter += 1
+                    st.rerun()
+                if is_heic(original_filename):
+                    # Nama file sudah .jpg (content_filename), jadi isinya juga harus JPEG
+                    with st.spinner("Mengonversi HEIC ke JPEG..."), rerun_timer.span("heic_convert"):
+                        file_bytes, heic_info = get_heic_converter().convert(file_bytes)
+                files_to_commit = {github_filename: file_bytes}
+
+                # Varian tampilan ringkas disimpan di samping foto asli dalam commit yang sama
+                try:
+                    with rerun_timer.span("derivatives"):
+                        display_variants, derivative_report = build_display_variants(
+                            file_bytes, formats=DISPLAY_VARIANT_FORMATS
+                        )
+                except Exception as e:
+                    display_variants, derivative_report = {}, None
+                    st.warning(f"Varian tampilan tidak dapat dibuat, galeri akan memakai foto asli: {e}")
+                for image_format, variant_bytes in display_variants.items():
+                    files_to_commit[derivative_name(github_filename, image_format)] = variant_bytes
+
+                # Foto yang sama tetapi disimpan ulang/diperkecil tidak tertangkap hash isi
+                try:
+                    with rerun_timer.span("phash"):
+                        upload_hash = get_phash_index().hash_source(file_bytes)
+                        similar_matches = get_phash_index().query(upload_hash, exclude=github_filename)
+                except Exception:
+                    upload_hash, similar_matches = None, []
+
+                # Foto asli di atas ambang disimpan di penyimpanan objek; yang di-commit hanya pointer-nya
+                with rerun_timer.span("large_object_offload"):
+                    files_to_commit[github_filename] = get_large_objects().offload(file_bytes)
+
+                # Satu commit; snapshot langsung diperbarui sehingga foto baru langsung terlihat
+                with rerun_timer.span("storage_write"):
+                    get_storage().batch(
+                        f"Upload {github_filename} from Streamlit app",
+                        lambda read_file: (files_to_commit, [])
+                    )
+                if upload_hash is not None:
+                    get_phash_index().add(github_filename, upload_hash)
+                st.session_state.last_upload_similar = [name for _, name in similar_matches]
+                st.session_state.last_upload_report = format_savings(derivative_report) if derivative_report else ""
                 
                 st.session_state.uploader_key_counter += 1
                 st.rerun() 
@@ -185,18 +401,94 @@ st.markdown("---")
 # --- Bagian Galeri ---
 st.header("Koleksi Foto")
 
+col_listing_age, col_listing_refresh = st.columns([5, 1])
+with col_listing_refresh:
+    if st.button("🔄 Muat Ulang", key="refresh_listing"):
+        get_storage().refresh()
+        if get_storage().last_error is not None:
+            st.error(f"Gagal memuat ulang daftar foto: {get_storage().last_error}")
+with col_listing_age:
+    listing_age = get_storage().age()
+    if listing_age != float('inf'):
+        st.caption(f"Daftar foto diperbarui {listing_age:.0f} detik yang lalu.")
+    github_quota = get_github_scheduler().snapshot()
+    if github_quota['remaining'] is not None and github_quota['remaining'] <= github_quota['limit'] // 10:
+        st.warning(
+            f"Kuota GitHub hampir habis ({github_quota['remaining']} dari {github_quota['limit']} request tersisa). "
+            "Unggahan dan penghapusan akan diantre sampai kuota pulih."
+        )
+
 image_files_github = []
+gallery_snapshot = ()
 try:
-    contents = repo.get_contents(GITHUB_UPLOAD_PATH)
-    for content_file in contents:
-        if content_file.type == "file" and allowed_file(content_file.name):
-            image_files_github.append(content_file.name)
+    # Dibaca dari snapshot bersama, bukan request ke GitHub pada setiap rerun
+    with rerun_timer.span("listing"):
+        gallery_snapshot = get_storage().list()
+    for content_file in gallery_snapshot:
+        # Hanya foto asli di folder utama; varian tampilan ada di sub-folder web/
+        if content_file['type'] == "file" and '/' not in content_file['name'] and allowed_file(content_file['name']):
+            image_files_github.append(content_file['name'])
     
     image_files_github.sort(reverse=True) 
     
 except Exception as e:
     st.error(f"Gagal mengambil daftar foto dari GitHub: {e}")
 
+def toggle_delete_selection(image_name):
+    """Callback checkbox hapus: pilihan disimpan di session state, bukan dibaca ulang oleh seluruh skrip."""
+    if st.session_state[f"delete_cb_{image_name}"]:
+        st.session_state.selected_for_delete.add(image_name)
+    else:
+        st.session_state.selected_for_delete.discard(image_name)
+    st.session_state.delete_selection_changed = True # Ditampilkan oleh kartu, bukan dari callback
+
+@st.fragment
+def render_gallery_card(image_name, original_sha, display_sha, thumbnail_variant):
+    """Satu kartu foto. Checkbox hapus di dalamnya hanya me-rerun kartu ini, bukan seluruh galeri."""
+    with fragment_timer(rerun_timer, "gallery_card") as card_timer:
+        try:
+            with card_timer.span("thumbnail"): # Unduh blob (jika belum di cache) + buat thumbnail
+                display_source = image_source(display_sha, thumbnail_variant)
+            with st.container(), card_timer.span("render_card"):
+                st.image(display_source, use_container_width=True)
+                st.download_button(
+                    "⬇️ Unduh Asli",
+                    data=functools.partial(get_image_proxy().read, original_sha),
+                    file_name=image_name,
+                    key=f"download_{image_name}"
+                )
+
+                if st.session_state.delete_mode:
+                    st.checkbox(
+                        "Pilih untuk hapus",
+                        value=image_name in st.session_state.selected_for_delete,
+                        key=f"delete_cb_{image_name}",
+                        on_change=toggle_delete_selection,
+                        args=(image_name,)
+                    )
+                    if st.session_state.pop('delete_selection_changed', False):
+                        st.toast(f"{len(st.session_state.selected_for_delete)} foto dipilih untuk dihapus")
+        except Exception as e:
+            st.error(f"Tidak dapat memuat gambar {image_name} dari GitHub: {e}")
+
+@st.fragment
+def render_gallery_grid(image_names, gallery_shas, num_cols):
+    """Satu halaman galeri sebagai satu komponen HTML; browser mengambil gambar langsung dari proxy (lazy)."""
+    get_image_proxy_server()
+    items = []
+    for image_name in image_names:
+        original_sha = gallery_shas[image_name]
+        display_sha = gallery_shas.get(derivative_name(image_name, 'webp'), original_sha)
+        items.append(proxy_item(IMAGE_PROXY_PUBLIC_URL, image_name, original_sha, display_sha))
+    with fragment_timer(rerun_timer, "gallery_grid") as grid_timer, grid_timer.span("render_grid"):
+        selection = gallery_grid(
+            items, num_cols, selection_mode="multiple" if st.session_state.delete_mode else None,
+            selected=st.session_state.selected_for_delete
+        )
+    if selection is not None: # Klik di grid hanya me-rerun fragment ini
+        st.session_state.selected_for_delete = set(selection)
+        st.toast(f"{len(selection)} foto dipilih untuk dihapus")
+
 if not image_files_github:
     st.info("Belum ada foto di Galeri WDF. Jadilah yang pertama mengunggah! 🌟")
 else:
@@ -221,61 +513,82 @@ else:
         st.warning("Pilih foto yang ingin Anda hapus. Klik lagi untuk membatalkan pilihan.")
 
     num_cols = st.columns(1)[0].slider("Jumlah Kolom Tampilan", 1, 6, 4) 
+    page_size = page_size_selector()
+
+    # Hanya foto di halaman yang sedang dilihat yang diminta dari GitHub
+    visible_files, page_info = paginate(image_files_github, page_size)
+    render_page_controls(page_info, position="top")
+    rerun_timer.count("images_total", len(image_files_github))
+    rerun_timer.count("images_visible", len(visible_files))
+
+    gallery_shas = {content_file['name']: content_file['sha'] for content_file in gallery_snapshot}
+    if IMAGE_PROXY_PORT:
+        render_gallery_grid(visible_files, gallery_shas, num_cols)
+    else:
+        cols = st.columns(num_cols)
+        col_idx = 0
+        thumbnail_variant = thumbnail_variant_for(num_cols)
+        memory_stats_before = get_image_memory_cache().stats()
+
+        for image_name in visible_files:
+            with cols[col_idx]:
+                # Grid memakai thumbnail dari varian WebP yang ringkas; foto asli hanya untuk diunduh
+                original_sha = gallery_shas[image_name]
+                display_sha = gallery_shas.get(derivative_name(image_name, 'webp'), original_sha)
+                render_gallery_card(image_name, original_sha, display_sha, thumbnail_variant)
+
+            col_idx = (col_idx + 1) % num_cols
+        for counter, value in stats_delta(memory_stats_before, get_image_memory_cache().stats()).items():
+            rerun_timer.count(f"image_memory_{counter}", value) # Sesi lain yang aktif ikut terhitung
+
+    render_page_controls(page_info, position="bottom")
 
-    cols = st.columns(num_cols)
-    col_idx = 0
-
-    for image_name in image_files_github:
-        with cols[col_idx]:
-            image_url = f"https://raw.githubusercontent.com/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/main/{GITHUB_UPLOAD_PATH}/{image_name}"
-            
-            try:
-                with st.container():
-                    st.image(image_url, use_container_width=True) 
-
-                    if st.session_state.delete_mode:
-                        checkbox_key = f"delete_cb_{image_name}"
-                        is_checked = image_name in st.session_state.selected_for_delete
-                        
-                        if st.checkbox(f"Pilih untuk hapus", value=is_checked, key=checkbox_key):
-                            st.session_state.selected_for_delete.add(image_name)
-                        else:
-                            if image_name in st.session_state.selected_for_delete:
-                                st.session_state.selected_for_delete.remove(image_name)
-
-            except Exception as e:
-                st.error(f"Tidak dapat memuat gambar {image_name} dari GitHub: {e}")
-            
-        col_idx = (col_idx + 1) % num_cols
-
-    if st.session_state.delete_mode and st.session_state.selected_for_delete:
+    if st.session_state.delete_mode:
+        # Centang di kartu hanya me-rerun kartu itu, jadi jumlah pilihan dibaca saat tombol diklik
         st.markdown("---")
-        st.markdown(
-            f"<h3 style='text-align: center; color: #e9ecef;'>{len(st.session_state.selected_for_delete)} Foto Terpilih</h3>",
-            unsafe_allow_html=True
-        )
-        if st.button(
-            f"Hapus {len(st.session_state.selected_for_delete)} Foto Terpilih",
-            key="confirm_delete",
-            type="primary"
-        ):
+        st.caption("Centang foto yang ingin dihapus (bisa di beberapa halaman), lalu klik tombol di bawah.")
+        confirm_delete = st.button("🗑️ Hapus Foto Terpilih", key="confirm_delete", type="primary")
+        if confirm_delete and not st.session_state.selected_for_delete:
+            st.info("Belum ada foto yang dipilih.")
+        elif confirm_delete:
             deleted_count = 0
             error_count = 0
 
-            for filename_to_delete in st.session_state.selected_for_delete:
-                github_filepath_to_delete = f"{GITHUB_UPLOAD_PATH}/{filename_to_delete}"
+            # Pastikan file masih ada (menghapus path yang tidak ada membuat seluruh commit gagal)
+            get_storage().refresh()
+            gallery_entries = get_storage().list()
+            existing_files = {content_file['name'] for content_file in gallery_entries}
+            files_to_delete = sorted(st.session_state.selected_for_delete & existing_files)
+            error_count += len(st.session_state.selected_for_delete) - len(files_to_delete)
+            # Foto asli yang disimpan di penyimpanan objek: objeknya dibuang setelah commit berhasil
+            offloaded_pointers = []
+            if get_large_objects().store is not None:
+                offloaded_pointers = orphaned_pointers(gallery_entries, files_to_delete, get_storage().get)
+            # Varian tampilan ikut dihapus dalam commit yang sama
+            paths_to_delete = list(files_to_delete) + [
+                derivative_name(filename, image_format)
+                for filename in files_to_delete
+                for image_format in ('webp', 'avif')
+                if derivative_name(filename, image_format) in existing_files
+            ]
+
+            if files_to_delete:
+                # Semua foto terpilih dihapus dalam satu commit, bukan satu commit per foto
                 try:
-                    file_content = repo.get_contents(github_filepath_to_delete)
-                    repo.delete_file(
-                        path=file_content.path,
-                        message=f"Delete {filename_to_delete} from Streamlit app",
-                        sha=file_content.sha,
-                        branch="main"
-                    )
-                    deleted_count += 1
+                    with rerun_timer.span("storage_delete"):
+                        get_storage().delete(paths_to_delete, f"Delete {len(files_to_delete)} photo(s) from Streamlit app")
+                    deleted_count = len(files_to_delete)
+                    for filename in files_to_delete:
+                        get_phash_index().remove(filename)
                 except Exception as e:
-                    error_count += 1
-                    st.error(f"Gagal menghapus {filename_to_delete} dari GitHub: {e}")
+                    error_count += len(files_to_delete)
+                    st.error(f"Gagal menghapus foto dari GitHub: {e}")
+                else:
+                    for pointer in offloaded_pointers:
+                        try:
+                            get_large_objects().discard(pointer)
+                        except Exception as e: # Gagal di sini hanya meninggalkan objek yang tidak terpakai
+                            st.warning(f"Foto asli di penyimpanan objek gagal dihapus: {e}")
 
             if deleted_count > 0:
                 st.success(f'{deleted_count} foto berhasil dihapus dari GitHub.')
@@ -285,8 +598,6 @@ else:
             st.session_state.delete_mode = False
             st.session_state.selected_for_delete = set()
             st.rerun() 
-    elif st.session_state.delete_mode and not st.session_state.selected_for_delete:
-        st.info("Pilih foto untuk mengaktifkan tombol hapus.")
 
 # --- Footer ---
 st.markdown("---")
@@ -298,3 +609,5 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+finish_rerun(rerun_timer)
@@ -1,13 +1,27 @@
 import streamlit as st
 import os
-from PIL import Image # Penting untuk memproses gambar
-import uuid
+import functools
 from datetime import datetime
-from github import Github
+from github_client import connect_repo, pooled_session, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT
+from github_scheduler import RateLimitScheduler, DEFAULT_WRITE_INTERVAL
 from dotenv import load_dotenv
-from io import BytesIO
-import json
-import base64
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from gallery_pagination import page_size_selector, paginate, render_page_controls
+from github_listing import GalleryListing, GITHUB_API_URL as DEFAULT_GITHUB_API_URL
+from storage import GitHubStorage, LocalGitStorage, MemoryStorage
+from derivatives import build_display_variants, derivative_name, format_savings
+from image_proxy import BlobCache, GitHubBlobReader, ImageProxy, ImageProxyServer, git_blob_sha
+from thumbnail_cache import ThumbnailCache
+from image_memory_cache import ImageBytesCache, stats_delta
+from gallery_grid import gallery_grid, proxy_item
+from large_objects import LargeObjectOffload, open_object_store, orphaned_pointers, DEFAULT_S3_REGION, DEFAULT_THRESHOLD_MB
+from caption_store import CaptionCache, build_caption_changes, load_captions, merge_caption, serialize_shard, LEGACY_CAPTIONS_FILE
+from caption_search import CaptionSearchIndex
+from heic_converter import HeicConverter, is_heic
+from rerun_timing import start_rerun, finish_rerun, fragment_timer
+from upload_queue import UploadQueue, ACTIVE_STATUSES
+from content_address import content_filename, digest_stream, find_duplicate
+from perceptual_hash import PerceptualHashIndex, gallery_images, index_path, git_index_key
 
 # Muat variabel lingkungan jika berjalan secara lokal
 load_dotenv()
@@ -16,36 +30,176 @@ load_dotenv()
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_REPO_OWNER = os.getenv("GITHUB_REPO_OWNER")
 GITHUB_REPO_NAME = os.getenv("GITHUB_REPO_NAME")
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", DEFAULT_GITHUB_API_URL) # Bisa diarahkan ke server fake lokal
+GITHUB_BRANCH = os.getenv("GITHUB_BRANCH") # Kosong = branch default repositori
+GITHUB_POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", DEFAULT_POOL_SIZE)) # Koneksi keep-alive ke GitHub
+GITHUB_TIMEOUT = int(os.getenv("GITHUB_TIMEOUT", DEFAULT_TIMEOUT)) # detik per request (PyGithub hanya menerima int)
+GITHUB_WRITE_INTERVAL = float(os.getenv("GITHUB_WRITE_INTERVAL", DEFAULT_WRITE_INTERVAL)) # Jeda antar-request tulis
+# Foto dibaca lewat proxy lokal (cache disk per SHA blob), bukan URL raw.githubusercontent.com,
+# sehingga repositori privat juga bisa ditampilkan
+BLOB_CACHE_DIR = ".cache_galeri_wdf/blobs"
+BLOB_CACHE_MAX_MB = 1024
+BLOB_THUMBNAIL_CACHE_DIR = ".cache_galeri_wdf/blob_thumbnails"
+IMAGE_MEMORY_CACHE_MB = 64 # Isi thumbnail yang disimpan di memori, agar rerun tidak membaca ulang disk
+IMAGE_PROXY_PORT = os.getenv("IMAGE_PROXY_PORT") # Jika diisi, browser mengambil foto langsung dari server proxy
+IMAGE_PROXY_HOST = os.getenv("IMAGE_PROXY_HOST", "127.0.0.1") # Proxy tanpa autentikasi: hanya lokal, kecuali sengaja dibuka (mis. "0.0.0.0" di belakang reverse proxy)
+IMAGE_PROXY_PUBLIC_URL = os.getenv("IMAGE_PROXY_PUBLIC_URL", f"http://localhost:{IMAGE_PROXY_PORT}")
 GITHUB_UPLOAD_PATH = "gallery_images" # Sub-direktori di repositori GitHub untuk gambar
-GITHUB_CAPTIONS_FILE = f"{GITHUB_UPLOAD_PATH}/captions.json" # Lokasi file captions.json
+# Foto asli yang besar bisa disimpan di luar repositori: repositori hanya berisi file pointer
+# kecil plus varian tampilan, dan proxy gambar mengganti pointer dengan isi aslinya
+LARGE_OBJECT_STORE = os.getenv("LARGE_OBJECT_STORE") # Folder lokal atau s3://bucket/prefix; kosong = semua di repositori
+LARGE_OBJECT_THRESHOLD_MB = float(os.getenv("LARGE_OBJECT_THRESHOLD_MB", DEFAULT_THRESHOLD_MB))
+LARGE_OBJECT_S3_ENDPOINT = os.getenv("LARGE_OBJECT_S3_ENDPOINT") # Misalnya http://localhost:9000 (MinIO)
+LARGE_OBJECT_S3_ACCESS_KEY = os.getenv("LARGE_OBJECT_S3_ACCESS_KEY")
+LARGE_OBJECT_S3_SECRET_KEY = os.getenv("LARGE_OBJECT_S3_SECRET_KEY")
+LARGE_OBJECT_S3_REGION = os.getenv("LARGE_OBJECT_S3_REGION", DEFAULT_S3_REGION)
+GALLERY_STORAGE = os.getenv("GALLERY_STORAGE", "github") # github | git (repositori bare lokal) | memory
+GALLERY_GIT_PATH = os.getenv("GALLERY_GIT_PATH", ".galeri_wdf.git") # Dipakai jika GALLERY_STORAGE=git
+UPLOAD_SPOOL_DIR = ".cache_galeri_wdf/upload_spool" # Foto yang sudah dikirim tapi belum masuk galeri (tahan restart)
+UPLOAD_STATUS_POLL_SECONDS = 2 # Selang pemeriksaan status antrean selama ada unggahan yang berjalan
+# Hash perseptual setiap foto, untuk mengenali foto mirip; satu indeks per repositori galeri
+PHASH_INDEX_PATH = index_path({
+    "github": f"github_{GITHUB_REPO_OWNER}_{GITHUB_REPO_NAME}",
+    "git": git_index_key(GALLERY_GIT_PATH),
+}.get(GALLERY_STORAGE, GALLERY_STORAGE))
 
 # --- Inisialisasi Session State Global (PENTING: Harus di awal script) ---
 # Ini memastikan semua variabel session state ada sebelum digunakan oleh widget
 if 'uploader_key_counter' not in st.session_state:
     st.session_state.uploader_key_counter = 0
-if 'image_captions' not in st.session_state:
-    st.session_state.image_captions = {} # Akan dimuat dari GitHub nanti
 if 'edit_mode' not in st.session_state:
     st.session_state.edit_mode = False
 if 'selected_for_edit' not in st.session_state:
     st.session_state.selected_for_edit = None
 if 'delete_mode' not in st.session_state:
     st.session_state.delete_mode = False
+if 'selected_for_delete' not in st.session_state:
+    st.session_state.selected_for_delete = set() # Diisi oleh callback checkbox di kartu foto
+if 'upload_job_ids' not in st.session_state:
+    st.session_state.upload_job_ids = [] # Job antrean unggahan milik sesi ini
 # --- Akhir Inisialisasi Session State Global ---
 
 
 # Pastikan semua variabel lingkungan diatur sebelum mencoba koneksi GitHub
-if not all([GITHUB_TOKEN, GITHUB_REPO_OWNER, GITHUB_REPO_NAME]):
+if GALLERY_STORAGE == "github" and not all([GITHUB_TOKEN, GITHUB_REPO_OWNER, GITHUB_REPO_NAME]):
     st.error("Error: Variabel lingkungan GITHUB_TOKEN, GITHUB_REPO_OWNER, atau GITHUB_REPO_NAME tidak diatur. Pastikan sudah ada di Streamlit Secrets (jika di-deploy) atau di file .env (jika lokal).")
     st.stop()
 
-# Inisialisasi GitHub API
+@st.cache_resource
+def get_github_scheduler():
+    """Satu penjadwal kuota GitHub untuk seluruh proses: semua request baca/tulis melewatinya."""
+    return RateLimitScheduler(write_interval=GITHUB_WRITE_INTERVAL)
+
+@st.cache_resource
+def get_github_repo():
+    """Satu client GitHub (pool koneksi keep-alive) dan handle repositori untuk seluruh proses."""
+    _, github_repo = connect_repo(
+        GITHUB_TOKEN, GITHUB_REPO_OWNER, GITHUB_REPO_NAME, api_url=GITHUB_API_URL,
+        pool_size=GITHUB_POOL_SIZE, timeout=GITHUB_TIMEOUT, scheduler=get_github_scheduler()
+    )
+    return github_repo
+
+@st.cache_resource
+def get_github_branch():
+    """Branch galeri, ditentukan sekali: GITHUB_BRANCH, atau branch default repositori."""
+    return GITHUB_BRANCH or get_github_repo().default_branch
+
+@st.cache_resource
+def get_gallery_listing():
+    """Satu snapshot daftar foto untuk seluruh proses, disegarkan oleh satu poller latar belakang."""
+    listing = GalleryListing(
+        GITHUB_TOKEN, GITHUB_REPO_OWNER, GITHUB_REPO_NAME, GITHUB_UPLOAD_PATH, branch=get_github_branch(),
+        api_url=GITHUB_API_URL,
+        recursive=True, # Ikut mendaftar varian tampilan di sub-folder web/
+        session=pooled_session(GITHUB_POOL_SIZE, get_github_scheduler()), timeout=GITHUB_TIMEOUT
+    )
+    return listing.start()
+
+@st.cache_resource
+def get_storage():
+    """Backend penyimpanan galeri untuk seluruh proses; aplikasi hanya menampilkan isinya."""
+    if GALLERY_STORAGE == "git":
+        return LocalGitStorage(GALLERY_GIT_PATH, GITHUB_UPLOAD_PATH)
+    if GALLERY_STORAGE == "memory":
+        return MemoryStorage()
+    blob_reader = GitHubBlobReader(
+        GITHUB_TOKEN, GITHUB_REPO_OWNER, GITHUB_REPO_NAME, api_url=GITHUB_API_URL,
+        session=pooled_session(GITHUB_POOL_SIZE, get_github_scheduler()), timeout=GITHUB_TIMEOUT
+    )
+    return GitHubStorage(
+        get_github_repo(), get_gallery_listing(), blob_reader.read, GITHUB_UPLOAD_PATH, branch=get_github_branch(),
+        scheduler=get_github_scheduler()
+    )
+
+@st.cache_resource
+def get_large_objects():
+    """Penyimpanan foto asli berukuran besar di luar repositori (nonaktif jika LARGE_OBJECT_STORE kosong)."""
+    store = None
+    if LARGE_OBJECT_STORE:
+        store = open_object_store(
+            LARGE_OBJECT_STORE, LARGE_OBJECT_S3_ENDPOINT, LARGE_OBJECT_S3_ACCESS_KEY, LARGE_OBJECT_S3_SECRET_KEY,
+            LARGE_OBJECT_S3_REGION
+        )
+    return LargeObjectOffload(store, threshold_bytes=int(LARGE_OBJECT_THRESHOLD_MB * 1024 * 1024))
+
+@st.cache_resource
+def get_image_proxy():
+    """Satu cache blob (per SHA) dan thumbnail untuk seluruh proses; setiap blob diambil sekali saja."""
+    blob_cache = BlobCache(
+        BLOB_CACHE_DIR, get_storage().read_blob, max_bytes=BLOB_CACHE_MAX_MB * 1024 * 1024,
+        resolve=get_large_objects().resolve # File pointer diganti isi aslinya sebelum masuk cache
+    )
+    return ImageProxy(blob_cache, ThumbnailCache(BLOB_THUMBNAIL_CACHE_DIR))
+
+@st.cache_resource
+def get_image_memory_cache():
+    """Isi thumbnail di memori untuk seluruh proses (LRU, dibatasi IMAGE_MEMORY_CACHE_MB)."""
+    return ImageBytesCache(max_bytes=IMAGE_MEMORY_CACHE_MB * 1024 * 1024)
+
+@st.cache_resource
+def get_image_proxy_server():
+    """Server proxy HTTP opsional agar browser bisa meng-cache foto selamanya (header immutable)."""
+    return ImageProxyServer(get_image_proxy(), IMAGE_PROXY_HOST, int(IMAGE_PROXY_PORT)).start()
+
+@st.cache_resource
+def get_caption_cache():
+    """Satu cache caption (per SHA shard) untuk seluruh proses, dipakai bersama oleh semua sesi."""
+    return CaptionCache()
+
+@st.cache_resource
+def get_caption_search_index():
+    """Satu indeks pencarian caption untuk seluruh proses; dibangun saat pencarian pertama."""
+    return CaptionSearchIndex()
+
+@st.cache_resource
+def get_heic_converter():
+    """Satu process pool konversi HEIC untuk seluruh proses."""
+    return HeicConverter()
+
+def phash_entries(storage):
+    """Foto utama galeri, masing-masing dengan SHA varian tampilannya (jika ada) sebagai 'display_sha'."""
+    entries = storage.list()
+    shas = {entry['name']: entry['sha'] for entry in entries}
+    return [
+        dict(entry, display_sha=shas.get(derivative_name(entry['name'], 'webp'), entry['sha']))
+        for entry in gallery_images(entries, ALLOWED_EXTENSIONS)
+    ]
+
+def phash_source(image_proxy, entry):
+    """Thumbnail kecil foto (dari varian tampilan, lebih ringan diunduh) sebagai bahan hash perseptual."""
+    return image_proxy.path_for(entry['display_sha'], 'small')
+
+@st.cache_resource
+def get_phash_index():
+    """Satu indeks foto mirip untuk seluruh proses; foto yang belum di-hash diisi di latar belakang."""
+    phash_index = PerceptualHashIndex(PHASH_INDEX_PATH)
+    phash_index.start_sync(functools.partial(phash_entries, get_storage()), functools.partial(phash_source, get_image_proxy()))
+    return phash_index
+
+# Inisialisasi penyimpanan (client dan snapshot dipakai bersama, rerun tidak memanggil GitHub)
 try:
-    g = Github(GITHUB_TOKEN)
-    repo = g.get_user(GITHUB_REPO_OWNER).get_repo(GITHUB_REPO_NAME)
-    # Coba akses konten untuk memastikan koneksi dan repo valid
-    # Ini akan memicu error jika repo atau path tidak ditemukan
-    repo.get_contents(GITHUB_UPLOAD_PATH)
+    # Daftar pertama sekaligus memastikan repo dan path valid; rerun berikutnya memakai cache
+    get_storage().list()
 except Exception as e:
     st.error(f"Gagal terhubung ke repositori GitHub atau path '{GITHUB_UPLOAD_PATH}' tidak ditemukan. Pastikan token, detail repositori, dan folder '{GITHUB_UPLOAD_PATH}' di repo benar: {e}")
     st.info(f"Detail error: {type(e).__name__}: {e}")
@@ -54,51 +208,115 @@ except Exception as e:
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'heic'}
 MAX_FILE_SIZE_MB = 32
+DISPLAY_VARIANT_FORMATS = ('webp',) # Tambahkan 'avif' untuk varian yang lebih kecil (encode lebih lambat)
+UPLOAD_WORKERS = 4 # Jumlah foto yang diproses dan diunggah bersamaan
 
 def allowed_file(filename):
     """Memeriksa apakah ekstensi file diizinkan."""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def thumbnail_variant_for(num_cols):
+    """Pilih varian thumbnail terkecil yang masih tajam untuk jumlah kolom."""
+    if num_cols <= 2:
+        return 'large'
+    if num_cols <= 4:
+        return 'medium'
+    return 'small'
+
+def image_source(blob_sha, variant):
+    """Sumber gambar untuk st.image: URL server proxy (jika dijalankan) atau isi thumbnail dari cache memori."""
+    if IMAGE_PROXY_PORT:
+        get_image_proxy_server()
+        return f"{IMAGE_PROXY_PUBLIC_URL}/blobs/{blob_sha}/{variant}"
+    return get_image_memory_cache().read(get_image_proxy().path_for(blob_sha, variant))
+
 # --- Fungsi untuk Mengelola Caption di GitHub ---
-# Fungsi-fungsi ini memuat/menyimpan caption ke/dari GitHub, dan menggunakan session_state.image_captions
-def load_captions_from_github():
-    """Memuat caption dari captions.json di GitHub."""
+# Caption disimpan dalam shard kecil (gallery_images/captions/xx.json), sehingga biaya
+# membaca dan menulis tidak bergantung pada ukuran galeri. Caption tersimpan dibaca dari
+# cache bersama; session_state hanya menyimpan isian caption yang belum disimpan.
+def load_gallery_captions(filenames, gallery_snapshot):
+    """Memuat caption untuk filenames saja (misalnya foto di halaman yang sedang dilihat)."""
+    file_shas = {content_file['name']: content_file['sha'] for content_file in gallery_snapshot}
     try:
-        contents = repo.get_contents(GITHUB_CAPTIONS_FILE)
-        decoded_content = base64.b64decode(contents.content).decode('utf-8')
-        return json.loads(decoded_content)
+        with rerun_timer.span("load_captions"):
+            return load_captions(filenames, file_shas, get_image_proxy().blobs.read, cache=get_caption_cache())
     except Exception as e:
-        st.warning(f"Tidak dapat memuat captions.json dari GitHub atau file kosong/rusak. Menginisialisasi caption baru. Detail: {e}")
+        st.warning(f"Tidak dapat memuat caption dari GitHub. Detail: {e}")
         return {}
 
-def save_captions_to_github(captions_data):
-    """Menyimpan caption ke captions.json di GitHub."""
+def search_gallery_captions(query, gallery_snapshot):
+    """Nama foto yang caption-nya cocok dengan query, atau None jika indeks gagal dimuat.
+
+    Pencarian pertama membaca semua shard caption sekali; selanjutnya hanya shard yang berubah.
+    """
+    caption_index = get_caption_search_index()
+    file_shas = {content_file['name']: content_file['sha'] for content_file in gallery_snapshot}
+    read_captions = functools.partial(get_caption_cache().get, read_blob=get_image_proxy().blobs.read)
     try:
-        json_string = json.dumps(captions_data, indent=4)
-        encoded_content = base64.b64encode(json_string.encode('utf-8')).decode('utf-8')
+        with rerun_timer.span("caption_search"):
+            if caption_index.built:
+                caption_index.sync(file_shas, read_captions)
+            else:
+                with st.spinner("Menyiapkan indeks pencarian caption..."):
+                    caption_index.sync(file_shas, read_captions)
+            return caption_index.search(query)
+    except Exception as e:
+        st.warning(f"Tidak dapat mencari caption. Detail: {e}")
+        return None
 
-        try:
-            contents = repo.get_contents(GITHUB_CAPTIONS_FILE)
-            repo.update_file(
-                path=GITHUB_CAPTIONS_FILE,
-                message="Update captions.json from Streamlit app",
-                content=encoded_content,
-                sha=contents.sha, # SHA diperlukan untuk update
-                branch="main"
-            )
-            st.success("Caption berhasil diperbarui di GitHub.")
-        except Exception as e: # Buat file baru jika belum ada
-            repo.create_file(
-                path=GITHUB_CAPTIONS_FILE,
-                message="Create captions.json from Streamlit app",
-                content=encoded_content,
-                branch="main"
+def reset_search_page():
+    # Hasil pencarian baru selalu dimulai dari halaman pertama
+    st.session_state.pop("search_cursor", None)
+    st.session_state.pop("search_offset", None)
+
+def apply_gallery_changes(storage, caption_cache, message, puts=None, deletes=None, caption_updates=None,
+                          caption_appends=None, search_index=None):
+    """Menyimpan foto baru, penghapusan, dan perubahan caption sebagai SATU commit di GitHub.
+
+    caption_updates berisi nama file -> caption baru (None untuk menghapus caption), caption_appends
+    nama file -> caption yang digabung ke caption yang sudah ada (unggahan ganda). Hanya shard
+    caption yang tersentuh yang ditulis ulang, di atas isi terbarunya di GitHub, sehingga
+    perubahan sesi lain tidak tertimpa. Tidak memanggil st.* (dipakai juga oleh worker antrean
+    unggahan); error dilempar ke pemanggil. Jika search_index diberikan, shard yang ditulis
+    langsung diterapkan ke indeks pencarian caption.
+    """
+    written_shards = {}
+
+    def build_changes(read_file):
+        changes = dict(puts or {})
+        removed = list(deletes or [])
+        if caption_updates or caption_appends:
+            caption_puts, caption_deletes, shards = build_caption_changes(read_file, caption_updates or {}, caption_appends)
+            changes.update(caption_puts)
+            removed.extend(caption_deletes)
+            written_shards.clear()
+            written_shards.update(shards)
+            written_shards.update((name, {}) for name in caption_deletes) # Shard kosong/captions.json lama
+        return changes, removed
+
+    storage.batch(message, build_changes) # Satu commit; snapshot langsung diperbarui
+    # Write-through: shard yang baru di-commit langsung masuk cache, tanpa diunduh ulang
+    for name, captions in written_shards.items():
+        serialized = serialize_shard(captions) if captions else None
+        if captions:
+            caption_cache.put(serialized, captions)
+        if search_index is not None:
+            search_index.update_shard(name, git_blob_sha(serialized.encode('utf-8')) if captions else None, captions)
+
+def commit_gallery_changes(message, puts=None, deletes=None, caption_updates=None):
+    """apply_gallery_changes untuk skrip: error ditampilkan di halaman. Mengembalikan True jika berhasil."""
+    try:
+        with rerun_timer.span("storage_write"):
+            apply_gallery_changes(
+                get_storage(), get_caption_cache(), message, puts, deletes, caption_updates,
+                search_index=get_caption_search_index()
             )
-            st.success("Caption berhasil disimpan ke GitHub.")
     except Exception as e:
-        st.error(f"Gagal menyimpan caption ke GitHub: {e}")
+        st.error(f"Gagal menyimpan perubahan ke GitHub: {e}")
         st.exception(e)
+        return False
+    return True
 # --- Akhir Fungsi Pengelola Caption ---
 
 st.set_page_config(
@@ -107,6 +325,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+rerun_timer = start_rerun("test2.py")
 
 # --- CSS Styling ---
 st.markdown(
@@ -262,117 +481,365 @@ st.markdown("---")
 st.header("Unggah Foto Baru")
 st.markdown("---") # Garis pemisah untuk kejelasan
 
+# Ringkasan unggahan terakhir (ditampilkan sekali setelah rerun)
+if 'last_upload_report' in st.session_state:
+    report = st.session_state.pop('last_upload_report')
+    if report.get('queued'):
+        st.success(
+            f"{report['queued']} foto masuk antrean unggahan 📸 dan akan muncul di galeri setelah tersimpan di GitHub."
+        )
+    if report.get('duplicates'):
+        st.info(
+            f"{report['duplicates']} foto sudah ada di galeri, jadi tidak diunggah lagi; "
+            "caption-nya ditambahkan ke foto yang sudah ada."
+        )
+    if report['uploaded']:
+        st.success(
+            f"{report['uploaded']} foto berhasil diunggah ke Galeri WDF! 📸 "
+            f"({report['megabytes']:.1f} MB dalam {report['seconds']:.1f} detik, "
+            f"{report['megabytes'] / max(report['seconds'], 1e-6):.1f} MB/detik, "
+            f"{report['uploaded'] / max(report['seconds'], 1e-6):.1f} foto/detik)"
+        )
+    if report['uploaded'] and report.get('display_bytes') is not None:
+        original_bytes = report['megabytes'] * 1024 * 1024
+        st.info(
+            f"Varian tampilan galeri: {report['display_bytes'] / (1024 * 1024):.1f} MB dari "
+            f"{report['megabytes']:.1f} MB foto asli "
+            f"(hemat {100.0 * (1 - report['display_bytes'] / max(original_bytes, 1)):.0f}%)."
+        )
+    for uploaded_name, derivative_report in report.get('savings', []):
+        st.caption(f"📸 {uploaded_name}: {format_savings(derivative_report)}")
+    for uploaded_name, similar_names in report.get('similar', []):
+        st.warning(
+            f"{uploaded_name} mirip dengan {len(similar_names)} foto yang sudah ada di galeri "
+            "(mungkin foto yang sama yang disimpan ulang atau diperkecil). Hapus salah satunya jika memang ganda."
+        )
+        similar_cols = st.columns(6)
+        for similar_idx, similar_name in enumerate(similar_names[:6]):
+            similar_entry = get_storage().metadata(similar_name)
+            if similar_entry is not None:
+                similar_cols[similar_idx].image(image_source(similar_entry['sha'], 'small'), caption=similar_name[:12])
+    for failed_name, failed_reason in report['failed']:
+        st.error(f"Gagal mengunggah {failed_name}: {failed_reason}")
+
 # Input Caption
 # Disable jika mode edit atau delete sedang aktif
 upload_widgets_disabled = st.session_state.edit_mode or st.session_state.delete_mode
 new_photo_caption = st.text_input("Tulis Caption untuk Foto Ini:", key="new_photo_caption_input", 
-                                  disabled=upload_widgets_disabled)
+                                  disabled=upload_widgets_disabled,
+                                  help="Dipakai untuk semua foto yang caption per fotonya dikosongkan.")
 
-# File Uploader
-uploaded_file_object = st.file_uploader(
-    f"Pilih Berkas Foto (Max: {MAX_FILE_SIZE_MB}MB, Format: {', '.join(ALLOWED_EXTENSIONS)})",
+# File Uploader (bisa memilih banyak foto sekaligus)
+uploaded_files = st.file_uploader(
+    f"Pilih Berkas Foto (Max: {MAX_FILE_SIZE_MB}MB per foto, Format: {', '.join(ALLOWED_EXTENSIONS)})",
     type=list(ALLOWED_EXTENSIONS),
     key=f"file_uploader_new_photo_{st.session_state.uploader_key_counter}",
-    disabled=upload_widgets_disabled
+    disabled=upload_widgets_disabled,
+    accept_multiple_files=True
 )
 
+# Caption per foto (opsional)
+if uploaded_files:
+    with st.expander(f"Caption per Foto ({len(uploaded_files)} berkas)", expanded=len(uploaded_files) <= 5):
+        for uploaded_file in uploaded_files:
+            st.text_input(
+                f"Caption untuk {uploaded_file.name}:",
+                key=f"photo_caption_{uploaded_file.file_id}",
+                placeholder=new_photo_caption,
+                disabled=upload_widgets_disabled
+            )
+
 # Pesan untuk File HEIC
 st.info("""
-    **Catatan Penting untuk File HEIC (.heic):**
-    Jika Anda mengunggah file `.HEIC` dan mengalami masalah (misalnya, gambar tidak muncul atau ada error),
-    mohon konversi file `.HEIC` Anda ke format `.JPG` atau `.PNG` terlebih dahulu menggunakan aplikasi pengeditan foto
-    atau konverter online sebelum mengunggahnya. Terima kasih!
+    **Catatan untuk File HEIC (.heic):**
+    File `.HEIC` otomatis dikonversi ke `.JPEG` (data EXIF dan profil warna tetap dipertahankan).
+    Jika konversi gagal, file tersebut kemungkinan rusak; coba ekspor ulang sebagai `.JPG` atau `.PNG`.
 """)
 
-# Tombol Simpan Foto
-if st.button("💾 Simpan Foto", key="save_photo_button", disabled=upload_widgets_disabled):
-    if uploaded_file_object is None:
-        st.error("Mohon pilih berkas foto sebelum menyimpan.")
-    elif uploaded_file_object.size > MAX_FILE_SIZE_MB * 1024 * 1024:
-        st.error(f"Ukuran file terlalu besar. Maksimal {MAX_FILE_SIZE_MB}MB.")
-    elif not allowed_file(uploaded_file_object.name):
-        st.error(f"Jenis file tidak diizinkan. Hanya: {', '.join(ALLOWED_EXTENSIONS)}.")
-    else:
-        original_filename = uploaded_file_object.name
-        unique_id = uuid.uuid4().hex
-        base_name, ext = os.path.splitext(original_filename)
+def validate_upload(original_filename, file_size):
+    """Pemeriksaan cepat sebelum foto masuk antrean; mengembalikan alasan penolakan atau None."""
+    if file_size > MAX_FILE_SIZE_MB * 1024 * 1024:
+        return f"Ukuran file terlalu besar. Maksimal {MAX_FILE_SIZE_MB}MB."
+    if not allowed_file(original_filename):
+        return f"Jenis file tidak diizinkan. Hanya: {', '.join(ALLOWED_EXTENSIONS)}."
+    return None
 
-        content_to_upload = None
-        file_mimetype = None
+def prepare_upload(job, file_bytes, storage, converter, phash_index, large_objects):
+    """Konversi (HEIC -> JPEG), buat varian tampilan, lalu unggah satu foto sebagai blob.
 
-        if ext.lower() == '.heic':
-            st.info("Mendeteksi file HEIC. Mencoba mengonversi ke JPEG...")
-            try:
-                img_bytes = uploaded_file_object.getvalue()
-                
-                try:
-                    temp_img_info = Image.open(BytesIO(img_bytes))
-                    st.info(f"Pillow berhasil mengidentifikasi file HEIC: {temp_img_info.format}, {temp_img_info.size}")
-                    temp_img_info.close()
-                except Exception as img_id_e:
-                    st.warning(f"Pillow TIDAK dapat mengidentifikasi file HEIC sebagai gambar yang valid: {img_id_e}. Ini mungkin file rusak atau format tidak sepenuhnya didukung.")
-                    st.stop()
-
-                img = Image.open(BytesIO(img_bytes))
-                output_buffer = BytesIO()
-                img.save(output_buffer, format="jpeg", quality=90)
-                output_buffer.seek(0)
-
-                github_filename = f"{unique_id}.jpeg"
-                content_to_upload = output_buffer.getvalue()
-                file_mimetype = "image/jpeg"
-                st.success("Konversi HEIC ke JPEG berhasil!")
-            except Exception as e:
-                st.error(f"Gagal memproses atau mengonversi file HEIC: {e}. Pastikan 'pillow-heif' terinstal dan file HEIC tidak rusak.")
-                st.exception(e)
-                st.stop()
+    Foto asli di atas ambang large_objects disimpan di penyimpanan objek; blob-nya hanya pointer.
+
+    Dijalankan di thread worker, jadi tidak boleh memanggil fungsi st.* apa pun.
+    Mengembalikan dict hasil; kunci 'error' berisi alasan jika file tidak bisa diproses
+    (gagal permanen). Error saat mengunggah blob dilempar agar job dicoba lagi oleh antrean.
+    """
+    result = {'name': job['name'], 'filename': job['filename'], 'bytes': job['size'], 'error': None}
+    try:
+        if is_heic(job['name']):
+            # Decode sekali dan encode JPEG di process pool; thread ini hanya menunggu hasilnya
+            content_to_upload, heic_info = converter.convert(file_bytes)
+            result['heic_timings'] = heic_info['timings']
         else:
-            github_filename = f"{unique_id}{ext}"
-            content_to_upload = uploaded_file_object.getvalue()
-            file_mimetype = uploaded_file_object.type
-            st.info(f"Mengunggah file {ext} asli.")
+            content_to_upload = file_bytes
+    except Exception as e:
+        result['error'] = f"Gagal memproses atau mengonversi file HEIC: {e}. Pastikan 'pillow-heif' terinstal dan file HEIC tidak rusak."
+        return result
 
-        if content_to_upload is None:
-            st.error("Tidak ada konten yang siap untuk diunggah setelah pemrosesan.")
-            st.stop()
+    # Varian tampilan ringkas (orientasi diterapkan, metadata dibuang); foto asli tetap disimpan
+    result['variant_blobs'] = {}
+    try:
+        display_variants, result['derivative_report'] = build_display_variants(
+            content_to_upload, formats=DISPLAY_VARIANT_FORMATS
+        )
+    except Exception:
+        display_variants, result['derivative_report'] = {}, None # Galeri akan memakai foto asli
+
+    # Foto yang sama tetapi disimpan ulang/diperkecil/dikonversi tidak tertangkap hash isi
+    try:
+        result['phash'] = phash_index.hash_source(content_to_upload)
+        result['similar'] = [name for _, name in phash_index.query(result['phash'], exclude=result['filename'])]
+    except Exception:
+        result['phash'], result['similar'] = None, []
 
-        github_filepath = f"{GITHUB_UPLOAD_PATH}/{github_filename}"
+    try:
+        result['blob'] = storage.stage(large_objects.offload(content_to_upload))
+        for image_format, variant_bytes in display_variants.items():
+            result['variant_blobs'][derivative_name(result['filename'], image_format)] = storage.stage(variant_bytes)
+    except BaseException:
+        discard_staged(storage, [result])
+        raise
+    return result
 
-        try:
-            repo.create_file(
-                path=github_filepath,
-                message=f"Upload {github_filename} from Streamlit app",
-                content=content_to_upload,
-                branch="main"
+def discard_staged(storage, results):
+    """Buang blob hasil stage() dari hasil prepare_upload() yang tidak jadi di-commit."""
+    for result in results:
+        for staged in [result.get('blob'), *result.get('variant_blobs', {}).values()]:
+            if staged is not None:
+                storage.discard(staged)
+
+def process_upload_jobs(storage, converter, caption_cache, search_index, phash_index, large_objects, jobs):
+    """Worker antrean unggahan: proses sekumpulan job lalu simpan semuanya dalam SATU commit.
+
+    Nama file job bersifat content-addressed, jadi job dengan nama yang sama adalah foto yang
+    sama: hanya satu yang diproses dan diunggah, caption semuanya digabung. Foto yang sudah ada
+    di galeri (unggahan ganda, atau commit yang berhasil tepat sebelum server berhenti) tidak
+    diunggah lagi; hanya caption-nya yang ditambahkan. Mengembalikan job id -> (error, hasil).
+    Error commit dilempar sehingga seluruh batch dicoba lagi oleh antrean.
+    """
+    existing_files = {entry['name'] for entry in storage.list()}
+    jobs_by_filename = {}
+    for job in jobs:
+        jobs_by_filename.setdefault(job['filename'], []).append(job)
+
+    outcomes = {}
+    upload_results = {}
+    pending_uploads = {}
+    try:
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as upload_pool:
+            for filename, same_jobs in jobs_by_filename.items():
+                if filename in existing_files:
+                    continue
+                job = next((job for job in same_jobs if job['size']), None) # Job duplikat tidak membawa isi
+                if job is None:
+                    for duplicate_job in same_jobs:
+                        outcomes[duplicate_job['id']] = ("Foto yang sama sudah dihapus dari galeri; unggah ulang berkasnya.", None)
+                    continue
+                with open(job['data_path'], 'rb') as f:
+                    pending_uploads[upload_pool.submit(
+                        prepare_upload, job, f.read(), storage, converter, phash_index, large_objects
+                    )] = filename
+            for future in as_completed(pending_uploads):
+                filename = pending_uploads[future]
+                result = future.result() # Error unggah blob -> seluruh batch dicoba lagi
+                if result['error']:
+                    outcomes.update((job['id'], (result['error'], None)) for job in jobs_by_filename[filename])
+                else:
+                    upload_results[filename] = result
+
+        files_to_commit = {}
+        for result in upload_results.values():
+            files_to_commit[result['filename']] = result['blob']
+            files_to_commit.update(result['variant_blobs'])
+        caption_appends = {}
+        for filename, same_jobs in jobs_by_filename.items():
+            if filename in upload_results or filename in existing_files:
+                for job in same_jobs:
+                    caption_appends[filename] = merge_caption(caption_appends.get(filename), job['caption'])
+        caption_appends = {filename: caption for filename, caption in caption_appends.items() if caption}
+        if files_to_commit or caption_appends:
+            apply_gallery_changes(
+                storage, caption_cache,
+                f"Upload {len(upload_results)} photo(s) from Streamlit app" if upload_results
+                else f"Add caption to {len(caption_appends)} existing photo(s) from Streamlit app",
+                puts=files_to_commit,
+                caption_appends=caption_appends,
+                search_index=search_index
+            )
+    finally:
+        # Commit gagal atau job lain error: blob yang sudah di-stage tidak boleh tertinggal
+        discard_staged(storage, [
+            future.result() for future in pending_uploads if not future.cancelled() and future.exception() is None
+        ])
+    for filename, result in upload_results.items():
+        if result['phash'] is not None:
+            phash_index.add(filename, result['phash'])
+
+    for filename, same_jobs in jobs_by_filename.items():
+        result = upload_results.get(filename)
+        for job in same_jobs:
+            if job['id'] in outcomes:
+                continue
+            if result is not None and job['size']:
+                report = result.get('derivative_report')
+                outcomes[job['id']] = (None, {
+                    'display_bytes': report['variants'].get('webp', result['bytes']) if report else result['bytes'],
+                    'derivative_report': report,
+                    'duplicate': False,
+                    'similar': result['similar'],
+                })
+            else:
+                outcomes[job['id']] = (None, {'display_bytes': 0, 'duplicate': True, 'similar': []})
+    return outcomes
+
+@st.cache_resource
+def get_upload_queue():
+    """Satu antrean unggahan (spool di disk) dan satu worker latar belakang untuk seluruh proses."""
+    process_jobs = functools.partial(
+        process_upload_jobs, get_storage(), get_heic_converter(), get_caption_cache(), get_caption_search_index(),
+        get_phash_index(), get_large_objects()
+    )
+    return UploadQueue(UPLOAD_SPOOL_DIR, process_jobs).start()
+
+def render_upload_status():
+    """Status unggahan milik sesi ini; setelah semuanya selesai, seluruh halaman dimuat ulang."""
+    upload_queue = get_upload_queue()
+    my_jobs = upload_queue.jobs(ids=set(st.session_state.upload_job_ids))
+    active_jobs = [job for job in my_jobs if job['status'] in ACTIVE_STATUSES]
+    done_jobs = [job for job in my_jobs if job['status'] == 'done']
+
+    if done_jobs and not active_jobs:
+        # Laporan ringkas seperti unggahan langsung, lalu foto baru tampil di galeri
+        started = min(job['submitted_at'] for job in done_jobs)
+        uploaded_jobs = [job for job in done_jobs if not job['result']['duplicate']]
+        st.session_state.last_upload_report = {
+            'uploaded': len(uploaded_jobs),
+            'megabytes': sum(job['size'] for job in uploaded_jobs) / (1024 * 1024),
+            'seconds': max(job['finished_at'] for job in done_jobs) - started,
+            'failed': [],
+            'display_bytes': sum(job['result']['display_bytes'] for job in uploaded_jobs),
+            'savings': [
+                (job['name'], job['result']['derivative_report']) for job in uploaded_jobs
+                if job['result'].get('derivative_report')
+            ],
+            'similar': [(job['name'], job['result']['similar']) for job in uploaded_jobs if job['result'].get('similar')],
+        }
+        done_ids = {job['id'] for job in done_jobs}
+        st.session_state.upload_job_ids = [job_id for job_id in st.session_state.upload_job_ids if job_id not in done_ids]
+        st.rerun(scope="app")
+
+    if active_jobs:
+        status_labels = {'queued': "menunggu giliran", 'processing': "sedang diunggah", 'retry': "akan dicoba lagi"}
+        st.progress(
+            len(done_jobs) / (len(done_jobs) + len(active_jobs)),
+            text=f"Mengunggah di latar belakang: {len(done_jobs)} dari {len(done_jobs) + len(active_jobs)} foto selesai. "
+                 "Anda bisa tetap memakai galeri."
+        )
+        for job in active_jobs:
+            note = f" (percobaan ke-{job['attempts'] + 1}; {job['error']})" if job['status'] == 'retry' else ""
+            st.caption(f"⏳ {job['name']}: {status_labels[job['status']]}{note}")
+
+    for job in my_jobs:
+        if job['status'] != 'failed':
+            continue
+        col_message, col_retry, col_dismiss = st.columns([4, 1, 1])
+        col_message.error(f"Gagal mengunggah {job['name']}: {job['error']}")
+        if col_retry.button("🔁 Coba Lagi", key=f"retry_upload_{job['id']}"):
+            upload_queue.retry(job['id'])
+            st.rerun(scope="app")
+        if col_dismiss.button("Buang", key=f"dismiss_upload_{job['id']}"):
+            upload_queue.dismiss(job['id'])
+            st.session_state.upload_job_ids.remove(job['id'])
+            st.rerun(scope="app")
+
+# Tombol Simpan Foto: foto masuk antrean (disimpan di disk) dan halaman langsung kembali
+if st.button("💾 Simpan Foto", key="save_photo_button", disabled=upload_widgets_disabled):
+    if not uploaded_files:
+        st.error("Mohon pilih berkas foto sebelum menyimpan.")
+    else:
+        upload_queue = get_upload_queue()
+        gallery_entries = get_storage().list()
+        queued_filenames = {job['filename'] for job in upload_queue.jobs() if job['status'] in ACTIVE_STATUSES}
+        rejected_uploads = []
+        duplicate_count = 0
+        for uploaded_file in uploaded_files:
+            rejection = validate_upload(uploaded_file.name, uploaded_file.size)
+            if rejection:
+                rejected_uploads.append((uploaded_file.name, rejection))
+                continue
+            # Nama file = hash isi; foto yang sudah ada (atau sedang diantre) tidak ditulis ulang ke disk
+            # maupun diunggah lagi, cukup caption-nya yang ditambahkan ke foto tersebut
+            filename = content_filename(uploaded_file.name, digest_stream(uploaded_file))
+            file_bytes = uploaded_file.getvalue()
+            existing_filename = find_duplicate(gallery_entries, filename, file_bytes)
+            if existing_filename or filename in queued_filenames:
+                duplicate_count += 1
+                filename, file_bytes = existing_filename or filename, b""
+            job = upload_queue.submit(
+                uploaded_file.name,
+                file_bytes,
+                filename,
+                caption=st.session_state.get(f"photo_caption_{uploaded_file.file_id}") or new_photo_caption,
             )
-            st.success("Foto berhasil diunggah ke Galeri WDF! 📸")
-            
-            # --- START OF PREVIOUSLY TRUNCATED CODE ---
-            st.session_state.image_captions[github_filename] = new_photo_caption
-            save_captions_to_github(st.session_state.image_captions)
+            queued_filenames.add(filename)
+            st.session_state.upload_job_ids.append(job['id'])
+        rerun_timer.count("uploads_queued", len(uploaded_files) - len(rejected_uploads))
+        rerun_timer.count("uploads_duplicate", duplicate_count)
 
+        st.session_state.last_upload_report = {
+            'duplicates': duplicate_count,
+            'queued': len(uploaded_files) - len(rejected_uploads) - duplicate_count,
+            'uploaded': 0, 'megabytes': 0.0, 'seconds': 0.0, 'failed': rejected_uploads, 'display_bytes': None,
+        }
+        if len(rejected_uploads) < len(uploaded_files):
             st.session_state.uploader_key_counter += 1
-            st.rerun()
-            # --- END OF PREVIOUSLY TRUNCATED CODE ---
-        except Exception as e:
-            st.error(f"Gagal mengunggah foto ke GitHub: {e}")
-            st.exception(e)
+        st.rerun()
+
+if st.session_state.upload_job_ids:
+    # Dipantau ulang berkala hanya selama sesi ini punya unggahan di antrean
+    st.fragment(run_every=UPLOAD_STATUS_POLL_SECONDS)(render_upload_status)()
 st.markdown("---")
 
 
 # --- Bagian Galeri ---
 st.header("Koleksi Foto")
 
-# Muat captions setelah GitHub API diinisialisasi
-if not st.session_state.image_captions: # Hanya muat jika belum ada data atau masih kosong
-    st.session_state.image_captions = load_captions_from_github()
+col_listing_age, col_listing_refresh = st.columns([5, 1])
+with col_listing_refresh:
+    if st.button("🔄 Muat Ulang", key="refresh_listing"):
+        get_storage().refresh()
+        if get_storage().last_error is not None:
+            st.error(f"Gagal memuat ulang daftar foto: {get_storage().last_error}")
+with col_listing_age:
+    listing_age = get_storage().age()
+    if listing_age != float('inf'):
+        st.caption(f"Daftar foto diperbarui {listing_age:.0f} detik yang lalu.")
+    github_quota = get_github_scheduler().snapshot()
+    if github_quota['remaining'] is not None and github_quota['remaining'] <= github_quota['limit'] // 10:
+        st.warning(
+            f"Kuota GitHub hampir habis ({github_quota['remaining']} dari {github_quota['limit']} request tersisa). "
+            "Unggahan dan penghapusan akan diantre sampai kuota pulih."
+        )
 
 image_files_github = []
+gallery_snapshot = ()
 try:
-    contents = repo.get_contents(GITHUB_UPLOAD_PATH)
-    for content_file in contents:
-        if content_file.type == "file" and allowed_file(content_file.name) and content_file.name != "captions.json":
-            image_files_github.append(content_file.name)
+    # Dibaca dari snapshot bersama, bukan request ke GitHub pada setiap rerun
+    with rerun_timer.span("listing"):
+        gallery_snapshot = get_storage().list()
+    for content_file in gallery_snapshot:
+        # Hanya foto asli di folder utama; varian tampilan ada di sub-folder web/
+        if content_file['type'] == "file" and '/' not in content_file['name'] and allowed_file(content_file['name']) and content_file['name'] != LEGACY_CAPTIONS_FILE:
+            image_files_github.append(content_file['name'])
 
     image_files_github.sort(reverse=True)
 
@@ -381,6 +848,102 @@ except Exception as e:
     st.info("Ini mungkin karena folder 'gallery_images' belum ada in your repository, or other permission/connection issues.")
     st.exception(e)
 
+# Foto yang masih di antrean unggahan langsung ditampilkan (dari spool) sebelum masuk galeri.
+# Memanggil get_upload_queue() di sini juga melanjutkan job yang tertinggal sejak server restart.
+pending_uploads = [
+    job for job in get_upload_queue().jobs()
+    if job['status'] in ACTIVE_STATUSES and job['size'] and job['filename'] not in image_files_github
+]
+if pending_uploads:
+    st.subheader(f"⏳ Sedang Diunggah ({len(pending_uploads)})")
+    pending_cols = st.columns(6)
+    for pending_idx, job in enumerate(pending_uploads[:12]):
+        with pending_cols[pending_idx % 6]:
+            try:
+                if not is_heic(job['name']): # Pratinjau HEIC butuh konversi; cukup tampilkan namanya
+                    st.image(get_image_proxy().thumbnails.get(
+                        get_upload_queue().data_path(job['id']), 'small', filename=f"pending_{job['id']}"
+                    ), use_container_width=True)
+            except Exception:
+                pass # Spool sudah dihapus karena job baru saja selesai
+            st.caption(job['caption'] or job['name'])
+
+def toggle_delete_selection(image_name):
+    """Callback checkbox hapus: pilihan disimpan di session state, bukan dibaca ulang oleh seluruh skrip."""
+    if st.session_state[f"delete_cb_{image_name}"]:
+        st.session_state.selected_for_delete.add(image_name)
+    else:
+        st.session_state.selected_for_delete.discard(image_name)
+    st.session_state.delete_selection_changed = True # Ditampilkan oleh kartu, bukan dari callback
+
+@st.fragment
+def render_gallery_card(image_name, original_sha, display_sha, current_caption, thumbnail_variant):
+    """Satu kartu foto. Widget di dalamnya (checkbox hapus, pilihan edit) hanya me-rerun kartu ini."""
+    with fragment_timer(rerun_timer, "gallery_card") as card_timer:
+        try:
+            with card_timer.span("thumbnail"): # Unduh blob (jika belum di cache) + buat thumbnail
+                display_source = image_source(display_sha, thumbnail_variant)
+            # Menggunakan st.container() untuk membungkus setiap item galeri
+            with st.container(), card_timer.span("render_card"): # Ini adalah container yang akan mendapatkan border dari CSS
+                st.image(display_source, use_container_width=True)
+                st.download_button(
+                    "⬇️ Unduh Asli",
+                    data=functools.partial(get_image_proxy().read, original_sha),
+                    file_name=image_name,
+                    key=f"download_{image_name}"
+                )
+
+                st.markdown(f"**Caption:** {current_caption}")
+
+                if st.session_state.delete_mode:
+                    st.checkbox(
+                        "Pilih untuk hapus",
+                        value=image_name in st.session_state.selected_for_delete,
+                        key=f"delete_cb_{image_name}",
+                        on_change=toggle_delete_selection,
+                        args=(image_name,)
+                    )
+                    if st.session_state.pop('delete_selection_changed', False):
+                        st.toast(f"{len(st.session_state.selected_for_delete)} foto dipilih untuk dihapus")
+                elif st.session_state.edit_mode:
+                    radio_key = f"select_edit_{image_name}"
+                    if st.radio("Pilih Foto Ini", (image_name, ), key=radio_key, index=None) and \
+                            st.session_state.selected_for_edit != image_name: # Cegah rerun tanpa henti
+                        st.session_state.selected_for_edit = image_name
+                        st.rerun(scope="app") # Form edit caption ada di luar kartu
+        except Exception as e:
+            st.error(f"Tidak dapat memuat gambar {image_name} dari GitHub: {e}")
+            st.exception(e)
+
+@st.fragment
+def render_gallery_grid(image_names, gallery_shas, page_captions, num_cols):
+    """Satu halaman galeri sebagai satu komponen HTML; browser mengambil gambar langsung dari proxy (lazy)."""
+    get_image_proxy_server()
+    items = []
+    for image_name in image_names:
+        original_sha = gallery_shas[image_name]
+        display_sha = gallery_shas.get(derivative_name(image_name, 'webp'), original_sha)
+        items.append(proxy_item(
+            IMAGE_PROXY_PUBLIC_URL, image_name, original_sha, display_sha,
+            caption=page_captions.get(image_name, "Tidak ada caption")
+        ))
+    if st.session_state.delete_mode:
+        selection_mode, selected = "multiple", st.session_state.selected_for_delete
+    elif st.session_state.edit_mode:
+        selection_mode, selected = "single", {st.session_state.selected_for_edit} - {None}
+    else:
+        selection_mode, selected = None, ()
+    with fragment_timer(rerun_timer, "gallery_grid") as grid_timer, grid_timer.span("render_grid"):
+        selection = gallery_grid(items, num_cols, selection_mode=selection_mode, selected=selected)
+    if selection is None:
+        return
+    if st.session_state.delete_mode: # Klik di grid hanya me-rerun fragment ini
+        st.session_state.selected_for_delete = set(selection)
+        st.toast(f"{len(selection)} foto dipilih untuk dihapus")
+    elif st.session_state.edit_mode and selection:
+        st.session_state.selected_for_edit = selection[0]
+        st.rerun(scope="app") # Form edit caption ada di luar grid
+
 if not image_files_github:
     st.info("Belum ada foto di Galeri WDF. Jadilah yang pertama mengunggah! 🌟")
 else:
@@ -424,7 +987,9 @@ else:
         st.markdown("---")
         st.subheader(f"Edit Caption: {st.session_state.selected_for_edit}")
         
-        current_caption_for_edit = st.session_state.image_captions.get(st.session_state.selected_for_edit, "Tidak ada caption")
+        current_caption_for_edit = load_gallery_captions(
+            [st.session_state.selected_for_edit], gallery_snapshot
+        ).get(st.session_state.selected_for_edit, "Tidak ada caption")
         new_caption_edit_global = st.text_input(
             "Tulis Caption Baru:",
             value=current_caption_for_edit,
@@ -433,18 +998,27 @@ else:
         col_save, col_cancel = st.columns(2)
         with col_save:
             if st.button("✅ Simpan Perubahan", key="save_edited_caption_global"):
-                st.session_state.image_captions[st.session_state.selected_for_edit] = new_caption_edit_global
-                save_captions_to_github(st.session_state.image_captions)
-                st.session_state.edit_mode = False
-                st.session_state.selected_for_edit = None
-                st.rerun()
+                if commit_gallery_changes(
+                    f"Update caption {st.session_state.selected_for_edit} from Streamlit app",
+                    caption_updates={st.session_state.selected_for_edit: new_caption_edit_global}
+                ):
+                    st.session_state.last_caption_message = "Caption berhasil diperbarui di GitHub."
+                    st.session_state.edit_mode = False
+                    st.session_state.selected_for_edit = None
+                    st.session_state.pop("edit_caption_global_input", None) # Isian sudah tersimpan
+                    st.rerun()
+                # Jika gagal, isian caption tetap ada di form agar bisa dicoba lagi
         with col_cancel:
             if st.button("❌ Batal", key="cancel_edit_caption_global"):
                 st.session_state.edit_mode = False
                 st.session_state.selected_for_edit = None
+                st.session_state.pop("edit_caption_global_input", None)
                 st.rerun()
         st.markdown("---")
 
+    if 'last_caption_message' in st.session_state:
+        st.success(st.session_state.pop('last_caption_message'))
+
     # Pesan mode
     if st.session_state.delete_mode:
         st.warning("Pilih foto yang ingin Anda hapus. Klik lagi untuk membatalkan pilihan.")
@@ -453,76 +1027,101 @@ else:
     elif st.session_state.edit_mode and st.session_state.selected_for_edit:
         st.info(f"Anda sedang mengedit caption untuk: {st.session_state.selected_for_edit}")
 
+    caption_query = st.text_input(
+        "🔎 Cari Caption", key="caption_search_query", on_change=reset_search_page,
+        placeholder="Misalnya: api unggun", help="Tidak membedakan huruf besar/kecil dan tanda aksen; kata boleh diketik sebagian."
+    ).strip()
+    gallery_files = image_files_github
+    if caption_query:
+        caption_matches = search_gallery_captions(caption_query, gallery_snapshot)
+        if caption_matches is not None:
+            gallery_files = [image_name for image_name in image_files_github if image_name in caption_matches]
+            rerun_timer.count("caption_matches", len(gallery_files))
+            if gallery_files:
+                st.caption(f"{len(gallery_files)} foto dengan caption yang cocok dengan \"{caption_query}\".")
+            else:
+                st.info(f"Tidak ada foto dengan caption yang cocok dengan \"{caption_query}\".")
+
     num_cols = st.columns(1)[0].slider("Jumlah Kolom Tampilan", 1, 6, 4)
+    page_size = page_size_selector()
 
-    cols = st.columns(num_cols)
-    col_idx = 0
+    # Hanya foto di halaman yang sedang dilihat yang diminta dari GitHub
+    visible_files, page_info = paginate(gallery_files, page_size, key="search" if gallery_files is not image_files_github else "gallery")
+    render_page_controls(page_info, position="top")
+    rerun_timer.count("images_total", len(image_files_github))
+    rerun_timer.count("images_visible", len(visible_files))
 
-    for image_name in image_files_github:
-        with cols[col_idx]:
-            image_url = f"https://raw.githubusercontent.com/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/main/{GITHUB_UPLOAD_PATH}/{image_name}"
-            
-            try:
-                # Menggunakan st.container() untuk membungkus setiap item galeri
-                with st.container(): # Ini adalah container yang akan mendapatkan border dari CSS
-                    st.image(image_url, use_container_width=True)
-
-                    current_caption = st.session_state.image_captions.get(image_name, "Tidak ada caption")
-                    st.markdown(f"**Caption:** {current_caption}")
-
-                    if st.session_state.delete_mode:
-                        checkbox_key = f"delete_cb_{image_name}"
-                        is_checked = image_name in st.session_state.selected_for_delete
-                        
-                        if st.checkbox(f"Pilih untuk hapus", value=is_checked, key=checkbox_key):
-                            st.session_state.selected_for_delete.add(image_name)
-                        else:
-                            if image_name in st.session_state.selected_for_delete:
-                                st.session_state.selected_for_delete.remove(image_name)
-                    elif st.session_state.edit_mode:
-                        radio_key = f"select_edit_{image_name}"
-                        if st.radio("Pilih Foto Ini", (image_name, ), key=radio_key, index=None):
-                            st.session_state.selected_for_edit = image_name
-                            st.rerun()
-            except Exception as e:
-                st.error(f"Tidak dapat memuat gambar {image_name} dari GitHub: {e}")
-                st.exception(e)
-
-        col_idx = (col_idx + 1) % num_cols
-
-    if st.session_state.delete_mode and st.session_state.selected_for_delete:
+    gallery_shas = {content_file['name']: content_file['sha'] for content_file in gallery_snapshot}
+    page_captions = load_gallery_captions(visible_files, gallery_snapshot) # Hanya shard untuk halaman ini
+    if IMAGE_PROXY_PORT:
+        render_gallery_grid(visible_files, gallery_shas, page_captions, num_cols)
+    else:
+        cols = st.columns(num_cols)
+        col_idx = 0
+        thumbnail_variant = thumbnail_variant_for(num_cols)
+        memory_stats_before = get_image_memory_cache().stats()
+
+        for image_name in visible_files:
+            with cols[col_idx]:
+                # Grid memakai thumbnail dari varian WebP yang ringkas; foto asli hanya untuk diunduh
+                original_sha = gallery_shas[image_name]
+                display_sha = gallery_shas.get(derivative_name(image_name, 'webp'), original_sha)
+                render_gallery_card(
+                    image_name, original_sha, display_sha, page_captions.get(image_name, "Tidak ada caption"), thumbnail_variant
+                )
+
+            col_idx = (col_idx + 1) % num_cols
+        for counter, value in stats_delta(memory_stats_before, get_image_memory_cache().stats()).items():
+            rerun_timer.count(f"image_memory_{counter}", value) # Sesi lain yang aktif ikut terhitung
+
+    render_page_controls(page_info, position="bottom")
+
+    if st.session_state.delete_mode:
+        # Centang di kartu hanya me-rerun kartu itu, jadi jumlah pilihan dibaca saat tombol diklik
         st.markdown("---")
-        st.markdown(
-            f"<h3 style='text-align: center; color: #e9ecef;'>{len(st.session_state.selected_for_delete)} Foto Terpilih</h3>",
-            unsafe_allow_html=True
-        )
-        if st.button(
-            f"Hapus {len(st.session_state.selected_for_delete)} Foto Terpilih",
-            key="confirm_delete",
-            type="primary"
-        ):
+        st.caption("Centang foto yang ingin dihapus (bisa di beberapa halaman), lalu klik tombol di bawah.")
+        confirm_delete = st.button("🗑️ Hapus Foto Terpilih", key="confirm_delete", type="primary")
+        if confirm_delete and not st.session_state.selected_for_delete:
+            st.info("Belum ada foto yang dipilih.")
+        elif confirm_delete:
             deleted_count = 0
             error_count = 0
 
-            for filename_to_delete in st.session_state.selected_for_delete:
-                github_filepath_to_delete = f"{GITHUB_UPLOAD_PATH}/{filename_to_delete}"
-                try:
-                    file_content = repo.get_contents(github_filepath_to_delete)
-                    repo.delete_file(
-                        path=file_content.path,
-                        message=f"Delete {filename_to_delete} from Streamlit app",
-                        sha=file_content.sha,
-                        branch="main"
-                    )
-                    if filename_to_delete in st.session_state.image_captions:
-                        del st.session_state.image_captions[filename_to_delete]
-                    deleted_count += 1
-                except Exception as e:
-                    error_count += 1
-                    st.error(f"Gagal menghapus {filename_to_delete} dari GitHub: {e}")
-                    st.exception(e)
+            # Pastikan file masih ada (menghapus path yang tidak ada membuat seluruh commit gagal)
+            get_storage().refresh()
+            gallery_entries = get_storage().list()
+            existing_files = {content_file['name'] for content_file in gallery_entries}
+            files_to_delete = sorted(st.session_state.selected_for_delete & existing_files)
+            error_count += len(st.session_state.selected_for_delete) - len(files_to_delete)
+            # Foto asli yang disimpan di penyimpanan objek: objeknya dibuang setelah commit berhasil
+            offloaded_pointers = []
+            if get_large_objects().store is not None:
+                offloaded_pointers = orphaned_pointers(gallery_entries, files_to_delete, get_storage().get)
+            # Varian tampilan ikut dihapus dalam commit yang sama
+            paths_to_delete = list(files_to_delete) + [
+                derivative_name(filename, image_format)
+                for filename in files_to_delete
+                for image_format in ('webp', 'avif')
+                if derivative_name(filename, image_format) in existing_files
+            ]
 
-            save_captions_to_github(st.session_state.image_captions)
+            if files_to_delete:
+                # Semua foto terpilih dan caption-nya dihapus dalam satu commit
+                if commit_gallery_changes(
+                    f"Delete {len(files_to_delete)} photo(s) from Streamlit app",
+                    deletes=paths_to_delete,
+                    caption_updates={filename: None for filename in files_to_delete}
+                ):
+                    deleted_count = len(files_to_delete)
+                    for filename in files_to_delete:
+                        get_phash_index().remove(filename)
+                    for pointer in offloaded_pointers:
+                        try:
+                            get_large_objects().discard(pointer)
+                        except Exception as e: # Gagal di sini hanya meninggalkan objek yang tidak terpakai
+                            st.warning(f"Foto asli di penyimpanan objek gagal dihapus: {e}")
+                else:
+                    error_count += len(files_to_delete)
 
             if deleted_count > 0:
                 st.success(f'{deleted_count} foto berhasil dihapus dari GitHub.')
@@ -532,8 +1131,6 @@ else:
             st.session_state.delete_mode = False
             st.session_state.selected_for_delete = set()
             st.rerun()
-    elif st.session_state.delete_mode and not st.session_state.selected_for_delete:
-        st.info("Pilih foto untuk mengaktifkan tombol hapus.")
 
 # --- Footer ---
 st.markdown("---")
@@ -545,3 +1142,5 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+finish_rerun(rerun_timer)
@@ -0,0 +1,108 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fake_github import FakeGitHubServer, FakeRateLimit
+from github_batch import GitBatchWriter
+from github_client import connect_repo, pooled_session
+from github_listing import GalleryListing
+from github_scheduler import RateLimitExhausted, RateLimitScheduler
+
+TOKEN = "token-uji"
+
+
+def connect(server):
+    """Handle repositori seperti di aplikasi: kuota diatur penjadwal, bukan jeda bawaan PyGithub."""
+    scheduler = RateLimitScheduler(write_interval=0)
+    return connect_repo(TOKEN, "owner", "galeri", api_url=server.base_url, scheduler=scheduler)[1], scheduler
+
+
+@pytest.fixture
+def github():
+    server = FakeGitHubServer().start()
+    repo = server.add_repo("owner", "galeri")
+    repo.put_many({"gallery_images/a.jpg": b"foto a", "gallery_images/b.jpg": b"foto b"})
+    yield server, repo
+    server.stop()
+
+
+def test_listing_reuses_snapshot_on_304(github):
+    server, repo = github
+    listing = GalleryListing(TOKEN, "owner", "galeri", "gallery_images", api_url=server.base_url)
+
+    assert listing.refresh() is True
+    assert listing.refresh() is False # If-None-Match dengan ETag terakhir -> 304
+    assert listing.stats['not_modified'] == 1
+    assert [entry['name'] for entry in listing.snapshot()] == ["a.jpg", "b.jpg"]
+
+    repo.put("gallery_images/c.jpg", b"foto c")
+    assert listing.refresh() is True
+    assert [entry['name'] for entry in listing.snapshot()] == ["a.jpg", "b.jpg", "c.jpg"]
+
+
+def test_batch_is_one_commit_and_retries_on_conflict(github):
+    server, repo = github
+    github_repo, scheduler = connect(server)
+    writer = GitBatchWriter(github_repo, scheduler=scheduler)
+    head_before = repo.head
+    calls = []
+
+    def build_changes(read_file):
+        calls.append(read_file("gallery_images/a.jpg"))
+        if len(calls) == 1:
+            repo.put("gallery_images/lain.jpg", b"commit dari proses lain") # Ref bergerak -> 422
+        return {"gallery_images/c.jpg": b"foto c", "gallery_images/d.jpg": b"foto d"}, ["gallery_images/b.jpg"]
+
+    commit = writer.commit("Upload 2 photo(s)", build_changes)
+
+    assert len(calls) == 2
+    assert writer.stats['conflicts'] == 1
+    assert writer.stats['commits'] == 1
+    assert repo.head == commit.sha
+    assert repo.commits[repo.commits[commit.sha]['parents'][0]]['parents'] == [head_before]
+    assert sorted(repo.files) == ["gallery_images/a.jpg", "gallery_images/c.jpg", "gallery_images/d.jpg", "gallery_images/lain.jpg"]
+    assert repo.read("gallery_images/d.jpg") == b"foto d"
+
+
+def test_scheduler_queues_writes_when_quota_is_exhausted():
+    server = FakeGitHubServer(rate_limit=FakeRateLimit(limit=3, window=2)).start()
+    try:
+        server.add_repo("owner", "galeri").put("gallery_images/a.jpg", b"foto a")
+        scheduler = RateLimitScheduler(write_reserve=1, write_interval=0, max_read_wait=0.5)
+        listing = GalleryListing(
+            TOKEN, "owner", "galeri", "gallery_images", api_url=server.base_url,
+            session=pooled_session(2, scheduler)
+        )
+        _, github_repo = connect_repo(TOKEN, "owner", "galeri", api_url=server.base_url, scheduler=scheduler)
+        writer = GitBatchWriter(github_repo, "main", scheduler=scheduler)
+
+        listing.refresh()
+        listing.force_refresh()
+        assert scheduler.snapshot()['remaining'] == 1
+        # Sisa kuota disimpan untuk tulis: baca yang harus menunggu terlalu lama langsung gagal
+        with pytest.raises(RateLimitExhausted):
+            listing.refresh()
+        writer.create_blob(b"tulis pertama memakai sisa kuota")
+        writer.create_blob(b"tulis kedua antre sampai kuota pulih")
+
+        assert scheduler.stats['waits'] >= 1
+        assert scheduler.stats['writes'] == 2
+        assert server.rate_limit.rejected == {'primary': 0, 'secondary': 0}
+    finally:
+        server.stop()
+
+
+def test_batch_uses_default_branch():
+    """Tanpa branch, commit masuk ke branch default repositori (di sini master, bukan main)."""
+    server = FakeGitHubServer().start()
+    try:
+        repo = server.add_repo("owner", "galeri", branch="master")
+        repo.put("gallery_images/a.jpg", b"foto a")
+        github_repo, scheduler = connect(server)
+
+        GitBatchWriter(github_repo, scheduler=scheduler).commit("Upload", lambda read_file: ({"gallery_images/b.jpg": b"foto b"}, []))
+
+        assert repo.read("gallery_images/b.jpg") == b"foto b"
+    finally:
+        server.stop()
@@ -0,0 +1,86 @@
+import os
+import sys
+import threading
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fake_github import FakeGitHubServer
+from image_proxy import BlobCache, GitHubBlobReader, git_blob_sha
+
+
+@pytest.fixture
+def blob_reader():
+    server = FakeGitHubServer().start()
+    repo = server.add_repo("owner", "galeri")
+    repo.put_many({f"gallery_images/{name}.jpg": name.encode() * 400 for name in ("a", "b", "c")})
+    yield repo, GitHubBlobReader("token-uji", "owner", "galeri", api_url=server.base_url)
+    server.stop()
+
+
+def test_blob_is_verified_against_its_sha(tmp_path, blob_reader):
+    repo, reader = blob_reader
+    sha = repo.files["gallery_images/a.jpg"]
+    cache = BlobCache(str(tmp_path), reader.read)
+    assert cache.read(sha) == b"a" * 400
+    assert cache.read(sha) == b"a" * 400
+    assert cache.stats['misses'] == 1 and cache.stats['hits'] == 1
+
+    other_sha = repo.files["gallery_images/b.jpg"]
+    tampered = BlobCache(str(tmp_path / "lain"), lambda blob_sha: reader.read(sha)) # Isi blob yang salah
+    with pytest.raises(ValueError):
+        tampered.path_for(other_sha)
+    assert os.listdir(tampered.cache_dir) == []
+
+
+def test_blob_cache_evicts_least_recently_used(tmp_path, blob_reader):
+    repo, reader = blob_reader
+    sha_a, sha_b, sha_c = (repo.files[f"gallery_images/{name}.jpg"] for name in ("a", "b", "c"))
+    cache = BlobCache(str(tmp_path), reader.read, max_bytes=1000) # Muat dua blob 400 byte
+
+    cache.path_for(sha_a)
+    cache.path_for(sha_b)
+    cache.path_for(sha_a) # a baru dipakai: b yang terlama
+    cache.path_for(sha_c)
+
+    assert cache.stats['evictions'] == 1
+    assert sorted(os.listdir(tmp_path)) == sorted([sha_a, sha_c])
+    assert cache.cache_stats()['total_bytes'] == 800
+
+
+def test_concurrent_path_for_same_blob(tmp_path):
+    """Beberapa thread meminta blob yang sama bersamaan: semuanya berhasil, blob hanya diambil sekali."""
+    data = b"isi foto" * 1000
+    sha = git_blob_sha(data)
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6) # Pergantian thread sesering mungkin, agar jendela race terbuka
+    try:
+        for trial in range(100):
+            fetch_calls = []
+
+            def fetch(blob_sha):
+                fetch_calls.append(blob_sha)
+                return data
+
+            cache = BlobCache(str(tmp_path / f"blobs{trial}"), fetch)
+            barrier = threading.Barrier(8)
+            results, errors = [], []
+
+            def worker():
+                barrier.wait()
+                try:
+                    results.append(cache.path_for(sha))
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert errors == []
+            assert len(results) == 8
+            assert fetch_calls == [sha]
+            assert not [name for name in os.listdir(cache.cache_dir) if name.endswith(".tmp")]
+    finally:
+        sys.setswitchinterval(switch_interval)
@@ -0,0 +1,31 @@
+import os
+import sys
+import hashlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from large_objects import LargeObjectOffload, LocalObjectStore, orphaned_pointers
+from storage import MemoryStorage
+
+
+def test_deleted_photo_object_is_discarded(tmp_path):
+    """Objek milik foto yang dihapus ikut dibuang; objek yang masih dipakai foto lain tetap ada."""
+    large_objects = LargeObjectOffload(LocalObjectStore(str(tmp_path / "objects")), threshold_bytes=10)
+    big, shared = b"a" * 100, b"b" * 100
+    storage = MemoryStorage({
+        "big.jpg": large_objects.offload(big),
+        "shared.jpg": large_objects.offload(shared),
+        "shared_copy.jpg": large_objects.offload(shared),
+        "small.jpg": b"kecil",
+    })
+    entries = storage.list()
+    deleted = ["big.jpg", "shared.jpg", "small.jpg"]
+
+    pointers = orphaned_pointers(entries, deleted, storage.get)
+    storage.delete(deleted)
+    for pointer in pointers:
+        large_objects.discard(pointer)
+
+    assert len(pointers) == 1
+    assert not large_objects.store.exists(hashlib.sha256(big).hexdigest())
+    assert large_objects.stats['deleted'] == 1
+    assert large_objects.resolve(storage.get("shared_copy.jpg")) == shared
@@ -0,0 +1,26 @@
+import os
+import sys
+import json
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rerun_timing import RerunTimer, fragment_timer
+
+
+def test_fragment_rerun_gets_its_own_record(tmp_path):
+    """Span dari fragment yang dijalankan ulang sendirian tidak masuk ke rerun penuh yang sudah dicatat."""
+    log_path = tmp_path / "diagnostics.jsonl"
+    st.session_state.diagnostics_rerun_id = 1
+    timer = RerunTimer(enabled=True, app="test.py", session_id="sesi", rerun_id=1, log_path=str(log_path))
+
+    with fragment_timer(timer, "gallery_card") as card_timer, card_timer.span("thumbnail"):
+        assert card_timer is timer # Fragment ikut rerun penuh
+    timer.finish()
+    with fragment_timer(timer, "gallery_card") as card_timer, card_timer.span("thumbnail"):
+        assert card_timer is not timer
+
+    full_run, fragment_run = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert full_run['fragment'] is None and full_run['stages']['thumbnail']['calls'] == 1
+    assert fragment_run['fragment'] == "gallery_card"
+    assert fragment_run['rerun_id'] == 2
+    assert fragment_run['stages']['thumbnail']['calls'] == 1
@@ -0,0 +1,39 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import LocalFolderStorage
+
+
+def tmp_files(root):
+    return [name for name in os.listdir(root) if name.endswith(".tmp")]
+
+
+def test_discard_after_failed_batch(tmp_path):
+    """batch() gagal setelah stage(): discard() membuang file sementara, galeri tidak berubah."""
+    storage = LocalFolderStorage(str(tmp_path))
+    staged = {name: storage.stage(data) for name, data in [("a.jpg", b"aaa"), ("b.webp", b"bbb")]}
+    assert len(tmp_files(tmp_path)) == 2
+
+    def failing_changes(read_file):
+        raise RuntimeError("gagal")
+
+    with pytest.raises(RuntimeError):
+        storage.batch("Upload", failing_changes)
+    for item in staged.values():
+        storage.discard(item)
+
+    assert tmp_files(tmp_path) == []
+    assert storage.list() == []
+
+
+def test_discard_after_successful_batch_keeps_files(tmp_path):
+    storage = LocalFolderStorage(str(tmp_path))
+    staged = {"a.jpg": storage.stage(b"aaa")}
+    storage.batch("Upload", lambda read_file: (staged, []))
+    for item in staged.values():
+        storage.discard(item) # Sudah di-rename: tidak ada yang dibuang
+
+    assert storage.get("a.jpg") == b"aaa"
+    assert tmp_files(tmp_path) == []
@@ -0,0 +1,52 @@
+import os
+import sys
+import threading
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from thumbnail_cache import ThumbnailCache
+
+
+def test_concurrent_get_same_image(tmp_path):
+    """Beberapa thread meminta thumbnail yang sama bersamaan: semuanya berhasil, decode hanya sekali."""
+    source_path = tmp_path / "foto.jpg"
+    Image.new('RGB', (1600, 1200), (200, 120, 40)).save(source_path, 'JPEG')
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6) # Pergantian thread sesering mungkin, agar jendela race terbuka
+    try:
+        run_trials(tmp_path, source_path)
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+
+def run_trials(tmp_path, source_path):
+    for trial in range(30):
+        cache = ThumbnailCache(str(tmp_path / f"cache{trial}"))
+        generate_calls = []
+        original_generate = cache._generate
+
+        def counting_generate(*args):
+            generate_calls.append(args)
+            return original_generate(*args)
+
+        cache._generate = counting_generate
+        barrier = threading.Barrier(8)
+        results, errors = [], []
+
+        def worker(variant):
+            barrier.wait()
+            try:
+                results.append(cache.get(str(source_path), variant))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(variant,)) for variant in ('small', 'medium', 'large') * 2 + ('small', 'large')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert all(os.path.exists(path) for path in results)
+        assert len(generate_calls) == 1
+        assert not [name for name in os.listdir(cache.cache_dir) if name.endswith(".tmp")]
@@ -0,0 +1,165 @@
+import os
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageOps
+
+# Ukuran sisi terpanjang (px) untuk setiap varian thumbnail
+THUMBNAIL_SIZES = {
+    'small': 240,
+    'medium': 480,
+    'large': 960,
+}
+THUMBNAIL_FORMAT = 'webp' # WebP kecil dan tetap mendukung transparansi (PNG/GIF)
+THUMBNAIL_QUALITY = 80
+
+
+class ThumbnailCache:
+    """Cache thumbnail multi-ukuran di disk dengan eviksi LRU berdasarkan total byte.
+
+    Nama file cache: <nama asli>.<tanda tangan mtime+size>.<varian>.webp, sehingga
+    thumbnail otomatis basi ketika file asli diganti dan mudah dihapus per file. Urutan LRU
+    disimpan di atime sehingga mtime thumbnail tetap (dipakai ImageBytesCache sebagai tanda tangan).
+    Satu instance aman dipakai bersama oleh banyak sesi (thread).
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, sizes=None, quality=THUMBNAIL_QUALITY):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.sizes = dict(sizes or THUMBNAIL_SIZES)
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # nama file cache -> ukuran byte, urutan = LRU (terlama di depan)
+        self._generate_locks = {} # (nama, tanda tangan) -> Lock, agar satu foto hanya di-decode sekali
+        self._total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        """Bangun ulang urutan LRU dari isi folder cache (berdasarkan atime)."""
+        existing = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(f".{THUMBNAIL_FORMAT}"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            existing.append((st.st_atime, name, st.st_size))
+        for _, name, size in sorted(existing):
+            self._entries[name] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def _signature(source_path):
+        st = os.stat(source_path)
+        return hashlib.sha1(f"{st.st_mtime_ns}:{st.st_size}".encode('utf-8')).hexdigest()[:16]
+
+    def _cache_name(self, filename, signature, variant):
+        return f"{filename}.{signature}.{variant}.{THUMBNAIL_FORMAT}"
+
+    def get(self, source_path, variant='medium', filename=None):
+        """Kembalikan path thumbnail untuk source_path, membuat semua varian jika belum ada.
+
+        filename menentukan nama kunci cache (default: nama file source_path), berguna jika
+        thumbnail dibuat dari varian tampilan tetapi dihapus memakai nama foto asli.
+        """
+        if variant not in self.sizes:
+            raise ValueError(f"Varian thumbnail tidak dikenal: {variant}")
+        filename = filename or os.path.basename(source_path)
+        signature = self._signature(source_path)
+        cache_name = self._cache_name(filename, signature, variant)
+        cache_path = os.path.join(self.cache_dir, cache_name)
+
+        with self._lock:
+            if cache_name in self._entries and os.path.exists(cache_path):
+                self._touch(cache_name, cache_path)
+                return cache_path
+            generate_key = (filename, signature)
+            generate_lock = self._generate_locks.setdefault(generate_key, threading.Lock())
+
+        # Decode dilakukan di luar lock utama agar sesi lain tidak ikut menunggu
+        with generate_lock:
+            with self._lock:
+                if cache_name in self._entries and os.path.exists(cache_path):
+                    self._touch(cache_name, cache_path) # Dibuat oleh thread lain selagi menunggu
+                    return cache_path
+            try:
+                generated = self._generate(source_path, filename, signature)
+                with self._lock: # Dicatat sebelum generate_lock dilepas, agar thread yang menunggu memakai hasilnya
+                    for name, size in generated.items():
+                        old_size = self._entries.pop(name, None)
+                        if old_size is not None:
+                            self._total_bytes -= old_size
+                        self._entries[name] = size
+                        self._total_bytes += size
+                    self._touch(cache_name, cache_path)
+                    self._evict(keep=cache_name)
+            finally:
+                with self._lock:
+                    self._generate_locks.pop(generate_key, None)
+        return cache_path
+
+    def _generate(self, source_path, filename, signature):
+        """Decode file asli sekali lalu tulis semua varian (dari terbesar ke terkecil)."""
+        generated = {}
+        largest = max(self.sizes.values())
+        with Image.open(source_path) as img:
+            # draft() membuat decoder JPEG langsung memperkecil skala saat decode
+            img.draft('RGB', (largest, largest))
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'P') else 'RGB')
+            current = img
+            for variant, edge in sorted(self.sizes.items(), key=lambda item: item[1], reverse=True):
+                current = current.copy()
+                current.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+                cache_name = self._cache_name(filename, signature, variant)
+                cache_path = os.path.join(self.cache_dir, cache_name)
+                tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp" # Unik per penulisan
+                current.save(tmp_path, format=THUMBNAIL_FORMAT, quality=self.quality, method=4)
+                os.replace(tmp_path, cache_path) # Atomik: tidak ada thumbnail setengah jadi
+                generated[cache_name] = os.path.getsize(cache_path)
+        return generated
+
+    def _touch(self, cache_name, cache_path):
+        self._entries.move_to_end(cache_name)
+        try:
+            st = os.stat(cache_path)
+            os.utime(cache_path, ns=(time.time_ns(), st.st_mtime_ns)) # Simpan urutan LRU untuk restart berikutnya
+        except OSError:
+            pass
+
+    def _evict(self, keep=None):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = next(iter(self._entries.items()))
+            if name == keep:
+                self._entries.move_to_end(name)
+                continue
+            self._remove_entry(name, size)
+
+    def _remove_entry(self, name, size):
+        del self._entries[name]
+        self._total_bytes -= size
+        try:
+            os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+    def discard(self, filename):
+        """Hapus semua varian thumbnail milik filename (misalnya setelah foto dihapus)."""
+        prefix = f"{filename}."
+        with self._lock:
+            for name, size in list(self._entries.items()):
+                if name.startswith(prefix):
+                    self._remove_entry(name, size)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
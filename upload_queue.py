@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import uuid
+import random
+import threading
+
+UPLOAD_BATCH_SIZE = 10 # Maksimum job yang digabung dalam satu pemrosesan (satu commit)
+UPLOAD_BATCH_LINGER = 1.0 # detik menunggu job lain setelah job terbaru masuk, agar satu kiriman jadi satu commit
+UPLOAD_MAX_ATTEMPTS = 5
+UPLOAD_RETRY_BASE = 2.0 # detik; jeda percobaan ke-n = base * 2^(n-1), ber-jitter
+UPLOAD_RETRY_MAX = 300.0
+DONE_RETENTION_SECONDS = 600 # Job selesai diingat sebentar agar sesi pengirim bisa melihat hasilnya
+
+ACTIVE_STATUSES = ('queued', 'processing', 'retry')
+
+
+class UploadQueue:
+    """Antrean unggahan tahan-restart dengan satu worker latar belakang.
+
+    submit() menulis isi file dan metadata job ke spool_dir lalu langsung kembali; worker
+    mengambil sampai batch_size job yang siap dan memanggil process_jobs(jobs). Setiap job
+    yang dikirim ke process_jobs punya 'data_path' (isi file di spool). process_jobs
+    mengembalikan dict job_id -> (error, result): error None berarti selesai, selain itu job
+    gagal permanen (misalnya file rusak). Jika process_jobs melempar exception, semua job di
+    batch dicoba lagi dengan backoff sampai max_attempts.
+
+    Job yang belum selesai saat proses berhenti dimuat ulang dari spool saat start().
+    """
+
+    def __init__(self, spool_dir, process_jobs, batch_size=UPLOAD_BATCH_SIZE, max_attempts=UPLOAD_MAX_ATTEMPTS,
+                 retry_base=UPLOAD_RETRY_BASE, linger=UPLOAD_BATCH_LINGER):
+        self.spool_dir = spool_dir
+        self.process_jobs = process_jobs
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self._jobs = {} # id -> dict metadata (tanpa isi file)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.stats = {'submitted': 0, 'done': 0, 'failed': 0, 'retries': 0, 'batches': 0}
+        os.makedirs(spool_dir, exist_ok=True)
+        self._load_spool()
+
+    # --- Spool di disk ---
+    def _data_path(self, job_id):
+        return os.path.join(self.spool_dir, f"{job_id}.bin")
+
+    def _meta_path(self, job_id):
+        return os.path.join(self.spool_dir, f"{job_id}.json")
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno()) # Job yang sudah diterima tidak boleh hilang saat server mati
+        os.replace(tmp_path, path)
+
+    def _save_meta(self, job):
+        self._write_atomic(self._meta_path(job['id']), json.dumps(job, ensure_ascii=False).encode('utf-8'))
+
+    def _remove_spool(self, job_id):
+        for path in (self._data_path(job_id), self._meta_path(job_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _load_spool(self):
+        for name in sorted(os.listdir(self.spool_dir)):
+            if name.endswith(".tmp"):
+                os.remove(os.path.join(self.spool_dir, name)) # Tulisan setengah jadi sebelum restart
+                continue
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.spool_dir, name), encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not os.path.exists(self._data_path(job['id'])):
+                self._remove_spool(job['id'])
+                continue
+            if job['status'] == 'processing':
+                job['status'] = 'queued' # Terpotong restart; diproses ulang
+            self._jobs[job['id']] = job
+
+    # --- API ---
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="upload-queue", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, name, data, filename, caption="", owner=None):
+        """Simpan satu foto ke spool dan antrekan; kembalikan salinan metadata job."""
+        job = {
+            'id': uuid.uuid4().hex,
+            'name': name,
+            'filename': filename,
+            'caption': caption,
+            'size': len(data),
+            'owner': owner,
+            'status': 'queued',
+            'attempts': 0,
+            'error': None,
+            'result': None,
+            'submitted_at': time.time(),
+            'next_attempt_at': 0.0,
+            'finished_at': None,
+        }
+        self._write_atomic(self._data_path(job['id']), bytes(data))
+        self._save_meta(job) # Metadata ditulis terakhir: job hanya terlihat jika isinya lengkap
+        with self._condition:
+            self._jobs[job['id']] = job
+            self.stats['submitted'] += 1
+            self._condition.notify_all()
+        return dict(job)
+
+    def jobs(self, ids=None, owner=None):
+        """Salinan metadata job (urut waktu kirim), opsional disaring per id atau pemilik."""
+        with self._condition:
+            selected = [
+                dict(job) for job in self._jobs.values()
+                if (ids is None or job['id'] in ids) and (owner is None or job['owner'] == owner)
+            ]
+        return sorted(selected, key=lambda job: job['submitted_at'])
+
+    def data_path(self, job_id):
+        return self._data_path(job_id)
+
+    def retry(self, job_id):
+        """Antrekan ulang job yang gagal permanen (misalnya setelah masalah di sisi GitHub diperbaiki)."""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != 'failed':
+                return False
+            job.update(status='queued', attempts=0, error=None, next_attempt_at=0.0)
+            self._save_meta(job)
+            self._condition.notify_all()
+        return True
+
+    def dismiss(self, job_id):
+        """Buang job yang gagal atau selesai dari antrean beserta file spool-nya."""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] in ACTIVE_STATUSES:
+                return False
+            del self._jobs[job_id]
+        self._remove_spool(job_id)
+        return True
+
+    # --- Worker ---
+    def _take_batch(self):
+        """Tunggu sampai ada job siap, tandai sebagai 'processing', lalu kembalikan salinannya."""
+        with self._condition:
+            while not self._stopping:
+                now = time.time()
+                self._forget_done(now)
+                ready = [
+                    job for job in self._jobs.values()
+                    if job['status'] in ('queued', 'retry') and job['next_attempt_at'] <= now
+                ]
+                linger = max((job['submitted_at'] for job in ready), default=0) + self.linger - now
+                if ready and linger > 0 and len(ready) < self.batch_size:
+                    self._condition.wait(timeout=linger)
+                    continue
+                if ready:
+                    ready.sort(key=lambda job: job['submitted_at'])
+                    batch = ready[:self.batch_size]
+                    for job in batch:
+                        job['status'] = 'processing'
+                        job['attempts'] += 1
+                        self._save_meta(job)
+                    return [dict(job, data_path=self._data_path(job['id'])) for job in batch]
+                waits = [
+                    job['next_attempt_at'] - now for job in self._jobs.values() if job['status'] == 'retry'
+                ]
+                self._condition.wait(timeout=min(waits) if waits else None)
+        return None
+
+    def _forget_done(self, now):
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job['status'] == 'done' and now - job['finished_at'] > DONE_RETENTION_SECONDS]:
+            del self._jobs[job_id]
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            try:
+                outcomes = self.process_jobs(batch)
+                batch_error = None
+            except Exception as e:
+                outcomes, batch_error = {}, e
+            self._finish_batch(batch, outcomes, batch_error)
+
+    def _finish_batch(self, batch, outcomes, batch_error):
+        finished = []
+        with self._condition:
+            self.stats['batches'] += 1
+            now = time.time()
+            for processed in batch:
+                job = self._jobs.get(processed['id'])
+                if job is None:
+                    continue
+                if batch_error is None and job['id'] in outcomes:
+                    error, result = outcomes[job['id']]
+                    if error is None:
+                        job.update(status='done', error=None, result=result, finished_at=now)
+                        self.stats['done'] += 1
+                        finished.append(job['id'])
+                        continue
+                    job.update(status='failed', error=error, finished_at=now) # Tidak akan berhasil jika diulang
+                    self.stats['failed'] += 1
+                elif job['attempts'] >= self.max_attempts:
+                    job.update(status='failed', error=str(batch_error or "Job tidak diproses"), finished_at=now)
+                    self.stats['failed'] += 1
+                else:
+                    delay = min(UPLOAD_RETRY_MAX, self.retry_base * (2 ** (job['attempts'] - 1)))
+                    job.update(status='retry', error=str(batch_error or "Job tidak diproses"),
+                               next_attempt_at=now + delay * random.uniform(0.5, 1.5))
+                    self.stats['retries'] += 1
+                self._save_meta(job)
+            self._condition.notify_all()
+        for job_id in finished:
+            self._remove_spool(job_id) # Sudah tersimpan di galeri; metadata tetap di memori sebentar